@@ -0,0 +1,110 @@
+"""
+Compare the tuple fetch path with the Arrow result-batch path.
+
+Runs against FakeSnowflakeConnector's pre-built Arrow batches, so no account
+is needed. Run it with the agent directory on the path:
+
+    PYTHONPATH=agent python agent/benchmark/arrow_fetch_benchmark.py
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from server.FakeSnowflakeConnector import FakeSnowflakeConnector
+
+QUERY = "SELECT * FROM IMPORT_KEXP_PLAYLIST"
+
+
+def time_ms(fn, repeat):
+    """Median wall time of fn() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(1000 * (time.perf_counter() - started))
+    return statistics.median(samples)
+
+
+def tuple_path(connector):
+    """What execute_queries does: decode to Python row tuples, then dicts."""
+    batches = connector.get_result_batches(QUERY)
+    rows = []
+    for batch in batches:
+        table = batch.to_arrow()
+        rows.extend(zip(*(column.to_pylist() for column in table.columns)))
+    columns = ["ID", "QUERY_TEXT", "RUN_AT"]
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def run(row_counts, workers, chunk_rows, repeat):
+    results = []
+    for rows in row_counts:
+        connector = FakeSnowflakeConnector(
+            latency=0.0, rows=rows, chunk_rows=chunk_rows
+        )
+        connector.connect()
+        connector.get_result_batches(QUERY)  # build the batches outside the timings
+
+        result = {
+            "rows": rows,
+            "chunks": len(connector.get_result_batches(QUERY)),
+            "tuple_ms": time_ms(lambda: tuple_path(connector), repeat),
+        }
+        for count in workers:
+            result[f"arrow_{count}_ms"] = time_ms(
+                lambda: connector.fetch_arrow(QUERY, workers=count), repeat
+            )
+            result[f"pandas_{count}_ms"] = time_ms(
+                lambda: connector.fetch_arrow(QUERY, "pandas", workers=count), repeat
+            )
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare tuple fetching against parallel Arrow batch decoding."
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10000, 100000, 1000000],
+        help="Result sizes to benchmark",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 4],
+        help="Decoding worker counts to compare",
+    )
+    parser.add_argument(
+        "--chunk-rows", type=int, default=50000, help="Rows per result batch"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.workers, args.chunk_rows, args.repeat)
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    header = f"{'rows':>9} {'chunks':>6} {'tuple ms':>9}"
+    for count in args.workers:
+        header += f" {f'arrow x{count}':>10} {f'pandas x{count}':>11}"
+    print(header)
+    for r in results:
+        line = f"{r['rows']:>9} {r['chunks']:>6} {r['tuple_ms']:>9.1f}"
+        for count in args.workers:
+            line += f" {r[f'arrow_{count}_ms']:>10.1f} {r[f'pandas_{count}_ms']:>11.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
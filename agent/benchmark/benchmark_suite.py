@@ -0,0 +1,527 @@
+"""
+End-to-end benchmark suite.
+
+Scenarios:
+    ingest  - CSVUploader loading generated KEXP playlist CSVs (rows/sec)
+    query   - QueryHandler.execute_query latency at different result sizes
+    prompt  - PromptGenerator build time as the table count grows
+    report  - ReportWriter serialization cost per output format
+
+ingest and query run against a PostgresFixture: a throwaway local cluster
+when initdb is available, else the POSTGRES_* server in a scratch schema.
+They are skipped if neither is reachable. Every case runs in a fresh
+process, so its peak RSS is its own.
+
+Results are printed, or emitted as JSON with --json/--output. They are
+compared against a stored baseline (--baseline, saved with --save-baseline),
+and the exit status is 1 if any metric regressed by more than --tolerance.
+Baselines are machine-specific; save one per machine. Run it from the
+repository root:
+
+    PYTHONPATH=agent:agent/server python agent/benchmark/benchmark_suite.py
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from kexp_playlist_generator import COLUMNS, ensure_playlist, iter_playlist
+from postgres_fixture import PostgresFixture
+
+SCENARIOS = ("ingest", "query", "prompt", "report")
+
+# Metrics compared against the baseline; larger is better only for throughput.
+COMPARED = ("p50_ms", "p95_ms", "p99_ms", "seconds", "rows_per_sec", "peak_rss_mb")
+HIGHER_IS_BETTER = {"rows_per_sec"}
+
+QUESTION = "What are Bob Mould's top hits this past year?"
+
+
+def percentile(samples, p):
+    """p-th percentile of samples, interpolating between closest ranks."""
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_stats(samples):
+    """Summary of latency samples in milliseconds."""
+    return {
+        "runs": len(samples),
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+        "max_ms": max(samples),
+    }
+
+
+def time_samples(fn, repeat, warmup=1):
+    """Wall times of repeat calls to fn() in milliseconds, after warmup calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(1000 * (time.perf_counter() - started))
+    return samples
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    # On Linux ru_maxrss survives fork and exec, so a spawned process would
+    # report its parent's peak; VmHWM belongs to this process image only.
+    try:
+        with open("/proc/self/status", "r") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def isolated(fn, *args):
+    """
+    Run fn(*args) in a freshly spawned process, so the peak RSS a case
+    reports is its own and not left over from an earlier one.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def ingest_case(path, mode, batch_size):
+    """Load one playlist file into an empty table with CSVUploader."""
+    from CSVUploader import CSVUploader
+    from LoadMetadata import LoadMetadata
+    from PostgresConnector import PostgresConnector
+
+    connector = PostgresConnector()
+    connection = connector.connect()
+    table = CSVUploader.table_name_for(path)
+    try:
+        metadata = LoadMetadata()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            metadata.ensure_table(cursor)
+            cursor.execute(
+                f"DELETE FROM {metadata.table_name} WHERE table_name = %s",
+                (table.lower(),),
+            )
+        connection.commit()
+
+        uploader = CSVUploader(connection, mode=mode, batch_size=batch_size)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = uploader.upload_csv(path)
+    finally:
+        connector.close()
+    if "error" in stats:
+        raise RuntimeError(stats["error"])
+
+    size = os.path.getsize(path)
+    return {
+        "table": table,
+        "rows": stats["inserted"],
+        "seconds": stats["seconds"],
+        "rows_per_sec": stats["inserted"] / stats["seconds"],
+        "mb_per_sec": size / 1e6 / stats["seconds"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def query_case(table, result_rows, repeat):
+    """Latency of execute_query returning result_rows rows."""
+    from PostgresConnector import PostgresConnector
+    from server.QueryHandler import QueryHandler
+
+    connector = PostgresConnector()
+    handler = QueryHandler(connection=connector.connect())
+    query = (
+        f"SELECT {', '.join(COLUMNS).lower()} FROM {table} "
+        f"ORDER BY airdate DESC LIMIT {int(result_rows)}"
+    )
+
+    def run():
+        result = handler.execute_query(query)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+        returned = len(result["data"])
+        if returned != result_rows:
+            raise RuntimeError(f"expected {result_rows} rows, got {returned}")
+
+    try:
+        samples = time_samples(run, repeat)
+    finally:
+        connector.close()
+    stats = latency_stats(samples)
+    stats.update(
+        rows=result_rows,
+        rows_per_sec=result_rows / (stats["p50_ms"] / 1000),
+        peak_rss_mb=peak_rss_mb(),
+    )
+    return stats
+
+
+def prompt_case(table_count, repeat):
+    """Cold PromptGenerator build: catalog, BM25 index and both prompt forms."""
+    from prompt_benchmark import StaticCatalog, synthetic_schema
+    from server.PromptGenerator import PromptGenerator
+
+    schema_info = synthetic_schema(table_count)
+    sizes = {}
+
+    def build():
+        catalog = StaticCatalog(schema_info)
+        generator = PromptGenerator("Postgres", None, catalog=catalog)
+        system_text, _ = generator.generate_request(QUESTION)
+        prompt = generator.generate_prompt(QUESTION)
+        sizes["prefix_tokens"] = PromptGenerator.estimate_tokens(system_text or "")
+        sizes["prompt_tokens"] = PromptGenerator.estimate_tokens(prompt)
+
+    stats = latency_stats(time_samples(build, repeat))
+    stats.update(tables=table_count, peak_rss_mb=peak_rss_mb(), **sizes)
+    return stats
+
+
+def report_case(format, rows, repeat, batch_size):
+    """Write rows of playlist data as one report with ReportWriter."""
+    from server.ReportWriter import ReportWriter
+
+    writer = ReportWriter(format)
+    batches = []
+    for frame in iter_playlist(rows, chunk_rows=batch_size):
+        # Shape the rows like a database cursor's: datetimes, strings and None
+        frame = frame.astype(object).where(frame.notna(), None)
+        frame["AIRDATE"] = [value.to_pydatetime() for value in frame["AIRDATE"]]
+        batches.append(list(frame.itertuples(index=False, name=None)))
+
+    with tempfile.TemporaryDirectory() as output_folder:
+        sizes = {}
+
+        def write():
+            result_sets = [("SELECT * FROM import_kexp_playlist", COLUMNS, batches)]
+            paths, _ = writer.write(output_folder, "playlist", result_sets)
+            sizes["bytes"] = sum(os.path.getsize(path) for path in paths)
+
+        stats = latency_stats(time_samples(write, repeat))
+    stats.update(
+        rows=rows,
+        rows_per_sec=rows / (stats["p50_ms"] / 1000),
+        peak_rss_mb=peak_rss_mb(),
+        **sizes,
+    )
+    return stats
+
+
+class BenchmarkSuite:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+        self.skipped = []
+        # rows -> table loaded in this run
+        self.loaded = {}
+
+    def record(self, scenario, name, result):
+        result = {"scenario": scenario, "name": f"{scenario}/{name}", **result}
+        self.results.append(result)
+        if not self.args.json:
+            latency = (
+                f"p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+                f"p99 {result['p99_ms']:.1f} ms"
+                if "p50_ms" in result
+                else f"{result['seconds']:.2f}s"
+            )
+            throughput = (
+                f", {result['rows_per_sec']:,.0f} rows/sec"
+                if "rows_per_sec" in result
+                else ""
+            )
+            print(
+                f"✅ {result['name']}: {latency}{throughput}, "
+                f"peak RSS {result['peak_rss_mb']:.0f} MB"
+            )
+
+    def load(self, rows):
+        """Ingest a playlist of `rows` rows unless this run already did."""
+        if rows not in self.loaded:
+            path = ensure_playlist(self.args.data_dir, rows, self.args.seed)
+            result = isolated(ingest_case, path, "copy", self.args.batch_size)
+            self.loaded[rows] = result["table"]
+        return self.loaded[rows]
+
+    def run_ingest(self):
+        for rows in self.args.rows:
+            path = ensure_playlist(self.args.data_dir, rows, self.args.seed)
+            for mode in self.args.ingest_modes:
+                result = isolated(ingest_case, path, mode, self.args.batch_size)
+                self.loaded[rows] = result["table"]
+                self.record("ingest", f"{mode}/{rows}", result)
+
+    def run_query(self):
+        table = self.load(max(self.args.query_table_rows, *self.args.result_rows))
+        for result_rows in self.args.result_rows:
+            result = isolated(query_case, table, result_rows, self.args.repeat)
+            self.record("query", str(result_rows), result)
+
+    def run_prompt(self):
+        for table_count in self.args.tables:
+            result = isolated(prompt_case, table_count, self.args.repeat)
+            self.record("prompt", str(table_count), result)
+
+    def run_report(self):
+        for format in self.args.formats:
+            if format == "parquet":
+                try:
+                    import pyarrow  # noqa: F401
+                except ImportError:
+                    self.skipped.append("report/parquet: pyarrow is not installed")
+                    continue
+            for rows in self.args.report_rows:
+                result = isolated(
+                    report_case,
+                    format,
+                    rows,
+                    max(1, self.args.repeat // 4),
+                    self.args.batch_size,
+                )
+                self.record("report", f"{format}/{rows}", result)
+
+    def run(self):
+        scenarios = self.args.scenarios
+        fixture = None
+        needs_database = [s for s in scenarios if s in ("ingest", "query")]
+        meta = self.meta()
+        try:
+            if needs_database:
+                fixture = PostgresFixture(self.args.postgres)
+                if fixture.start():
+                    meta["postgres"] = fixture.describe()
+                    if not self.args.json:
+                        print(f"🐘 Postgres: {fixture.describe()}")
+                else:
+                    self.skipped.extend(f"{s}: {fixture.error}" for s in needs_database)
+                    scenarios = [s for s in scenarios if s not in needs_database]
+
+            for scenario in scenarios:
+                getattr(self, f"run_{scenario}")()
+        finally:
+            if fixture is not None:
+                fixture.stop()
+
+        for reason in self.skipped:
+            print(f"⚠️ Skipped {reason}", file=sys.stderr)
+        meta["skipped"] = self.skipped
+        return {"meta": meta, "results": self.results}
+
+    def meta(self):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "started": datetime.now(timezone.utc).isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": self.args.seed,
+            "repeat": self.args.repeat,
+        }
+
+
+def compare(report, baseline, tolerance, noise_ms=1.0):
+    """
+    Compare results with a baseline report.
+
+    :param tolerance: Fraction a metric may get worse by.
+    :param noise_ms: Latency changes smaller than this never count, so
+        sub-millisecond cases do not flag scheduler jitter.
+    :return: One entry per metric present in both, with "regressed" set
+        when it got worse by more than the tolerance.
+    """
+    previous = {result["name"]: result for result in baseline["results"]}
+    comparisons = []
+    for result in report["results"]:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        for metric in COMPARED:
+            if not before.get(metric) or metric not in result:
+                continue
+            change = (result[metric] - before[metric]) / before[metric]
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if metric.endswith("_ms") and result[metric] - before[metric] < noise_ms:
+                worse = min(worse, 0.0)
+            comparisons.append(
+                {
+                    "name": result["name"],
+                    "metric": metric,
+                    "baseline": before[metric],
+                    "current": result[metric],
+                    "change": change,
+                    "regressed": worse > tolerance,
+                }
+            )
+    return comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark ingest, queries, prompt building and report writing."
+    )
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=SCENARIOS,
+        default=list(SCENARIOS),
+        help="Scenarios to run",
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10000, 100000, 1000000],
+        help="Playlist sizes to ingest (up to 10000000)",
+    )
+    parser.add_argument(
+        "--ingest-modes",
+        nargs="+",
+        choices=("copy", "insert"),
+        default=["copy"],
+        help="CSVUploader modes to ingest with",
+    )
+    parser.add_argument(
+        "--result-rows",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000, 10000, 100000],
+        help="Result sizes for the query scenario",
+    )
+    parser.add_argument(
+        "--query-table-rows",
+        type=int,
+        default=100000,
+        help="Minimum size of the table queried",
+    )
+    parser.add_argument(
+        "--tables",
+        type=int,
+        nargs="+",
+        default=[1, 10, 50, 200],
+        help="Table counts for the prompt scenario",
+    )
+    parser.add_argument(
+        "--report-rows",
+        type=int,
+        nargs="+",
+        default=[10000, 100000],
+        help="Rows per report for the report scenario",
+    )
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        default=["json", "ndjson", "csv", "parquet"],
+        help="ReportWriter formats for the report scenario",
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per case")
+    parser.add_argument(
+        "--batch-size", type=int, default=50000, help="Rows per ingest or write batch"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Data generator seed")
+    parser.add_argument(
+        "--data-dir", default="data/benchmark", help="Generated CSV files"
+    )
+    parser.add_argument(
+        "--postgres",
+        choices=PostgresFixture.modes,
+        default="auto",
+        help="Postgres fixture for ingest and query",
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="Print the JSON report")
+    parser.add_argument(
+        "--baseline",
+        default=os.getenv("BENCHMARK_BASELINE", "data/benchmark/baseline.json"),
+        help="Baseline report to compare against, if it exists",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store this run as the baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Fractional slowdown allowed before a metric counts as regressed",
+    )
+    parser.add_argument(
+        "--noise-ms",
+        type=float,
+        default=1.0,
+        help="Latency increases below this many ms are never regressions",
+    )
+    args = parser.parse_args()
+
+    report = BenchmarkSuite(args).run()
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            comparisons = compare(
+                report, json.load(baseline_file), args.tolerance, args.noise_ms
+            )
+        report["baseline"] = {"path": args.baseline, "comparisons": comparisons}
+        regressions = [c for c in comparisons if c["regressed"]]
+        if not args.json:
+            print(f"\n📊 Compared with {args.baseline}:")
+            for c in comparisons:
+                flag = "❌" if c["regressed"] else "  "
+                print(
+                    f"{flag} {c['name']:<28} {c['metric']:<12} "
+                    f"{c['baseline']:>12.2f} -> {c['current']:>12.2f} "
+                    f"({c['change']:+.0%})"
+                )
+            print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}.")
+
+    paths = [args.output] if args.output else []
+    if args.save_baseline:
+        paths.append(args.baseline)
+    for path in paths:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+        if not args.json:
+            print(f"💾 Saved {path}")
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Generate synthetic CSV files shaped like the KEXP playlist export that
+CSVUploader loads into import_kexp_playlist.
+
+Rows are generated with numpy one chunk at a time, so 10M-row files are
+written in bounded memory. Output is deterministic for a given seed.
+Artist popularity follows a Zipf distribution and programs follow the
+hour of day, so group-by and top-N queries behave like the real data.
+A .gz suffix writes a gzip-compressed file.
+
+    python agent/benchmark/kexp_playlist_generator.py --rows 10000 1000000
+"""
+
+import argparse
+import gzip
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    "AIRDATE",
+    "ALBUM",
+    "ARTIST",
+    "SONG",
+    "PROGRAM_NAME",
+    "PROGRAM_TAGS",
+    "HOST_NAMES",
+    "RELEASE_DATE",
+]
+
+KNOWN_ARTISTS = [
+    "Bob Mould",
+    "The Beths",
+    "Sinead O'Connor",
+    "Radiohead",
+    "Khruangbin",
+    "Wet Leg",
+    "IDLES",
+    "Fontaines D.C.",
+    "Japanese Breakfast",
+    "Big Thief",
+    "Car Seat Headrest",
+    "Alvvays",
+    "The National",
+    "Courtney Barnett",
+    "Sleater-Kinney",
+    "Built to Spill",
+    "Modest Mouse",
+    "Death Cab for Cutie",
+]
+
+WORDS = [
+    "Blue",
+    "Night",
+    "Crazy",
+    "Light",
+    "Little",
+    "River",
+    "Ghost",
+    "Summer",
+    "Heart",
+    "Stone",
+    "Electric",
+    "Golden",
+    "Hold",
+    "Paper",
+    "Silver",
+    "Wild",
+    "Morning",
+    "Static",
+    "Ocean",
+    "Fire",
+    "Echo",
+    "Glass",
+    "Velvet",
+    "Machine",
+]
+
+# (first hour, program, tags, host) in broadcast order
+PROGRAMS = [
+    (0, "Early", "Rock;Eclectic", "Alex"),
+    (6, "The Morning Show", "Rock;Eclectic", "John Richards"),
+    (10, "The Midday Show", "Rock;Eclectic", "Cheryl Waters"),
+    (14, "The Afternoon Show", "Rock;Eclectic", "Kevin Cole"),
+    (18, "Drive Time", "Rock;Eclectic", "Troy Nelson"),
+    (21, "Sonarchy", "Local;Rock", "Levi Fuller"),
+]
+
+
+def names(rng, count, words=2):
+    """Random title-case names made of `words` words."""
+    picks = rng.integers(0, len(WORDS), size=(count, words))
+    return [" ".join(WORDS[i] for i in row) for row in picks]
+
+
+class Vocabulary:
+    """Artists, with albums and songs per artist, drawn once per seed."""
+
+    def __init__(self, rng, artists=5000, songs_per_artist=12, albums_per_artist=3):
+        synthetic = [f"{name} {i}" for i, name in enumerate(names(rng, artists))]
+        self.artists = np.array(KNOWN_ARTISTS + synthetic, dtype=object)
+        self.songs = np.array(names(rng, len(self.artists) * songs_per_artist, 3))
+        self.albums = np.array(names(rng, len(self.artists) * albums_per_artist))
+        self.songs_per_artist = songs_per_artist
+        self.albums_per_artist = albums_per_artist
+        hours = np.zeros(24, dtype=int)
+        for index, (first_hour, *_) in enumerate(PROGRAMS):
+            hours[first_hour:] = index
+        self.program_by_hour = hours
+        self.programs, self.tags, self.hosts = (
+            np.array(values, dtype=object) for values in list(zip(*PROGRAMS))[1:]
+        )
+
+
+def generate_chunk(rng, vocabulary, start, rows):
+    """
+    One chunk of playlist rows, in airdate order from `start`.
+
+    :return: (DataFrame, airdate to start the next chunk from)
+    """
+    # A song every two and a half to five and a half minutes
+    offsets = np.cumsum(rng.integers(150, 330, size=rows)).astype("timedelta64[s]")
+    airdate = np.datetime64(start, "s") + offsets
+
+    # Wrap the long tail around rather than piling it onto the last artist
+    artist = (rng.zipf(1.1, size=rows) - 1) % len(vocabulary.artists)
+    song = artist * vocabulary.songs_per_artist + np.minimum(
+        rng.zipf(1.5, size=rows) - 1, vocabulary.songs_per_artist - 1
+    )
+    album = artist * vocabulary.albums_per_artist + rng.integers(
+        0, vocabulary.albums_per_artist, size=rows
+    )
+    program = vocabulary.program_by_hour[pd.DatetimeIndex(airdate).hour.to_numpy()]
+    release_date = pd.Series(
+        airdate.astype("datetime64[D]") - rng.integers(0, 20 * 365, size=rows)
+    ).dt.strftime("%Y-%m-%d")
+    album_names = pd.Series(vocabulary.albums[album])
+
+    frame = pd.DataFrame(
+        {
+            "AIRDATE": airdate,
+            # Some plays have no album or release date in the export
+            "ALBUM": album_names.where(rng.random(rows) > 0.05),
+            "ARTIST": vocabulary.artists[artist],
+            "SONG": vocabulary.songs[song],
+            "PROGRAM_NAME": vocabulary.programs[program],
+            "PROGRAM_TAGS": vocabulary.tags[program],
+            "HOST_NAMES": vocabulary.hosts[program],
+            "RELEASE_DATE": release_date.where(rng.random(rows) > 0.1),
+        },
+        columns=COLUMNS,
+    )
+    return frame, airdate[-1].astype("datetime64[s]").item()
+
+
+def iter_playlist(rows, seed=42, start="2024-01-01T00:00:00", chunk_rows=100000):
+    """Yield DataFrames of playlist rows, chunk_rows at a time."""
+    rng = np.random.default_rng(seed)
+    vocabulary = Vocabulary(rng)
+    remaining = rows
+    while remaining > 0:
+        count = min(chunk_rows, remaining)
+        frame, start = generate_chunk(rng, vocabulary, start, count)
+        remaining -= count
+        yield frame
+
+
+def write_playlist(path, rows, seed=42, chunk_rows=100000):
+    """
+    Write a playlist CSV of `rows` rows to path (gzip-compressed for .gz).
+
+    :return: Size of the written file in bytes.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    opener = gzip.open if path.endswith(".gz") else open
+    temp_path = f"{path}.tmp"
+    with opener(temp_path, "wt", encoding="utf-8", newline="") as csv_file:
+        frames = iter_playlist(rows, seed, chunk_rows=chunk_rows)
+        for index, frame in enumerate(frames):
+            frame.to_csv(
+                csv_file,
+                header=index == 0,
+                index=False,
+                date_format="%Y-%m-%d %H:%M:%S",
+            )
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+
+def playlist_path(data_dir, rows, seed=42, compress=False):
+    """
+    File name for a generated playlist. CSVUploader derives the table
+    name from it, e.g. IMPORT_KEXP_PLAYLIST_10000_S42.
+    """
+    suffix = ".csv.gz" if compress else ".csv"
+    return os.path.join(data_dir, f"import_kexp_playlist_{rows}_s{seed}{suffix}")
+
+
+def ensure_playlist(data_dir, rows, seed=42, compress=False):
+    """Generate a playlist file unless one with the same parameters exists."""
+    path = playlist_path(data_dir, rows, seed, compress)
+    if not os.path.exists(path):
+        write_playlist(path, rows, seed)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic import_kexp_playlist CSV files."
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10000, 100000, 1000000],
+        help="Row counts, one file each",
+    )
+    parser.add_argument(
+        "--output-dir", default="data/benchmark", help="Directory for the files"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--gzip", action="store_true", help="Write .csv.gz files")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        path = playlist_path(args.output_dir, rows, args.seed, args.gzip)
+        started = time.perf_counter()
+        size = write_playlist(path, rows, args.seed)
+        elapsed = time.perf_counter() - started
+        print(
+            f"✅ {path}: {rows:,} rows, {size / 1e6:,.1f} MB in {elapsed:.1f}s "
+            f"({rows / elapsed:,.0f} rows/sec)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+
+import psycopg2
+
+from PostgresConnector import PostgresConnector
+
+
+class PostgresFixture:
+    """
+    Postgres server for the benchmarks, as a context manager.
+
+    Modes:
+        embedded - a throwaway cluster created with initdb in a temporary
+                   directory and started with pg_ctl on a free local port.
+                   The binaries come from PG_BIN or PATH. The cluster is
+                   removed on exit.
+        existing - the server in the POSTGRES_* environment variables. The
+                   benchmarks use a scratch schema that is dropped on exit.
+        auto     - embedded when initdb is available and works, else existing.
+
+    While active, the POSTGRES_* variables point at the fixture, so
+    PostgresConnector, and any process started meanwhile, connects to it.
+    """
+
+    modes = ("auto", "embedded", "existing")
+
+    def __init__(self, mode="auto", database="benchmark"):
+        """
+        :param mode: One of PostgresFixture.modes.
+        :param database: Database created in the embedded cluster.
+        """
+        if mode not in self.modes:
+            raise ValueError(f"Unknown Postgres fixture mode '{mode}'")
+        self.mode = mode
+        self.database = database
+        self.active = None
+        self.error = None
+        self.data_dir = None
+        self.schema = None
+        self._saved_env = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    @staticmethod
+    def _binary(name):
+        bin_dir = os.getenv("PG_BIN")
+        if bin_dir:
+            path = os.path.join(bin_dir, name)
+            return path if os.path.exists(path) else None
+        return shutil.which(name)
+
+    @staticmethod
+    def _free_port():
+        with socket.socket() as sock:
+            sock.bind(("localhost", 0))
+            return sock.getsockname()[1]
+
+    def _set_env(self, **values):
+        for key, value in values.items():
+            self._saved_env.setdefault(key, os.environ.get(key))
+            os.environ[key] = value
+
+    def start(self):
+        """
+        Bring up the fixture.
+
+        :return: True if a server is available; otherwise self.error says why.
+        """
+        if self.mode in ("auto", "embedded"):
+            try:
+                self._start_embedded()
+                self.active = "embedded"
+                return True
+            except Exception as e:
+                self.error = f"embedded Postgres: {e}"
+                self._remove_cluster()
+                if self.mode == "embedded":
+                    return False
+
+        try:
+            self._start_existing()
+            self.active = "existing"
+            self.error = None
+            return True
+        except Exception as e:
+            reasons = [self.error] if self.error else []
+            self.error = "; ".join(reasons + [f"existing Postgres: {e}"])
+            return False
+
+    def _start_embedded(self):
+        initdb, pg_ctl = self._binary("initdb"), self._binary("pg_ctl")
+        if not initdb or not pg_ctl:
+            raise RuntimeError("initdb/pg_ctl not found (set PG_BIN)")
+
+        self.data_dir = tempfile.mkdtemp(prefix="pg_benchmark_")
+        cluster = os.path.join(self.data_dir, "data")
+        port = self._free_port()
+        run = dict(check=True, capture_output=True, text=True)
+        try:
+            subprocess.run(
+                [initdb, "-D", cluster, "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+                **run,
+            )
+            subprocess.run(
+                [
+                    pg_ctl,
+                    "-D",
+                    cluster,
+                    "-l",
+                    os.path.join(self.data_dir, "log"),
+                    "-o",
+                    f"-p {port} -k {self.data_dir} -c listen_addresses=localhost",
+                    "-w",
+                    "start",
+                ],
+                **run,
+            )
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError((e.stderr or e.stdout or str(e)).strip()) from None
+
+        connection = psycopg2.connect(
+            dbname="postgres", user="postgres", host="localhost", port=port
+        )
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"CREATE DATABASE {self.database}")
+        finally:
+            connection.close()
+
+        self._set_env(
+            POSTGRES_DB=self.database,
+            POSTGRES_USER="postgres",
+            POSTGRES_PASSWORD="",
+            POSTGRES_HOST="localhost",
+            POSTGRES_PORT=str(port),
+            POSTGRES_SCHEMA="public",
+        )
+
+    def _start_existing(self):
+        self.schema = f"benchmark_{os.getpid()}"
+        connection = psycopg2.connect(
+            dbname=os.getenv("POSTGRES_DB", "your_database"),
+            user=os.getenv("POSTGRES_USER", "your_user"),
+            password=os.getenv("POSTGRES_PASSWORD", "your_password"),
+            host=os.getenv("POSTGRES_HOST", "localhost"),
+            port=os.getenv("POSTGRES_PORT", "5432"),
+            connect_timeout=5,
+        )
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {self.schema}")
+            connection.commit()
+        finally:
+            connection.close()
+        self._set_env(POSTGRES_SCHEMA=self.schema)
+
+    def describe(self):
+        """Where the benchmarks connect, for the report."""
+        return (
+            f"{self.active} {os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}"
+            f"/{os.getenv('POSTGRES_DB')} schema {os.getenv('POSTGRES_SCHEMA')}"
+        )
+
+    def stop(self):
+        """Drop the scratch schema or shut down the cluster, and restore the env."""
+        if self.active == "existing" and self.schema:
+            connector = PostgresConnector()
+            connection = connector.connect()
+            if connection:
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"DROP SCHEMA IF EXISTS {self.schema} CASCADE")
+                    connection.commit()
+                finally:
+                    connector.close()
+        self._remove_cluster()
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self._saved_env = {}
+        self.active = None
+
+    def _remove_cluster(self):
+        if not self.data_dir:
+            return
+        pg_ctl = self._binary("pg_ctl")
+        cluster = os.path.join(self.data_dir, "data")
+        if pg_ctl and os.path.exists(os.path.join(cluster, "postmaster.pid")):
+            subprocess.run(
+                [pg_ctl, "-D", cluster, "-m", "fast", "-w", "stop"],
+                capture_output=True,
+            )
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+        self.data_dir = None
@@ -0,0 +1,216 @@
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime
+
+from server.PromptGenerator import PromptGenerator
+from server.SchemaCatalog import SchemaCatalog
+
+WORDS = [
+    "artist",
+    "album",
+    "song",
+    "program",
+    "host",
+    "release",
+    "label",
+    "genre",
+    "station",
+    "listener",
+    "donation",
+    "event",
+    "venue",
+    "ticket",
+    "playlist",
+    "show",
+    "segment",
+    "comment",
+    "rating",
+    "country",
+    "city",
+    "member",
+    "campaign",
+    "session",
+    "track",
+    "recording",
+    "studio",
+    "review",
+    "chart",
+]
+
+QUESTIONS = [
+    "get the top 10 songs in the past week",
+    "What are Bob Mould's top hits this past year?",
+    "Which hosts played the most songs from albums released in 2023?",
+    "How many donations did each campaign receive per city?",
+]
+
+
+class StaticCatalog(SchemaCatalog):
+    """A SchemaCatalog populated from memory instead of a database."""
+
+    def __init__(self, schema_info):
+        self.connection = None
+        self.schema = "public"
+        self.snapshot_path = False
+        self.fingerprints = {}
+        self._index = None
+        self.tables = {
+            table: {
+                "columns": info["columns"],
+                "types": ["text"] * len(info["columns"]),
+                "sample_data": info["sample_data"],
+            }
+            for table, info in schema_info.items()
+        }
+
+    def refresh(self):
+        return []
+
+
+def synthetic_schema(table_count, seed=42):
+    """Build a schema with the KEXP playlist table plus random tables."""
+    rng = random.Random(seed)
+    schema = {
+        "import_kexp_playlist": {
+            "columns": [
+                "airdate",
+                "album",
+                "artist",
+                "song",
+                "program_name",
+                "program_tags",
+                "host_names",
+                "release_date",
+            ],
+            "sample_data": [
+                [
+                    datetime(2025, 1, 1, 8, i),
+                    "Patch The Sky",
+                    "Bob Mould",
+                    "Hold On",
+                    "The Morning Show",
+                    "Rock",
+                    "John Richards",
+                    "2016-03-25",
+                ]
+                for i in range(3)
+            ],
+        }
+    }
+    while len(schema) < table_count:
+        table = "_".join(rng.sample(WORDS, 2)) + f"_{len(schema)}"
+        columns = ["id"] + [
+            f"{rng.choice(WORDS)}_{rng.choice(['name', 'id', 'date', 'count', 'code'])}"
+            for _ in range(rng.randint(6, 20))
+        ]
+        rows = [
+            [rng.randint(1, 10000)]
+            + [f"{rng.choice(WORDS)} {rng.randint(1, 999)}" for _ in columns[1:]]
+            for _ in range(3)
+        ]
+        schema[table] = {"columns": columns, "sample_data": rows}
+    return schema
+
+
+def full_dump_prompt(database, schema_info, user_query):
+    """The previous generate_prompt: every table, indented JSON."""
+    schema_text = json.dumps(
+        schema_info,
+        indent=2,
+        default=lambda obj: (
+            obj.isoformat() if isinstance(obj, datetime) else str(obj)
+        ),
+    )
+    return f"""
+        Given the following database schema and sample data:
+
+        {schema_text}
+
+        Generate an optimal SQL query for {database} to answer the following user request:
+        "{user_query}"
+        """
+
+
+def time_ms(fn, repeat):
+    """Median wall time of fn() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(1000 * (time.perf_counter() - started))
+    return statistics.median(samples)
+
+
+def run(table_counts, repeat):
+    results = []
+    for table_count in table_counts:
+        schema_info = synthetic_schema(table_count)
+        catalog = StaticCatalog(schema_info)
+        generator = PromptGenerator("Postgres", None, catalog=catalog)
+
+        index_ms = time_ms(lambda: StaticCatalog(schema_info).index(), repeat)
+        catalog.index()
+
+        for question in QUESTIONS:
+            full = full_dump_prompt("Postgres", schema_info, question)
+            selected = generator.generate_prompt(question)
+            results.append(
+                {
+                    "tables": table_count,
+                    "question": question,
+                    "full_chars": len(full),
+                    "full_tokens": PromptGenerator.estimate_tokens(full),
+                    "full_ms": time_ms(
+                        lambda: full_dump_prompt("Postgres", schema_info, question),
+                        repeat,
+                    ),
+                    "selected_chars": len(selected),
+                    "selected_tokens": PromptGenerator.estimate_tokens(selected),
+                    "selected_ms": time_ms(
+                        lambda: generator.generate_prompt(question), repeat
+                    ),
+                    "index_build_ms": index_ms,
+                }
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare full schema dumps against relevance-selected prompts."
+    )
+    parser.add_argument(
+        "--tables",
+        type=int,
+        nargs="+",
+        default=[1, 10, 50, 200],
+        help="Table counts to benchmark",
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions")
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines")
+    args = parser.parse_args()
+
+    results = run(args.tables, args.repeat)
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print(
+        f"{'tables':>6} {'full tok':>9} {'sel tok':>8} {'full ms':>8} "
+        f"{'sel ms':>7} {'index ms':>9}  question"
+    )
+    for r in results:
+        print(
+            f"{r['tables']:>6} {r['full_tokens']:>9} {r['selected_tokens']:>8} "
+            f"{r['full_ms']:>8.2f} {r['selected_ms']:>7.2f} "
+            f"{r['index_build_ms']:>9.2f}  {r['question']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from server.Tracer import tracer
+
+from MCPClient import MCPClient
+from RateLimiter import RateLimiter
+
+
+class BatchRunner:
+    """
+    Answers a file of questions without the interactive chat loop.
+
+    Questions run concurrently over the client's single MCP session, at
+    most `concurrency` at a time, and the client's model requests are
+    throttled by a RateLimiter. Every answer is written as one JSON line
+    as soon as it is ready, with the SQL that ran, the rows it returned,
+    and how long the prompt build, the model, the tools and the whole
+    question took.
+    """
+
+    def __init__(self, client, concurrency=None, llm_requests_per_minute=None):
+        """
+        :param client: A connected MCPClient.
+        :param concurrency: Questions in flight at once (BATCH_CONCURRENCY,
+            default 4).
+        :param llm_requests_per_minute: Model requests started per minute
+            (LLM_REQUESTS_PER_MINUTE, default 50). 0 disables the limit.
+        """
+        self.client = client
+        self.concurrency = int(
+            concurrency
+            if concurrency is not None
+            else os.getenv("BATCH_CONCURRENCY", 4)
+        )
+        rate = float(
+            llm_requests_per_minute
+            if llm_requests_per_minute is not None
+            else os.getenv("LLM_REQUESTS_PER_MINUTE", 50)
+        )
+        self.client.llm_limiter = RateLimiter(rate) if rate > 0 else None
+        # Interleaved streaming output from concurrent questions is unreadable
+        self.client.quiet = True
+
+    @staticmethod
+    def read_questions(path):
+        """
+        Read questions, one per line. Blank lines and lines starting with #
+        are skipped; a line may also be a JSON object with "question" and
+        an optional "id".
+
+        :return: List of (id, question).
+        """
+        questions = []
+        with open(path, "r", encoding="utf-8") as question_file:
+            for line in question_file:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("{"):
+                    item = json.loads(line)
+                    questions.append(
+                        (item.get("id", len(questions) + 1), item["question"])
+                    )
+                else:
+                    questions.append((len(questions) + 1, line))
+        return questions
+
+    async def run_question(self, semaphore, question_id, question):
+        """Answer one question once a concurrency slot is free."""
+        queued = time.perf_counter()
+        async with semaphore:
+            started = time.perf_counter()
+            stats = {}
+            answer, error = None, None
+            try:
+                answer = await self.client.process_query(question, stats)
+            except Exception as e:
+                error = repr(e)
+            finished = time.perf_counter()
+
+        turns = stats.get("turns", [])
+        return {
+            "id": question_id,
+            "question": question,
+            "answer": answer,
+            "error": error,
+            "trace_id": stats.get("trace_id"),
+            "sql": stats.get("sql", []),
+            "rows": stats.get("rows", []),
+            "question_cache": stats.get("question_cache", False),
+            "llm_turns": len(turns),
+            "timings": {
+                "queue_ms": 1000 * (started - queued),
+                "prompt_ms": stats.get("prompt_ms", 0.0),
+                "llm_ms": stats.get("llm_ms", 0.0),
+                "ttft_ms": turns[0]["ttft_ms"] if turns else None,
+                "tool_ms": stats.get("tool_ms", 0.0),
+                "total_ms": 1000 * (finished - started),
+            },
+            "tokens": {
+                key: sum(turn[key] for turn in turns)
+                for key in (
+                    "cache_read_tokens",
+                    "cache_write_tokens",
+                    "uncached_tokens",
+                    "output_tokens",
+                )
+            },
+        }
+
+    async def run(self, questions, output_path):
+        """
+        Answer every question, appending results to output_path in the
+        order they finish.
+
+        :param questions: List of (id, question).
+        :return: The results.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [
+            asyncio.create_task(self.run_question(semaphore, question_id, question))
+            for question_id, question in questions
+        ]
+        results = []
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as output:
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                output.write(json.dumps(result, default=str) + "\n")
+                output.flush()
+                results.append(result)
+                status = "❌" if result["error"] else "✅"
+                print(
+                    f"{status} [{len(results)}/{len(tasks)}] #{result['id']} "
+                    f"{result['timings']['total_ms']:.0f} ms: {result['question']}"
+                )
+        return results
+
+    @staticmethod
+    def summarize(results, elapsed):
+        """Print success counts and total-latency percentiles."""
+        failed = sum(1 for result in results if result["error"])
+        totals = sorted(result["timings"]["total_ms"] for result in results)
+
+        def percentile(p):
+            return totals[min(len(totals) - 1, int(p / 100 * len(totals)))]
+
+        print(
+            f"\n📊 {len(results) - failed} answered, {failed} failed "
+            f"in {elapsed:.1f}s"
+        )
+        if totals:
+            print(
+                f"⏱️ Total per question: p50 {percentile(50):.0f} ms, "
+                f"p95 {percentile(95):.0f} ms, max {totals[-1]:.0f} ms"
+            )
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Answer a file of questions through the MCP server."
+    )
+    parser.add_argument("server_script", help="Path to the server launch script")
+    parser.add_argument("questions", help="File with one question per line")
+    parser.add_argument(
+        "--output", default="batch_results.jsonl", help="JSONL file for results"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, help="Questions in flight (BATCH_CONCURRENCY)"
+    )
+    parser.add_argument(
+        "--llm-rpm",
+        type=float,
+        help="Model requests per minute, 0 for no limit (LLM_REQUESTS_PER_MINUTE)",
+    )
+    parser.add_argument(
+        "--stub-llm",
+        action="store_true",
+        help="Answer with the offline StubStreamingClient instead of the API",
+    )
+    args = parser.parse_args()
+
+    questions = BatchRunner.read_questions(args.questions)
+    print(f"📂 Loaded {len(questions)} questions from {args.questions}")
+
+    llm = None
+    if args.stub_llm:
+        from StubStreamingClient import StubStreamingClient
+
+        llm = StubStreamingClient()
+
+    client = MCPClient(llm)
+    try:
+        await client.connect_to_server(args.server_script)
+        runner = BatchRunner(client, args.concurrency, args.llm_rpm)
+        started = time.perf_counter()
+        results = await runner.run(questions, args.output)
+        runner.summarize(results, time.perf_counter() - started)
+        print(f"💾 Results written to {args.output}")
+        print(f"📊 Latency histograms written to {tracer.dump_histograms()}")
+    finally:
+        await client.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,8 @@
 import asyncio
+import inspect
+import json
+import os
+import time
 import traceback
 from typing import Optional
 from contextlib import AsyncExitStack
@@ -6,21 +10,65 @@ from contextlib import AsyncExitStack
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from dotenv import load_dotenv
 
-from server.PostgresConnector import PostgresConnector
+from server.DatabaseBackend import DatabaseBackend
 from server.PromptGenerator import PromptGenerator
+from server.Tracer import tracer
+
+from QuestionCache import QuestionCache
 
 load_dotenv()  # load environment variables from .env
 
+# Older mcp releases cannot attach _meta (and with it trace context) to a call
+CALL_TOOL_META = "meta" in inspect.signature(ClientSession.call_tool).parameters
+
 
 class MCPClient:
-    def __init__(self):
+    model = os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-20241022")
+    max_tokens = int(os.getenv("ANTHROPIC_MAX_TOKENS", 1000))
+    # Model turns allowed per question before the tool loop gives up
+    max_turns = int(os.getenv("AGENT_MAX_TURNS", 8))
+    # Seconds the refreshed schema catalog is reused before a question checks
+    # the database for changes again; 0 checks on every question
+    schema_refresh_seconds = float(os.getenv("SCHEMA_REFRESH_SECONDS", 30))
+
+    def __init__(self, llm=None):
+        """
+        :param llm: Async client with messages.stream(); AsyncAnthropic by default,
+            or the offline StubStreamingClient when LLM_STUB=true.
+        """
         # Initialize session and client objects
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
-        self.anthropic = Anthropic()
+        if llm is None and os.getenv("LLM_STUB", "false").lower() == "true":
+            from StubStreamingClient import StubStreamingClient
+
+            llm = StubStreamingClient()
+        self.anthropic = llm if llm is not None else AsyncAnthropic()
+        # Time to first token and total latency of every model turn
+        self.turn_timings = []
+        # Database selected by DB_BACKEND; its schema catalog and session are
+        # kept across questions and the catalog is refreshed incrementally
+        self.backend: Optional[DatabaseBackend] = None
+        # PromptGenerator over the catalog as of its last refresh, shared by
+        # questions until it is schema_refresh_seconds old
+        self.generator: Optional[PromptGenerator] = None
+        self._generator_refreshed = 0.0
+        # Held while the catalog refreshes and while prompts read it
+        self._prompt_lock = asyncio.Lock()
+        # Tool definitions, listed once per MCP session so the cached
+        # request prefix stays byte-identical
+        self.available_tools: Optional[list] = None
+        # SQL of previously answered questions, reused for near-duplicates
+        self.question_cache: Optional[QuestionCache] = None
+        if os.getenv("QUESTION_CACHE", "true").lower() == "true":
+            self.question_cache = QuestionCache()
+        # Optional RateLimiter every model request waits on
+        self.llm_limiter = None
+        # Suppress progress output, e.g. when questions run concurrently
+        self.quiet = False
 
     async def connect_to_server(self, server_script_path: str):
         """Connect to an MCP server
@@ -43,101 +91,370 @@ class MCPClient:
         await self.session.initialize()
 
         # List available tools
-        response = await self.session.list_tools()
-        tools = response.tools
-        print("\nConnected to server with tools:", [tool.name for tool in tools])
-
-    async def process_query(self, query: str) -> str:
-        """Process a query using Claude and available tools"""
+        tools = await self.list_tools()
+        print("\nConnected to server with tools:", [tool["name"] for tool in tools])
 
-        # Create a prompt based on the query to send to claude
-        # Connect to the database and generate prompts from metadata
-        connector = PostgresConnector()
-        generator = PromptGenerator("Postgres", connector.connect())
+    async def list_tools(self):
+        """
+        Return the server's tool definitions, fetched once per session.
 
-        prompt = generator.generate_prompt(query)
+        The last definition carries a cache-control marker, so the tool list
+        is part of the cached request prefix.
+        """
+        if self.available_tools is None:
+            response = await self.session.list_tools()
+            tools = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "input_schema": tool.inputSchema,
+                }
+                for tool in response.tools
+            ]
+            if tools:
+                tools[-1]["cache_control"] = {"type": "ephemeral"}
+            self.available_tools = tools
+        return self.available_tools
+
+    def say(self, *args, **kwargs):
+        """print() unless the client is quiet."""
+        if not self.quiet:
+            print(*args, **kwargs)
+
+    async def stream_message(self, messages, tools, system=None, stats=None):
+        """
+        Run one model turn as a stream, printing text as it arrives.
 
-        # Create the message to send to the LLM
-        messages = [{"role": "user", "content": prompt}]
+        The event loop stays free while tokens arrive, so the MCP session
+        keeps answering protocol traffic during generation.
 
-        response = await self.session.list_tools()
-        available_tools = [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "input_schema": tool.inputSchema,
+        :param system: Optional system prompt blocks, sent ahead of messages.
+        :param stats: Optional per-question dict the turn's timing is added to.
+        :return: The complete message, with any tool_use blocks.
+        """
+        if self.llm_limiter is not None:
+            await self.llm_limiter.acquire()
+        started = time.perf_counter()
+        first_token = None
+
+        request = {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "messages": messages,
+            "tools": tools,
+        }
+        if system:
+            request["system"] = system
+
+        self.say("\n🦉 ", end="", flush=True)
+        with tracer.span("llm.stream", model=self.model):
+            async with self.anthropic.messages.stream(**request) as stream:
+                async for event in stream:
+                    if first_token is None and event.type in ("text", "input_json"):
+                        first_token = time.perf_counter()
+                    if event.type == "text":
+                        self.say(event.text, end="", flush=True)
+                    elif (
+                        event.type == "content_block_stop"
+                        and event.content_block.type == "tool_use"
+                    ):
+                        block = event.content_block
+                        self.say(
+                            f"\n🔧 {block.name} {json.dumps(block.input)}", flush=True
+                        )
+                response = await stream.get_final_message()
+
+            finished = time.perf_counter()
+            usage = response.usage
+            timing = {
+                "ttft_ms": 1000 * ((first_token or finished) - started),
+                "total_ms": 1000 * (finished - started),
+                "cache_read_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+                "cache_write_tokens": (
+                    getattr(usage, "cache_creation_input_tokens", 0) or 0
+                ),
+                "uncached_tokens": usage.input_tokens,
+                "output_tokens": usage.output_tokens,
             }
-            for tool in response.tools
-        ]
+            tracer.annotate(stop_reason=response.stop_reason, **timing)
+        self.turn_timings.append(timing)
+        if stats is not None:
+            stats["turns"].append(timing)
+            stats["llm_ms"] += timing["total_ms"]
+        self.say(
+            f"\n⏱️ First token {timing['ttft_ms']:.0f} ms, "
+            f"turn {timing['total_ms']:.0f} ms; input tokens: "
+            f"{timing['cache_read_tokens']} cache read, "
+            f"{timing['cache_write_tokens']} cache write, "
+            f"{timing['uncached_tokens']} uncached"
+        )
+        return response
+
+    @staticmethod
+    def result_text(content):
+        """Plain text of a tool result's content."""
+        if isinstance(content, str):
+            return content
+        return "".join(getattr(part, "text", None) or str(part) for part in content)
+
+    @staticmethod
+    def row_count(text):
+        """Rows in a get_query result page, or None if it is not JSON."""
+        try:
+            result = json.loads(text)
+        except ValueError:
+            return None
+        if isinstance(result, list):
+            return len(result)
+        if isinstance(result, dict):
+            return result.get("row_count")
+        return None
+
+    async def run_tool(self, name, arguments):
+        """
+        Call a tool on the MCP session.
 
-        # Pretty print response with an owl character
-        print(f"\n🦉 Building a message to Claude {messages}\n{available_tools}")
-
-        # Initial Claude API call
-        response = self.anthropic.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1000,
-            messages=messages,
-            tools=available_tools,
+        Failures are returned rather than raised, so one bad query does not
+        abort the other calls of its turn.
+
+        :return: (content, is_error)
+        """
+        started = time.perf_counter()
+        with tracer.span("mcp.call_tool", tool=name):
+            try:
+                # The server continues this trace from the call's _meta
+                traceparent = tracer.traceparent()
+                if traceparent and CALL_TOOL_META:
+                    result = await self.session.call_tool(
+                        name, arguments, meta={"traceparent": traceparent}
+                    )
+                else:
+                    result = await self.session.call_tool(name, arguments)
+                content = result.content
+                # get_query reports its own failures as a "⚠️ Error" text result
+                failed = self.result_text(content).startswith("⚠️")
+                is_error = bool(getattr(result, "isError", False)) or failed
+            except Exception as e:
+                content, is_error = f"Tool {name} failed: {e}", True
+            if is_error:
+                tracer.fail(self.result_text(content)[:200])
+        self.say(
+            f"🔧 {name} finished in " f"{1000 * (time.perf_counter() - started):.0f} ms"
         )
+        return content, is_error
 
-        # Pretty print response with an owl character
-        print(f"\n🦉 Hoot hoot! Claude has spoken! Here’s the response:\n{response}")
+    async def call_tool(self, block):
+        """
+        Run one tool_use block on the MCP session.
 
-        # Process response and handle tool calls
-        final_text = []
+        :return: The tool_result content block for the block; failures are
+            marked is_error for the model.
+        """
+        content, is_error = await self.run_tool(block.name, block.input)
+        tool_result = {
+            "type": "tool_result",
+            "tool_use_id": block.id,
+            "content": content,
+        }
+        if is_error:
+            tool_result["is_error"] = True
+        return tool_result
+
+    async def answer_from_cache(self, query, stats):
+        """
+        Answer a near-duplicate of an earlier question by running its cached
+        SQL with get_query directly, skipping the model.
 
-        assistant_message_content = []
-        for content in response.content:
-            print(f"\n🦉 Content:\n{content}")
+        :param stats: Per-question dict the query, rows and tool time are added to.
+        :return: The answer text, or None on a cache miss or a failed query.
+        """
+        hit = self.question_cache.lookup(query)
+        if hit is None:
+            return None
+        sql, similarity, cached_question = hit
+        self.say(
+            f'\n♻️ Reusing SQL from "{cached_question}" '
+            f"(similarity {similarity:.2f})"
+        )
 
-            if content.type == "text":
-                final_text.append(content.text)
-                assistant_message_content.append(content)
-            elif content.type == "tool_use":
-                tool_name = content.name
-                tool_args = content.input
+        arguments = {"query": sql}
+        started = time.perf_counter()
+        content, is_error = await self.run_tool("get_query", arguments)
+        stats["tool_ms"] += 1000 * (time.perf_counter() - started)
+        if is_error:
+            return None
+        stats["question_cache"] = True
+        tracer.annotate(question_cache=True)
+        stats["sql"].append(sql)
+        stats["rows"].append(self.row_count(self.result_text(content)))
+        return "\n".join(
+            [
+                f"[Calling tool get_query with args {arguments}]",
+                self.result_text(content),
+            ]
+        )
 
-                # Execute tool call
-                result = await self.session.call_tool(tool_name, tool_args)
-                final_text.append(f"[Calling tool {tool_name} with args {tool_args}]")
+    async def prompt_generator(self):
+        """
+        Return a PromptGenerator over an up-to-date schema catalog.
 
-                assistant_message_content.append(content)
-                messages.append(
-                    {"role": "assistant", "content": assistant_message_content}
-                )
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": content.id,
-                                "content": result.content,
-                            }
-                        ],
-                    }
+        Refreshing the catalog queries the database, so it runs in a worker
+        thread rather than on the event loop, and at most once per
+        schema_refresh_seconds: questions arriving meanwhile wait for the
+        running refresh instead of starting their own.
+        """
+        async with self._prompt_lock:
+            age = time.monotonic() - self._generator_refreshed
+            if self.generator is None or age >= self.schema_refresh_seconds:
+                if self.backend is None:
+                    self.backend = DatabaseBackend.from_env()
+                self.generator = await asyncio.to_thread(
+                    PromptGenerator.from_backend, self.backend
                 )
+                self._generator_refreshed = time.monotonic()
+            return self.generator
+
+    async def generate_request(self, generator, query):
+        """generator.generate_request(query), never during a catalog refresh."""
+        async with self._prompt_lock:
+            return generator.generate_request(query)
+
+    @tracer.traced("MCPClient.process_query")
+    async def process_query(self, query: str, stats=None) -> str:
+        """Process a query using Claude and available tools
+
+        :param stats: Optional dict filled with what answering took: the SQL
+            run ("sql") and rows returned ("rows") per get_query call, the
+            model turns ("turns"), milliseconds spent building the prompt,
+            in the model and in tools ("prompt_ms", "llm_ms", "tool_ms"), and
+            whether the question cache answered ("question_cache"), and the
+            trace_id of the question's spans.
+        """
+        if stats is None:
+            stats = {}
+        span = tracer.current_span()
+        stats.update(
+            trace_id=span.trace_id if span is not None else None,
+            sql=[],
+            rows=[],
+            turns=[],
+            prompt_ms=0.0,
+            llm_ms=0.0,
+            tool_ms=0.0,
+            question_cache=False,
+        )
 
-                # Get next response from Claude
-                response = self.anthropic.messages.create(
-                    model="claude-3-5-sonnet-20241022",
-                    max_tokens=1000,
-                    messages=messages,
-                    tools=available_tools,
-                )
+        # Create a prompt based on the query to send to claude
+        # Connect to the database once and generate prompts from metadata
+        started = time.perf_counter()
+        generator = await self.prompt_generator()
+        stats["prompt_ms"] += 1000 * (time.perf_counter() - started)
+
+        if self.question_cache is not None:
+            # Cached SQL is only valid for the schema it was written against
+            self.question_cache.validate(generator.catalog.fingerprint())
+            answer = await self.answer_from_cache(query, stats)
+            if answer is not None:
+                return answer
+
+        # Stable prefix (tools, then the schema as a system block) marked for
+        # prompt caching; only the question changes between requests
+        started = time.perf_counter()
+        system_text, prompt = await self.generate_request(generator, query)
+        stats["prompt_ms"] += 1000 * (time.perf_counter() - started)
+        system = None
+        if system_text:
+            system = [
+                {
+                    "type": "text",
+                    "text": system_text,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+
+        # Create the message to send to the LLM
+        messages = [{"role": "user", "content": prompt}]
 
-                # Pretty print response with an owl character
-                print(f"\n🦉:\n{response.content[0].text}")
+        available_tools = await self.list_tools()
 
-                final_text.append(response.content[0].text)
+        # Pretty print response with an owl character
+        self.say(f"\n🦉 Building a message to Claude {messages}")
+
+        # Tool loop: every tool_use block of a turn runs concurrently and all
+        # results go back in one message, until the model stops asking.
+        final_text = []
+        executed = set()
+        for turn in range(1, self.max_turns + 1):
+            response = await self.stream_message(
+                messages, available_tools, system, stats
+            )
+
+            # Pretty print response with an owl character
+            self.say(
+                f"\n🦉 Hoot hoot! Claude has spoken! "
+                f"(turn {turn}, {response.stop_reason})"
+            )
+
+            final_text.extend(
+                block.text for block in response.content if block.type == "text"
+            )
+            tool_uses = [
+                block for block in response.content if block.type == "tool_use"
+            ]
+            if response.stop_reason != "tool_use" or not tool_uses:
+                break
+
+            final_text.extend(
+                f"[Calling tool {block.name} with args {block.input}]"
+                for block in tool_uses
+            )
+
+            messages.append({"role": "assistant", "content": response.content})
+            started = time.perf_counter()
+            tool_results = await asyncio.gather(
+                *(self.call_tool(block) for block in tool_uses)
+            )
+            stats["tool_ms"] += 1000 * (time.perf_counter() - started)
+            messages.append({"role": "user", "content": list(tool_results)})
+
+            for block, tool_result in zip(tool_uses, tool_results):
+                if (
+                    block.name == "get_query"
+                    and block.input.get("query")
+                    and not tool_result.get("is_error")
+                ):
+                    executed.add(block.input["query"])
+                    stats["sql"].append(block.input["query"])
+                    stats["rows"].append(
+                        self.row_count(self.result_text(tool_result["content"]))
+                    )
+        else:
+            final_text.append(f"[Stopped after {self.max_turns} turns]")
+
+        # Only a question answered by a single query maps cleanly to SQL
+        if self.question_cache is not None and len(executed) == 1:
+            self.question_cache.store(query, executed.pop())
 
         return "\n".join(final_text)
 
+    @staticmethod
+    def print_histograms():
+        """Print the latency histogram of every span recorded in this process."""
+        for name, histogram in tracer.histograms().items():
+            print(
+                f"📊 {name}: {histogram['count']} spans "
+                f"({histogram['errors']} failed), "
+                f"mean {histogram['mean_ms']:.1f} ms, "
+                f"p50 <= {histogram['p50_ms']:g} ms, "
+                f"p95 <= {histogram['p95_ms']:g} ms, "
+                f"max {histogram['max_ms']:.1f} ms"
+            )
+        print(f"💾 Written to {tracer.dump_histograms()}")
+
     async def chat_loop(self):
         """Run an interactive chat loop"""
         print("\nMCP Client Started!")
-        print("Type your queries or 'quit' to exit.")
+        print("Type your queries, 'stats' for latency histograms, or 'quit' to exit.")
 
         while True:
             try:
@@ -146,6 +463,10 @@ class MCPClient:
                 if query.lower() == "quit":
                     break
 
+                if query.lower() == "stats":
+                    self.print_histograms()
+                    continue
+
                 response = await self.process_query(query)
                 print("\n" + response)
 
@@ -155,6 +476,10 @@ class MCPClient:
 
     async def cleanup(self):
         """Clean up resources"""
+        if self.backend is not None:
+            self.backend.close()
+        if self.question_cache is not None:
+            await asyncio.to_thread(self.question_cache.flush)
         await self.exit_stack.aclose()
 
 
@@ -0,0 +1,449 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from server.SchemaIndex import tokenize
+
+# Words that do not change which SQL answers a question.
+STOPWORDS = {
+    "a",
+    "an",
+    "and",
+    "are",
+    "by",
+    "did",
+    "do",
+    "does",
+    "for",
+    "from",
+    "get",
+    "give",
+    "how",
+    "in",
+    "is",
+    "last",
+    "list",
+    "me",
+    "of",
+    "on",
+    "past",
+    "please",
+    "s",
+    "show",
+    "tell",
+    "the",
+    "this",
+    "to",
+    "was",
+    "what",
+    "which",
+    "who",
+    "with",
+}
+
+# Tokens that change the answer however similar the rest of the question
+# is; a hit requires them to match exactly.
+CONSTRAINT_WORDS = {
+    "today",
+    "yesterday",
+    "hour",
+    "hours",
+    "day",
+    "days",
+    "week",
+    "weeks",
+    "month",
+    "months",
+    "quarter",
+    "year",
+    "years",
+    "daily",
+    "weekly",
+    "monthly",
+    "yearly",
+    "first",
+    "new",
+    "least",
+    "most",
+    "top",
+    "bottom",
+    "average",
+    "count",
+    "many",
+    "total",
+}
+
+# Words that name the same thing in a question, mapped to one spelling so
+# "top hits" and "top songs" share features.
+SYNONYMS = {
+    "hit": "song",
+    "track": "song",
+    "tune": "song",
+    "record": "album",
+    "lps": "album",
+    "band": "artist",
+    "act": "artist",
+    "musician": "artist",
+    "djs": "host",
+    "spin": "play",
+    "played": "play",
+}
+
+# What a question counts or lists; questions about different subjects never
+# share SQL, so "top albums" never reuses "top songs".
+SUBJECTS = {"song", "album", "artist", "label", "host", "program", "genre", "play"}
+
+# Runs of capitalized words, e.g. "Bob Mould" or "The Beths".
+CAPITALIZED_SPAN = re.compile(r"\b[A-Z][\w&.'-]*(?:\s+[A-Z][\w&.'-]*)*")
+
+# SQL comments, double-quoted identifiers and single-quoted string literals;
+# group 1 is the body of a string literal.
+SQL_TOKEN = re.compile(
+    r"""--[^\n]*|/\*.*?\*/|"(?:[^"]|"")*"|'((?:[^'\\]|''|\\.)*)'""", re.DOTALL
+)
+
+ENTITY = "qcentity"
+
+
+class CachedQuestion:
+    def __init__(self, question, sql, entities, hits=0, last_used=None):
+        self.question = question
+        self.sql = sql
+        self.entities = entities
+        self.hits = hits
+        self.last_used = last_used or time.time()
+        self.masked = QuestionCache.mask(question, entities)
+        self.vector = QuestionCache.vectorize(self.masked)
+        self.constraints = QuestionCache.constraints(self.masked)
+        self.subjects = QuestionCache.subjects(self.masked)
+
+    def to_json(self):
+        return {
+            "question": self.question,
+            "sql": self.sql,
+            "entities": self.entities,
+            "hits": self.hits,
+            "last_used": self.last_used,
+        }
+
+
+class QuestionCache:
+    """
+    Offline semantic cache from questions to the SQL that answered them.
+
+    Questions are compared as bags of word and character-trigram features
+    with cosine similarity, after stopwords are dropped, plurals and
+    synonyms such as "hits" for "songs" are folded, and entity names are
+    masked. A lookup only hits when the similarity clears the threshold and
+    the questions agree on constraint words such as time ranges, numbers
+    and "new", so "top songs this week" never reuses "top songs this month",
+    and on their subject, so "top albums" never reuses "top songs".
+
+    Entities are the capitalized names in a question that are exactly the
+    value of a string literal in its SQL, e.g. 'The Beths' or '%Bob Mould%'.
+    A hit whose question names different entities gets those literals
+    replaced; the rest of the SQL is never touched.
+
+    The cache is LRU-bounded, persisted to JSON shortly after it changes on
+    a timer thread, and cleared whenever the schema fingerprint it was
+    built against changes.
+    """
+
+    def __init__(self, path=None, threshold=None, max_entries=None, save_delay=None):
+        """
+        :param path: JSON file (QUESTION_CACHE_PATH, default
+            $LOG_PATH/logs/question_cache.json). Pass False to disable persistence.
+        :param threshold: Minimum cosine similarity for a hit
+            (QUESTION_CACHE_THRESHOLD, default 0.9).
+        :param max_entries: Entries kept (QUESTION_CACHE_ENTRIES, default 500).
+        :param save_delay: Seconds to wait after a change before saving, so a
+            burst of hits is written once (QUESTION_CACHE_SAVE_DELAY, default 1).
+        """
+        if path is None:
+            path = os.getenv(
+                "QUESTION_CACHE_PATH",
+                os.path.join(
+                    os.environ.get("LOG_PATH", "/tmp"), "logs", "question_cache.json"
+                ),
+            )
+        self.path = path
+        self.threshold = float(
+            threshold
+            if threshold is not None
+            else os.getenv("QUESTION_CACHE_THRESHOLD", 0.9)
+        )
+        self.max_entries = int(
+            max_entries
+            if max_entries is not None
+            else os.getenv("QUESTION_CACHE_ENTRIES", 500)
+        )
+        self.save_delay = float(
+            save_delay
+            if save_delay is not None
+            else os.getenv("QUESTION_CACHE_SAVE_DELAY", 1)
+        )
+        self.fingerprint = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._save_timer = None
+        # masked question -> CachedQuestion, least recently used first
+        self._entries = OrderedDict()
+        self._load()
+
+    @staticmethod
+    def entity_spans(question):
+        """
+        Capitalized names in a question, without possessives. Spans made
+        only of stopwords or constraint words, like a leading "What" or
+        "Top", are skipped; any other span is kept whole, so "The Beths"
+        stays "The Beths".
+        """
+        spans = []
+        for match in CAPITALIZED_SPAN.finditer(question):
+            span = re.sub(r"'s?$", "", match.group(0))
+            if any(
+                word not in STOPWORDS and word not in CONSTRAINT_WORDS
+                for word in tokenize(span)
+            ):
+                spans.append(span)
+        return spans
+
+    @staticmethod
+    def contains(text, span):
+        """Whether a span occurs in a text as whole words, ignoring case."""
+        return bool(re.search(rf"(?<!\w){re.escape(span)}(?!\w)", text, re.IGNORECASE))
+
+    @staticmethod
+    def mask(question, entities):
+        """Replace each entity in a question with a placeholder word."""
+        for entity in sorted(entities, key=len, reverse=True):
+            question = re.sub(
+                rf"(?<!\w){re.escape(entity)}(?!\w)",
+                ENTITY,
+                question,
+                flags=re.IGNORECASE,
+            )
+        return question
+
+    @staticmethod
+    def canonical(word):
+        """A word without a plural "s", with synonyms folded to one spelling."""
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        return SYNONYMS.get(word, word)
+
+    @classmethod
+    def words(cls, text):
+        """Canonical words of a question, without stopwords."""
+        return [cls.canonical(word) for word in tokenize(text) if word not in STOPWORDS]
+
+    @classmethod
+    def vectorize(cls, text):
+        """Word and character-trigram counts of a question's canonical words."""
+        words = cls.words(text)
+        vector = Counter(words)
+        for word in words:
+            padded = f" {word} "
+            vector.update(padded[i : i + 3] for i in range(len(padded) - 2))
+        return vector
+
+    @staticmethod
+    def constraints(text):
+        """Words and numbers that must match for two questions to share SQL."""
+        return frozenset(
+            word
+            for word in tokenize(text)
+            if word in CONSTRAINT_WORDS or word.isdigit()
+        )
+
+    @classmethod
+    def subjects(cls, text):
+        """What a question counts or lists, e.g. songs or artists."""
+        return frozenset(word for word in cls.words(text) if word in SUBJECTS)
+
+    @staticmethod
+    def literals(sql):
+        """
+        String literals of a SQL statement.
+
+        :return: List of (start, end, body) spans, body with '' unescaped.
+        """
+        return [
+            (match.start(), match.end(), match.group(1).replace("''", "'"))
+            for match in SQL_TOKEN.finditer(sql)
+            if match.group(1) is not None
+        ]
+
+    @staticmethod
+    def literal_value(body):
+        """A literal's value without LIKE wildcards around it, lowercased."""
+        return body.strip("%").lower()
+
+    @staticmethod
+    def similarity(a, b):
+        """Cosine similarity of two feature Counters."""
+        if not a or not b:
+            return 0.0
+        dot = sum(count * b.get(feature, 0) for feature, count in a.items())
+        norm_a = math.sqrt(sum(v * v for v in a.values()))
+        norm_b = math.sqrt(sum(v * v for v in b.values()))
+        return dot / (norm_a * norm_b)
+
+    def validate(self, fingerprint):
+        """
+        Drop every entry if the schema fingerprint differs from the one the
+        cache was built against.
+
+        :return: True if the cache was cleared.
+        """
+        with self._lock:
+            if fingerprint == self.fingerprint:
+                return False
+            cleared = bool(self._entries)
+            self._entries.clear()
+            self.fingerprint = fingerprint
+        self._schedule_save()
+        return cleared
+
+    def lookup(self, question):
+        """
+        Find SQL for a question similar to one answered before.
+
+        Capitalized names in the question that the cached question does not
+        already contain are treated as its entities; there must be as many
+        as the cached question has.
+
+        :return: (sql, similarity, cached question) or None on a miss.
+        """
+        spans = self.entity_spans(question)
+        features = {}
+
+        with self._lock:
+            best, best_entities, best_score = None, None, 0.0
+            for entry in self._entries.values():
+                entities = tuple(
+                    span for span in spans if not self.contains(entry.masked, span)
+                )
+                if len(entities) != len(entry.entities):
+                    continue
+                if entities not in features:
+                    masked = self.mask(question, entities)
+                    features[entities] = (
+                        self.vectorize(masked),
+                        self.constraints(masked),
+                        self.subjects(masked),
+                    )
+                vector, constraints, subjects = features[entities]
+                if constraints != entry.constraints or subjects != entry.subjects:
+                    continue
+                score = self.similarity(vector, entry.vector)
+                if score > best_score:
+                    best, best_entities, best_score = entry, entities, score
+            if best is None or best_score < self.threshold:
+                return None
+
+            best.hits += 1
+            best.last_used = time.time()
+            self._entries.move_to_end(best.masked)
+        self._schedule_save()
+        sql = self.substitute(best.sql, best.entities, best_entities)
+        return sql, best_score, best.question
+
+    @classmethod
+    def substitute(cls, sql, old_entities, new_entities):
+        """
+        Replace every string literal whose value is an old entity, ignoring
+        case, with the new entity in the same position. LIKE wildcards
+        around the value are kept.
+        """
+        replacements = {
+            old.lower(): new
+            for old, new in zip(old_entities, new_entities)
+            if old.lower() != new.lower()
+        }
+        if not replacements:
+            return sql
+
+        parts = []
+        position = 0
+        for start, end, body in cls.literals(sql):
+            new = replacements.get(cls.literal_value(body))
+            if new is None:
+                continue
+            prefix = body[: len(body) - len(body.lstrip("%"))]
+            suffix = body[len(body.rstrip("%")) :]
+            value = (prefix + new + suffix).replace("'", "''")
+            parts.append(f"{sql[position:start]}'{value}'")
+            position = end
+        parts.append(sql[position:])
+        return "".join(parts)
+
+    def store(self, question, sql):
+        """Remember the SQL that successfully answered a question."""
+        values = {self.literal_value(body) for _, _, body in self.literals(sql)}
+        entities = [
+            span for span in self.entity_spans(question) if span.lower() in values
+        ]
+        entry = CachedQuestion(question, sql, entities)
+        with self._lock:
+            self._entries.pop(entry.masked, None)
+            self._entries[entry.masked] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._schedule_save()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+            self.fingerprint = data.get("fingerprint")
+            for item in data.get("entries", []):
+                entry = CachedQuestion(**item)
+                self._entries[entry.masked] = entry
+        except (OSError, ValueError, TypeError):
+            self.fingerprint = None
+            self._entries.clear()
+
+    def _schedule_save(self):
+        """Save on a timer thread, folding the changes made meanwhile in."""
+        if not self.path:
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write pending changes to disk now."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+        self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "fingerprint": self.fingerprint,
+                "entries": [entry.to_json() for entry in self._entries.values()],
+            }
+        with self._write_lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(data, cache_file)
+            os.replace(temp_path, self.path)
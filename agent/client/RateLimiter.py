@@ -0,0 +1,27 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    Spaces out async calls evenly so that no more than a given number start
+    per minute, however many coroutines are waiting.
+    """
+
+    def __init__(self, per_minute):
+        """
+        :param per_minute: Calls allowed to start per minute.
+        """
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.interval = 60.0 / per_minute
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        """Wait until the caller's slot comes up."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        # Reserve the slot before sleeping so concurrent callers queue up
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
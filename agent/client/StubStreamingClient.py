@@ -0,0 +1,155 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+
+class StubMessageStream:
+    """
+    Async context manager mimicking the SDK's message stream: iterating it
+    yields "text" events word by word and a "content_block_stop" event per
+    finished block, then get_final_message() returns the whole message.
+    """
+
+    def __init__(self, blocks, first_token_delay, token_delay, usage=None):
+        self.blocks = blocks
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.usage = usage or SimpleNamespace(input_tokens=0, output_tokens=0)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.first_token_delay)
+        for block in self.blocks:
+            if block.type == "text":
+                words = block.text.split(" ")
+                for i, word in enumerate(words):
+                    if i:
+                        await asyncio.sleep(self.token_delay)
+                    yield SimpleNamespace(
+                        type="text", text=word if i == 0 else " " + word
+                    )
+            else:
+                await asyncio.sleep(self.token_delay)
+            yield SimpleNamespace(type="content_block_stop", content_block=block)
+
+    async def get_final_message(self):
+        tool_use = any(block.type == "tool_use" for block in self.blocks)
+        return SimpleNamespace(
+            role="assistant",
+            content=self.blocks,
+            stop_reason="tool_use" if tool_use else "end_turn",
+            usage=self.usage,
+        )
+
+
+class StubStreamingClient:
+    """
+    Offline stand-in for AsyncAnthropic, enabled in MCPClient with LLM_STUB=true.
+
+    The first turn of a question answers with a sentence and one get_query
+    tool call per stub query; once tool results are in the conversation it
+    answers with a summary quoting them. Tokens arrive with configurable delays,
+    so streaming and the per-turn latency measurements can be exercised
+    without an API key.
+
+    Usage mimics prompt caching: the tools and system prompt are counted
+    as a cache write the first time that exact prefix is seen and as a
+    cache read afterwards.
+    """
+
+    def __init__(
+        self,
+        sql=(
+            "SELECT artist, song FROM import_kexp_playlist "
+            "ORDER BY airdate DESC LIMIT 10"
+        ),
+        first_token_delay=0.2,
+        token_delay=0.02,
+    ):
+        """
+        :param sql: Query, or list of queries, the stub asks get_query to run
+            in a single turn.
+        :param first_token_delay: Seconds before the first event of a turn.
+        :param token_delay: Seconds between later events.
+        """
+        self.sql = sql
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.calls = 0
+        self.messages = self
+        self.cached_prefixes = set()
+
+    @staticmethod
+    def estimate_tokens(value):
+        """Rough token count of a request part (about four characters per token)."""
+        return len(json.dumps(value, default=str)) // 4 + 1
+
+    def _usage(self, system, tools, messages, blocks):
+        prefix = json.dumps([tools, system], default=str, sort_keys=True)
+        prefix_tokens = self.estimate_tokens([tools, system]) if system or tools else 0
+        cached = prefix in self.cached_prefixes
+        self.cached_prefixes.add(prefix)
+        return SimpleNamespace(
+            input_tokens=self.estimate_tokens(messages),
+            cache_read_input_tokens=prefix_tokens if cached else 0,
+            cache_creation_input_tokens=0 if cached else prefix_tokens,
+            output_tokens=sum(
+                self.estimate_tokens(getattr(block, "text", block.__dict__))
+                for block in blocks
+            ),
+        )
+
+    @staticmethod
+    def _tool_results(messages):
+        """Texts of the tool results in the last user message."""
+        content = messages[-1]["content"] if messages else ""
+        if isinstance(content, str):
+            return []
+        results = []
+        for block in content:
+            if isinstance(block, dict) and block.get("type") == "tool_result":
+                parts = block.get("content") or []
+                if isinstance(parts, str):
+                    results.append(parts)
+                else:
+                    texts = (getattr(part, "text", None) or str(part) for part in parts)
+                    results.append("".join(texts))
+        return results
+
+    def stream(
+        self, model=None, max_tokens=None, messages=(), tools=(), system=None, **kwargs
+    ):
+        """Return a StubMessageStream for the next turn of the conversation."""
+        self.calls += 1
+        results = self._tool_results(messages)
+        if not results:
+            queries = [self.sql] if isinstance(self.sql, str) else list(self.sql)
+            blocks = [
+                SimpleNamespace(
+                    type="text", text="Let me look that up in the playlist data."
+                )
+            ] + [
+                SimpleNamespace(
+                    type="tool_use",
+                    id=f"toolu_stub_{self.calls}_{i}",
+                    name="get_query",
+                    input={"query": query},
+                )
+                for i, query in enumerate(queries)
+            ]
+        else:
+            text = "Here is what the database returned: " + " | ".join(
+                result[:200] for result in results
+            )
+            blocks = [SimpleNamespace(type="text", text=text)]
+        return StubMessageStream(
+            blocks,
+            self.first_token_delay,
+            self.token_delay,
+            self._usage(system, tools, messages, blocks),
+        )
@@ -0,0 +1,100 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ArrowFetcher:
+    """
+    Decodes a query's result batches into Arrow tables on a thread pool.
+
+    A result batch is any object with a to_arrow() method returning a
+    pyarrow.Table, such as the ResultBatch objects from Snowflake's
+    cursor.get_result_batches(). Downloading and decoding a batch happen
+    outside the GIL, so batches decode in parallel, while results are
+    always handed back in query order.
+
+    Decoded tables are never copied: to_table() concatenates them as
+    chunks and iter_batches() yields their record batches as they are.
+    """
+
+    outputs = ("table", "pandas", "batches")
+
+    def __init__(self, workers=None, prefetch=None):
+        """
+        :param workers: Batches decoded at once; ARROW_FETCH_WORKERS, default 4.
+        :param prefetch: Batches decoded ahead of the consumer when streaming;
+            twice the worker count by default.
+        """
+        self.workers = workers or int(os.getenv("ARROW_FETCH_WORKERS", "4"))
+        self.prefetch = max(prefetch or 2 * self.workers, 1)
+
+    @staticmethod
+    def _pyarrow():
+        try:
+            import pyarrow
+        except ImportError:
+            raise ValueError("Arrow fetching requires the pyarrow package.")
+        return pyarrow
+
+    def iter_tables(self, result_batches):
+        """
+        Yield one decoded pyarrow.Table per result batch, in order.
+
+        At most `prefetch` batches are held in memory ahead of the consumer.
+        """
+        result_batches = iter(result_batches or ())
+        if self.workers == 1:
+            for batch in result_batches:
+                yield batch.to_arrow()
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            try:
+                for batch in result_batches:
+                    pending.append(executor.submit(batch.to_arrow))
+                    if len(pending) >= self.prefetch:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def iter_batches(self, result_batches):
+        """Yield pyarrow.RecordBatch objects without copying the decoded data."""
+        for table in self.iter_tables(result_batches):
+            yield from table.to_batches()
+
+    def to_table(self, result_batches, schema=None):
+        """
+        Decode every batch and return a single pyarrow.Table.
+
+        :param schema: Schema for an empty result; the first batch's otherwise.
+        """
+        pa = self._pyarrow()
+        tables = [t for t in self.iter_tables(result_batches) if t.num_columns]
+        if not tables:
+            return (schema or pa.schema([])).empty_table()
+        if len(tables) == 1:
+            return tables[0]
+        return pa.concat_tables(tables, promote_options="permissive")
+
+    def fetch(self, result_batches, output="table"):
+        """
+        Decode result batches into the requested output.
+
+        :param output: "table" for a pyarrow.Table, "pandas" for a DataFrame,
+            or "batches" for an iterator of pyarrow.RecordBatch.
+        """
+        if output not in self.outputs:
+            raise ValueError(
+                f"Unknown output '{output}', expected one of {', '.join(self.outputs)}"
+            )
+        self._pyarrow()
+        if output == "batches":
+            return self.iter_batches(result_batches)
+        table = self.to_table(result_batches)
+        if output == "pandas":
+            return table.to_pandas()
+        return table
@@ -1,31 +1,125 @@
+import glob
+import io
+import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import pandas as pd
 import psycopg2
 import argparse
 from PostgresConnector import PostgresConnector
+from LoadMetadata import LoadMetadata
+from TypeInference import TypeInference
 import os
 
+# How COPY mode writes timestamps; %z is empty for values without an offset.
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+
 
 class CSVUploader:
-    def __init__(self, connection):
+    modes = ("copy", "insert")
+
+    # Column that drives incremental loads.
+    time_column = "AIRDATE"
+
+    def __init__(
+        self,
+        connection,
+        mode="copy",
+        batch_size=50000,
+        type_inference=None,
+        sample_rows=10000,
+    ):
+        """
+        :param connection: A database connection object.
+        :param mode: "copy" streams rows with COPY ... FROM STDIN; "insert" is
+            the row-at-a-time fallback.
+        :param batch_size: Rows read, written and committed per chunk.
+        :param type_inference: TypeInference holding per-table type overrides.
+        :param sample_rows: Rows sampled to infer column types for new tables.
+        """
+        if mode not in self.modes:
+            raise ValueError(f"Unknown upload mode '{mode}'")
         self.connection = connection
+        self.mode = mode
+        self.batch_size = batch_size
+        self.type_inference = type_inference or TypeInference()
+        self.sample_rows = sample_rows
+        self.metadata = LoadMetadata()
+
+    # Compression suffixes pandas can stream-decompress while reading.
+    compression_suffixes = (".gz", ".zst", ".bz2", ".xz", ".zip")
+
+    @classmethod
+    def table_name_for(cls, file_path):
+        """Derive the target table from the file name, ignoring compression suffixes."""
+        name = os.path.basename(file_path)
+        for suffix in cls.compression_suffixes:
+            if name.lower().endswith(suffix):
+                name = name[: -len(suffix)]
+                break
+        return os.path.splitext(name)[0].upper()
+
+    @staticmethod
+    def read_header(file_path):
+        """Read only the column names from a (possibly compressed) CSV file."""
+        return list(pd.read_csv(file_path, nrows=0, compression="infer").columns)
+
+    def existing_column_types(self, table_name):
+        """Return {COLUMN: type} for an existing table, or None if it does not exist."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT column_name, data_type FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = %s
+                    ORDER BY ordinal_position;
+                    """,
+                    (table_name.lower(),),
+                )
+                rows = cursor.fetchall()
+        finally:
+            self.connection.rollback()
+        if not rows:
+            return None
+        return {
+            column.upper(): TypeInference.from_postgres(data_type)
+            for column, data_type in rows
+        }
 
-    def create_table_from_csv(self, file_path):
+    def infer_column_types(self, file_path, table_name, columns):
+        """
+        Decide column types for a file: the existing table's types if it
+        exists, otherwise types inferred from a sample of the file. Type
+        overrides apply in both cases.
+        """
+        existing = self.existing_column_types(table_name)
+        if existing is None:
+            sample = pd.read_csv(
+                file_path, dtype=str, nrows=self.sample_rows, compression="infer"
+            )
+            return self.type_inference.infer(table_name, sample)
+
+        overrides = self.type_inference.column_overrides(table_name)
+        return {
+            column: overrides.get(column) or existing.get(column.upper(), "TEXT")
+            for column in columns
+        }
+
+    def create_table_from_csv(
+        self, file_path, columns=None, table_name=None, column_types=None
+    ):
         """Creates a table based on the CSV file's first row (column names)."""
-        table_name = os.path.splitext(os.path.basename(file_path))[0].upper()
-        df = pd.read_csv(file_path)
-
-        # Get column names and types (assuming text type for simplicity)
-        columns = df.columns
-        columns_type = []
-        for column in columns:
-            if column == "AIRDATE":
-                columns_type.append(f"{column} TIMESTAMP")
-            elif column == "RELEASE_DATE":
-                columns_type.append(f"{column} TEXT")
-            else:
-                columns_type.append(f"{column} TEXT")
+        table_name = table_name or self.table_name_for(file_path)
+        if columns is None:
+            columns = self.read_header(file_path)
+        if column_types is None:
+            column_types = self.infer_column_types(file_path, table_name, columns)
+
+        # Get column names and their inferred (or overridden) types
+        columns_type = [
+            f"{column} {column_types.get(column, 'TEXT')}" for column in columns
+        ]
 
         column_definitions = ", ".join(columns_type)
 
@@ -46,80 +140,443 @@ class CSVUploader:
 
         return table_name
 
-    def upload_csv(self, file_path):
-        """Uploads the CSV file to the corresponding table only if AIRDATE is greater than the max airdate."""
-        table_name = self.create_table_from_csv(file_path)
-        df = pd.read_csv(
+    def read_chunks(self, file_path, column_types):
+        """
+        Stream the CSV in batch_size chunks, converting each chunk to the
+        table's column types.
+
+        Compressed inputs (.gz, .zst, ...) are decompressed as a stream.
+        """
+        reader = pd.read_csv(
             file_path,
             dtype=str,
-            parse_dates=["AIRDATE"],
-            date_format="%Y-%m-%d %H:%M:%S",
+            chunksize=self.batch_size,
+            compression="infer",
         )
+        for chunk in reader:
+            failures = TypeInference.convert(chunk, column_types)
+            for column, count in failures.items():
+                print(
+                    f"⚠️ {count} values in {column} did not parse as "
+                    f"{column_types[column]} and were loaded as NULL."
+                )
+            yield chunk
 
-        # Get max AIRDATE from the existing table
-        max_airdate_query = f"SELECT MAX(airdate) FROM {table_name}"
+    def ensure_time_index(self, cursor, table_name):
+        """Index the time column so boundary lookups and time filters use it."""
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {table_name}_{self.time_column}_idx "
+            f"ON {table_name} ({self.time_column});"
+        )
+
+    def boundary_hashes(self, df, at):
+        """Content hashes of the rows whose time column equals `at`."""
+        rows = df[df[self.time_column] == at]
+        rows = rows.astype(object).where(rows.notna(), None)
+        return {
+            self.metadata.row_hash(row)
+            for row in rows.itertuples(index=False, name=None)
+        }
+
+    @staticmethod
+    def naive_times(values, time_zone):
+        """
+        Timestamps without an offset, as a timestamp column stores them.
+
+        Offset timestamps are converted to the session time zone first, as
+        Postgres does when a timestamptz value lands in a timestamp column,
+        so they compare with the naive watermark and hash like the rows read
+        back. Accepts a Series or a single value; naive input is unchanged.
+        """
+        if isinstance(values, pd.Series):
+            if not isinstance(values.dtype, pd.DatetimeTZDtype):
+                return values
+            try:
+                return values.dt.tz_convert(time_zone).dt.tz_localize(None)
+            except (KeyError, ValueError, TypeError):
+                # A zone pandas does not know
+                return values.dt.tz_convert("UTC").dt.tz_localize(None)
+
+        value = pd.Timestamp(values)
+        if value.tzinfo is None:
+            return value
+        try:
+            return value.tz_convert(time_zone).tz_localize(None)
+        except (KeyError, ValueError, TypeError):
+            return value.tz_convert("UTC").tz_localize(None)
+
+    def read_watermark(self, cursor, table_name, columns):
+        """
+        Return (watermark, boundary_hashes) for a table.
+
+        Normally a single lookup in the metadata table. Tables loaded before
+        watermarks were recorded are bootstrapped once from MAX() over the
+        (now indexed) time column and the rows at that timestamp.
+        """
+        recorded = self.metadata.get_watermark(cursor, table_name)
+        if recorded is not None:
+            return recorded
+
+        cursor.execute(f"SELECT MAX({self.time_column}) FROM {table_name}")
+        max_airdate = cursor.fetchone()[0]
+        if max_airdate is None:
+            return None, set()
+
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM {table_name} WHERE {self.time_column} = %s",
+            (max_airdate,),
+        )
+        return max_airdate, {self.metadata.row_hash(row) for row in cursor.fetchall()}
+
+    def upload_csv(self, file_path, table_name=None):
+        """
+        Uploads the CSV file to the corresponding table only if AIRDATE is greater than the max airdate.
+
+        Rows at exactly the watermark are loaded unless a row with the same
+        content was loaded before, so re-running the same file is a no-op.
+
+        :param table_name: Target table; defaults to one derived from the file name.
+        :return: Load statistics: table, rows read and inserted, seconds, and error if any.
+        """
+        columns = self.read_header(file_path)
+        table_name = table_name or self.table_name_for(file_path)
+        column_types = self.infer_column_types(file_path, table_name, columns)
+        self.create_table_from_csv(file_path, columns, table_name, column_types)
+        stats = {"table": table_name, "read": 0, "inserted": 0, "seconds": 0.0}
+        incremental = self.time_column in columns
 
         try:
             with self.connection.cursor() as cursor:
-                cursor.execute(max_airdate_query)
-                max_airdate = cursor.fetchone()[0]  # Get the max AIRDATE
+                self.metadata.ensure_table(cursor)
+                watermark, seen_hashes = None, set()
+                if incremental:
+                    self.ensure_time_index(cursor, table_name)
+                    watermark, seen_hashes = self.read_watermark(
+                        cursor, table_name, columns
+                    )
+                self.connection.commit()
+                time_zone = self.connection.get_parameter_status("TimeZone") or "UTC"
 
-                if max_airdate is None:
+                if watermark is None:
                     print(f"No existing data in {table_name}, inserting all rows.")
                 else:
-                    print(f"Max airdate in table: {max_airdate}")
+                    print(f"Watermark for {table_name}: {watermark}")
+                    watermark = self.naive_times(watermark, time_zone)
 
-                # Filter rows where AIRDATE is greater than the max_airdate
-                if max_airdate is not None:
-                    max_airdate = pd.to_datetime(
-                        max_airdate
-                    )  # Convert string to Timestamp
+                # Running watermark, advanced as chunks are committed
+                new_watermark, new_hashes = watermark, set(seen_hashes)
 
-                    # Convert DataFrame AIRDATE column to datetime for proper comparison
-                    df["AIRDATE"] = pd.to_datetime(df["AIRDATE"], errors="coerce")
+                started = time.perf_counter()
+                read_rows = 0
+                inserted = 0
+                for chunk in self.read_chunks(file_path, column_types):
+                    read_rows += len(chunk)
+                    if incremental:
+                        chunk[self.time_column] = self.naive_times(
+                            chunk[self.time_column], time_zone
+                        )
 
-                    existing = df["AIRDATE"]
-                    print(f"Filtering airdate {existing} to {max_airdate}")
-                    df = df[df["AIRDATE"] > max_airdate]
+                    if incremental and watermark is not None:
+                        # Keep rows after the watermark (vectorized), plus rows
+                        # at the watermark not loaded before.
+                        times = chunk[self.time_column]
+                        keep = times > watermark
+                        at_boundary = times == watermark
+                        if at_boundary.any():
+                            boundary = chunk[at_boundary]
+                            boundary = boundary.astype(object).where(
+                                boundary.notna(), None
+                            )
+                            unseen = [
+                                self.metadata.row_hash(row) not in seen_hashes
+                                for row in boundary.itertuples(index=False, name=None)
+                            ]
+                            keep[at_boundary] = unseen
+                        chunk = chunk[keep]
+                    if chunk.empty:
+                        continue
 
-                if df.empty:
-                    print("No new records to insert.")
-                    return
+                    if self.mode == "copy":
+                        self._copy_rows(cursor, table_name, chunk)
+                    else:
+                        self._insert_rows(cursor, table_name, chunk)
 
-                # Prepare the INSERT statement
-                placeholders = ", ".join(["%s"] * len(df.columns))
-                insert_query = f"INSERT INTO {table_name} VALUES ({placeholders})"
+                    if incremental:
+                        chunk_max = chunk[self.time_column].max()
+                        if pd.notna(chunk_max):
+                            if new_watermark is None or chunk_max > new_watermark:
+                                new_watermark = chunk_max
+                                new_hashes = self.boundary_hashes(chunk, chunk_max)
+                            elif chunk_max == new_watermark:
+                                new_hashes |= self.boundary_hashes(chunk, chunk_max)
+                            self.metadata.set_watermark(
+                                cursor,
+                                table_name,
+                                new_watermark.to_pydatetime(),
+                                new_hashes,
+                            )
 
-                # Insert only the filtered rows
-                for row in df.itertuples(index=False, name=None):
-                    cursor.execute(insert_query, row)
+                    # Bump the table version in the same transaction so cached
+                    # query results over this table are invalidated.
+                    self.metadata.bump_version(cursor, table_name)
+                    self.connection.commit()
+                    inserted += len(chunk)
 
-                self.connection.commit()
-                print(f"Inserted {len(df)} new rows into '{table_name}'.")
+                elapsed = time.perf_counter() - started
+                stats.update(read=read_rows, inserted=inserted, seconds=elapsed)
+
+                if not inserted:
+                    print("No new records to insert.")
+                    return stats
+
+                print(
+                    f"Inserted {inserted} of {read_rows} rows into '{table_name}' in "
+                    f"{elapsed:.2f}s ({inserted / elapsed if elapsed else 0:,.0f} "
+                    f"rows/sec, mode={self.mode})."
+                )
 
         except psycopg2.Error as e:
             print(f"Error inserting data: {e}\n{traceback.format_exc()}")
             self.connection.rollback()
+            stats["error"] = str(e)
 
+        return stats
+
+    @staticmethod
+    def _insert_rows(cursor, table_name, df):
+        """Insert rows one statement at a time."""
+        placeholders = ", ".join(["%s"] * len(df.columns))
+        insert_query = f"INSERT INTO {table_name} VALUES ({placeholders})"
+
+        # Plain Python values with None for missing ones, which psycopg2 can adapt
+        df = df.astype(object).where(df.notna(), None)
+        for row in df.itertuples(index=False, name=None):
+            cursor.execute(insert_query, row)
+
+    @staticmethod
+    def _copy_rows(cursor, table_name, df):
+        """Stream rows into the table with a single COPY ... FROM STDIN."""
+        # Insert mode sends offset timestamps as timestamptz, which Postgres
+        # converts to the session time zone; COPY into a timestamp column
+        # would drop the offset instead. Convert first so both modes agree.
+        time_zone = cursor.connection.get_parameter_status("TimeZone")
+        aware = [
+            column
+            for column in df.columns
+            if isinstance(df[column].dtype, pd.DatetimeTZDtype)
+        ]
+        if time_zone and aware:
+            try:
+                df = df.assign(
+                    **{column: df[column].dt.tz_convert(time_zone) for column in aware}
+                )
+            except (KeyError, ValueError):
+                pass  # A zone pandas does not know; keep the original offsets
+
+        buffer = io.StringIO()
+        # Full ISO 8601 with microseconds and any UTC offset, so COPY loads
+        # the same values as insert mode and the boundary row hashes
+        df.to_csv(buffer, header=False, index=False, date_format=TIMESTAMP_FORMAT)
+        buffer.seek(0)
+
+        columns = ", ".join(df.columns)
+        cursor.copy_expert(
+            f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
 
-def main():
-    # Parse command-line arguments for the CSV file path
-    parser = argparse.ArgumentParser(description="Upload a CSV file to PostgreSQL.")
-    parser.add_argument("csv_file", help="Path to the CSV file to upload")
-    args = parser.parse_args()
 
-    csv_file_path = args.csv_file
+def discover_files(paths):
+    """Expand files, directories and glob patterns into a sorted list of CSV files."""
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, "*.csv*"))
+        elif glob.has_magic(path):
+            matches = glob.glob(path)
+        else:
+            matches = [path]
+        files.update(m for m in matches if os.path.isfile(m))
+    return sorted(files)
 
-    # Connect to the database
+
+def group_by_table(files, table_name=None):
+    """Group files by target table, keeping each group in file-name order."""
+    groups = {}
+    for file_path in files:
+        table = table_name or CSVUploader.table_name_for(file_path)
+        groups.setdefault(table, []).append(file_path)
+    return groups
+
+
+def load_table_files(
+    table_name,
+    files,
+    mode,
+    batch_size,
+    explicit_table,
+    types_config=None,
+    sample_rows=10000,
+):
+    """
+    Load one table's files in order on a dedicated connection.
+
+    Runs in a worker process. Files for the same table are never loaded
+    concurrently, so each load sees the previous one's AIRDATE watermark.
+    """
     connector = PostgresConnector()
     connection = connector.connect()
+    results = []
+    if not connection:
+        return [
+            {"file": f, "table": table_name, "error": "cannot connect"} for f in files
+        ]
 
-    if connection:
-        uploader = CSVUploader(connection)
-        uploader.upload_csv(csv_file_path)
+    try:
+        uploader = CSVUploader(
+            connection,
+            mode=mode,
+            batch_size=batch_size,
+            type_inference=TypeInference.from_config(types_config),
+            sample_rows=sample_rows,
+        )
+        for file_path in files:
+            try:
+                stats = uploader.upload_csv(
+                    file_path, table_name if explicit_table else None
+                )
+            except Exception as e:
+                stats = {"table": table_name, "error": str(e)}
+            stats["file"] = file_path
+            stats["bytes"] = os.path.getsize(file_path)
+            results.append(stats)
+            print(
+                f"{'❌' if 'error' in stats else '✅'} [{table_name}] {file_path}: "
+                f"{stats.get('inserted', 0)} rows"
+            )
+    finally:
         connector.close()
+    return results
+
+
+def print_summary(results, elapsed):
+    """Print per-file outcomes and aggregate throughput."""
+    failed = [r for r in results if "error" in r]
+    inserted = sum(r.get("inserted", 0) for r in results)
+    read = sum(r.get("read", 0) for r in results)
+    size = sum(r.get("bytes", 0) for r in results)
+
+    print("\nSummary:")
+    for r in sorted(results, key=lambda r: r["file"]):
+        status = f"FAILED: {r['error']}" if "error" in r else "ok"
+        print(
+            f"  {r['file']} -> {r.get('table')}: {r.get('inserted', 0)} rows, "
+            f"{r.get('seconds', 0.0):.2f}s, {status}"
+        )
+    print(
+        f"{len(results) - len(failed)} succeeded, {len(failed)} failed. "
+        f"Inserted {inserted} of {read} rows in {elapsed:.2f}s "
+        f"({inserted / elapsed if elapsed else 0:,.0f} rows/sec, "
+        f"{size / elapsed / 1e6 if elapsed else 0:,.1f} MB/sec)."
+    )
+    return not failed
+
+
+def main():
+    # Parse command-line arguments for the CSV file paths
+    parser = argparse.ArgumentParser(description="Upload CSV files to PostgreSQL.")
+    parser.add_argument(
+        "csv_files",
+        nargs="+",
+        help="CSV files, directories or glob patterns to upload",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=CSVUploader.modes,
+        default="copy",
+        help="Bulk COPY (default) or row-by-row INSERT",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=50000,
+        help="Rows read and committed per chunk; bounds peak memory",
+    )
+    parser.add_argument(
+        "--table",
+        help="Load every file into this table instead of one derived from each file name",
+    )
+    parser.add_argument(
+        "--types-config",
+        help='JSON file of per-table column type overrides, e.g. {"TABLE": {"COLUMN": "DATE"}}',
+    )
+    parser.add_argument(
+        "--sample-rows",
+        type=int,
+        default=10000,
+        help="Rows sampled to infer column types for new tables",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Tables loaded in parallel, one process and connection each",
+    )
+    args = parser.parse_args()
+
+    files = discover_files(args.csv_files)
+    if not files:
+        print(f"❌ No CSV files found in {args.csv_files}")
+        raise SystemExit(1)
+
+    groups = group_by_table(files, args.table)
+    workers = max(1, min(args.workers, len(groups)))
+    print(
+        f"Loading {len(files)} files into {len(groups)} tables with {workers} workers."
+    )
+
+    started = time.perf_counter()
+    results = []
+    if workers == 1:
+        for table, table_files in groups.items():
+            results.extend(
+                load_table_files(
+                    table,
+                    table_files,
+                    args.mode,
+                    args.batch_size,
+                    bool(args.table),
+                    args.types_config,
+                    args.sample_rows,
+                )
+            )
     else:
-        print(f"❌ Error cannot connect.")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    load_table_files,
+                    table,
+                    table_files,
+                    args.mode,
+                    args.batch_size,
+                    bool(args.table),
+                    args.types_config,
+                    args.sample_rows,
+                ): table
+                for table, table_files in groups.items()
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                table = futures[future]
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    results.extend(
+                        {"file": f, "table": table, "error": str(e)}
+                        for f in groups[table]
+                    )
+                print(f"Progress: {done}/{len(groups)} tables done ({table}).")
+
+    if not print_summary(results, time.perf_counter() - started):
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+from server.PostgresConnector import PostgresConnector
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of PostgreSQL connections owned by the server process.
+
+    Physical connections are opened through PostgresConnector, so the
+    search_path is applied once per connection rather than once per query.
+
+    Subclasses pool other drivers by overriding _open, _is_closed, _ping,
+    _reset and _close_connection.
+    """
+
+    def __init__(
+        self,
+        min_size=None,
+        max_size=None,
+        checkout_timeout=None,
+        health_check_interval=None,
+    ):
+        """
+        :param min_size: Connections opened eagerly (POSTGRES_POOL_MIN, default 1).
+        :param max_size: Upper bound on open connections (POSTGRES_POOL_MAX, default 5).
+        :param checkout_timeout: Seconds to wait for a free connection (POSTGRES_POOL_TIMEOUT, default 30).
+        :param health_check_interval: Idle seconds after which a connection is pinged
+            on checkout (POSTGRES_POOL_HEALTH_CHECK, default 30).
+        """
+        self.min_size = int(
+            min_size if min_size is not None else os.getenv("POSTGRES_POOL_MIN", 1)
+        )
+        self.max_size = int(
+            max_size if max_size is not None else os.getenv("POSTGRES_POOL_MAX", 5)
+        )
+        self.checkout_timeout = float(
+            checkout_timeout
+            if checkout_timeout is not None
+            else os.getenv("POSTGRES_POOL_TIMEOUT", 30)
+        )
+        self.health_check_interval = float(
+            health_check_interval
+            if health_check_interval is not None
+            else os.getenv("POSTGRES_POOL_HEALTH_CHECK", 30)
+        )
+        if self.max_size < 1 or self.min_size > self.max_size:
+            raise ValueError(
+                f"Invalid pool size: min={self.min_size}, max={self.max_size}"
+            )
+
+        self._lock = threading.Condition()
+        self._idle = []  # (connection, last_used) pairs, most recently used last
+        self._in_use = set()
+        self._closed = False
+
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._discarded = 0
+
+        for _ in range(self.min_size):
+            self._idle.append((self._open(), time.monotonic()))
+
+    def _open(self):
+        """Open a new physical connection with the search_path applied."""
+        connection = PostgresConnector().connect()
+        if connection is None:
+            raise psycopg2.OperationalError("Unable to open a pooled connection.")
+        return connection
+
+    @staticmethod
+    def _is_closed(connection):
+        return bool(connection.closed)
+
+    @staticmethod
+    def _ping(connection):
+        """Round-trip a trivial query; False if the connection is unusable."""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _reset(connection):
+        """
+        Roll back any open transaction so the next borrower starts clean.
+
+        :return: False if the connection should be discarded instead.
+        """
+        try:
+            status = connection.get_transaction_status()
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _close_connection(connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_healthy(self, connection, last_used):
+        """Check a connection before handing it out."""
+        if self._is_closed(connection):
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        return self._ping(connection)
+
+    def _discard(self, connection):
+        """Close a connection that is leaving the pool; call without the lock."""
+        with self._lock:
+            self._discarded += 1
+        self._close_connection(connection)
+
+    def getconn(self, timeout=None):
+        """
+        Borrow a connection from the pool, waiting if all are in use.
+
+        The lock only guards the pool's bookkeeping: a connection is taken
+        off the idle list under it, then pinged, or a new one opened, after
+        releasing it, so a slow database never blocks other borrowers.
+
+        :param timeout: Seconds to wait; defaults to the pool's checkout timeout.
+        :return: A healthy psycopg2 connection.
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            with self._lock:
+                while True:
+                    if self._closed:
+                        raise PoolTimeoutError("Connection pool is closed.")
+
+                    if self._idle:
+                        connection, last_used = self._idle.pop()
+                        # Counts against max_size while it is checked
+                        self._in_use.add(connection)
+                        break
+
+                    if len(self._in_use) < self.max_size:
+                        # Reserve the slot before releasing the lock to connect.
+                        connection, last_used = object(), None
+                        self._in_use.add(connection)
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No connection available after {timeout:.1f}s "
+                            f"({len(self._in_use)}/{self.max_size} in use)."
+                        )
+                    self._lock.wait(remaining)
+
+            if last_used is None:
+                break
+            if self._is_healthy(connection, last_used):
+                with self._lock:
+                    self._record_wait(time.monotonic() - started)
+                return connection
+            with self._lock:
+                self._in_use.discard(connection)
+                self._lock.notify()
+            self._discard(connection)
+
+        placeholder = connection
+        try:
+            connection = self._open()
+        except Exception:
+            with self._lock:
+                self._in_use.discard(placeholder)
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self._in_use.discard(placeholder)
+            self._in_use.add(connection)
+            self._record_wait(time.monotonic() - started)
+        return connection
+
+    def putconn(self, connection, close=False):
+        """
+        Return a borrowed connection to the pool.
+
+        Any open transaction is rolled back, outside the lock, so the next
+        borrower starts clean.
+        """
+        if not close and not self._is_closed(connection):
+            close = not self._reset(connection)
+        else:
+            close = True
+
+        with self._lock:
+            self._in_use.discard(connection)
+            close = close or self._closed
+            if not close:
+                self._idle.append((connection, time.monotonic()))
+            self._lock.notify()
+        if close:
+            self._discard(connection)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that borrows a connection and always returns it."""
+        connection = self.getconn(timeout)
+        try:
+            yield connection
+        finally:
+            self.putconn(connection)
+
+    def _record_wait(self, waited):
+        self._checkouts += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def stats(self):
+        """Return pool usage and checkout wait statistics for sizing."""
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "checkouts": self._checkouts,
+                "discarded": self._discarded,
+                "wait_avg_ms": (
+                    1000 * self._wait_total / self._checkouts
+                    if self._checkouts
+                    else 0.0
+                ),
+                "wait_max_ms": 1000 * self._wait_max,
+            }
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._lock.notify_all()
+        for connection, _ in idle:
+            self._discard(connection)
@@ -0,0 +1,152 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class OpenCursor:
+    """
+    A partially consumed server-side cursor parked between tool calls.
+
+    The cursor keeps its connection checked out until it is exhausted,
+    closed, or expires.
+    """
+
+    def __init__(self, connection, cursor, columns, pending, release):
+        self.token = secrets.token_urlsafe(16)
+        self.connection = connection
+        self.cursor = cursor
+        self.columns = columns
+        self.pending = pending if pending is not None else deque()
+        self.exhausted = False
+        self.release = release
+        self.last_used = time.monotonic()
+
+    def close(self):
+        """Close the cursor and give the connection back."""
+        try:
+            self.cursor.close()
+        except Exception:
+            pass
+        self.pending.clear()
+        self.release(self.connection)
+
+
+class CursorRegistry:
+    """
+    Tracks open cursors by opaque continuation token.
+
+    Each open cursor pins a connection, so the registry bounds how many may be
+    open at once and closes cursors that are not resumed within the TTL.
+    While any cursor is parked, a background thread checks for expired ones
+    every reap_interval seconds, so an abandoned continuation gives its
+    connection back even when no further tool calls arrive.
+    """
+
+    def __init__(self, ttl=None, max_open=None):
+        """
+        :param ttl: Idle seconds before an open cursor is closed (QUERY_CURSOR_TTL, default 300).
+        :param max_open: Maximum parked cursors (QUERY_MAX_OPEN_CURSORS). By
+            default half the pool once fit_pool is called, otherwise 4.
+        """
+        self.ttl = float(ttl if ttl is not None else os.getenv("QUERY_CURSOR_TTL", 300))
+        configured = (
+            max_open if max_open is not None else os.getenv("QUERY_MAX_OPEN_CURSORS")
+        )
+        self._max_open_configured = configured is not None
+        self.max_open = int(configured) if configured is not None else 4
+        self.reap_interval = max(0.1, min(self.ttl / 4, 60.0))
+        self._lock = threading.Lock()
+        self._cursors = OrderedDict()
+        self._reaper = None
+
+    def fit_pool(self, pool_size):
+        """
+        Bound parked cursors by the size of the pool their connections come
+        from: half of it by default, and never all of it, so new queries
+        still get a connection while continuations are pending.
+        """
+        with self._lock:
+            if self._max_open_configured:
+                self.max_open = max(1, min(self.max_open, pool_size - 1))
+            else:
+                self.max_open = max(1, pool_size // 2)
+            evicted = []
+            while len(self._cursors) > self.max_open:
+                evicted.append(self._cursors.popitem(last=False)[1])
+        for stale in evicted:
+            stale.close()
+
+    def park(self, entry):
+        """Store an open cursor and return its continuation token."""
+        entry.last_used = time.monotonic()
+        evicted = []
+        with self._lock:
+            evicted.extend(self._expired())
+            while len(self._cursors) >= self.max_open:
+                evicted.append(self._cursors.popitem(last=False)[1])
+            self._cursors[entry.token] = entry
+            if self._reaper is None:
+                self._reaper = threading.Thread(
+                    target=self._reap_loop, name="cursor-reaper", daemon=True
+                )
+                self._reaper.start()
+        for stale in evicted:
+            stale.close()
+        return entry.token
+
+    def take(self, token):
+        """
+        Remove and return the open cursor for a token.
+
+        :raises KeyError: If the token is unknown or has expired.
+        """
+        with self._lock:
+            expired = self._expired()
+            entry = self._cursors.pop(token, None)
+        for stale in expired:
+            stale.close()
+        if entry is None:
+            raise KeyError(f"Unknown or expired continuation token: {token}")
+        return entry
+
+    def reap(self):
+        """
+        Close cursors idle longer than the TTL.
+
+        :return: The number of cursors closed.
+        """
+        with self._lock:
+            expired = self._expired()
+        for stale in expired:
+            stale.close()
+        return len(expired)
+
+    def _reap_loop(self):
+        """Reap until no cursors are left parked; park() starts a new loop."""
+        while True:
+            time.sleep(self.reap_interval)
+            self.reap()
+            with self._lock:
+                if not self._cursors:
+                    self._reaper = None
+                    return
+
+    def _expired(self):
+        """Pop entries idle longer than the TTL. Caller holds the lock."""
+        cutoff = time.monotonic() - self.ttl
+        stale = [t for t, e in self._cursors.items() if e.last_used < cutoff]
+        return [self._cursors.pop(t) for t in stale]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._cursors)
+
+    def close_all(self):
+        """Close every parked cursor, e.g. on server shutdown."""
+        with self._lock:
+            entries = list(self._cursors.values())
+            self._cursors.clear()
+        for entry in entries:
+            entry.close()
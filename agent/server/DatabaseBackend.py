@@ -0,0 +1,134 @@
+import os
+import threading
+
+from server.CursorRegistry import CursorRegistry
+from server.QueryHandler import QueryHandler
+
+
+class DatabaseBackend:
+    """
+    The database a query server or agent talks to.
+
+    A backend owns a connection pool, opened lazily and shared by every
+    caller in the process, and offers the same operations for each
+    database: connect, execute (one bounded page, resumable with a
+    continuation token), stream (every row, batch by batch) and catalog
+    (the schema introspection used to build prompts).
+
+    Subclasses set name and handler_class and implement _create_pool and
+    _create_catalog. Use DatabaseBackend.from_env() to get the backend
+    selected by DB_BACKEND.
+    """
+
+    # Dialect name used in prompts, e.g. "Postgres".
+    name = None
+    handler_class = QueryHandler
+
+    backends = ("postgres", "snowflake")
+
+    def __init__(self, cursors=None, cache=None):
+        """
+        :param cursors: CursorRegistry for paged results; a new one by default.
+        :param cache: Optional ResultCache for complete single-page results.
+        """
+        self.cursors = cursors if cursors is not None else CursorRegistry()
+        self.cache = cache
+        self.pool = None
+        self._catalog = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_env(backend=None):
+        """
+        Create the configured backend.
+
+        :param backend: "postgres" or "snowflake"; DB_BACKEND, default postgres.
+        """
+        backend = (backend or os.getenv("DB_BACKEND", "postgres")).lower()
+        if backend == "postgres":
+            from server.PostgresBackend import PostgresBackend
+
+            return PostgresBackend()
+        if backend == "snowflake":
+            from server.SnowflakeBackend import SnowflakeBackend
+
+            return SnowflakeBackend()
+        raise ValueError(
+            f"Unknown DB_BACKEND '{backend}', expected one of "
+            f"{', '.join(DatabaseBackend.backends)}"
+        )
+
+    def _create_pool(self):
+        raise NotImplementedError
+
+    def _create_catalog(self):
+        raise NotImplementedError
+
+    def connect(self):
+        """Return the connection pool, opening it on first use."""
+        with self._lock:
+            if self.pool is None:
+                self.pool = self._create_pool()
+                # Parked cursors pin connections from this pool
+                self.cursors.fit_pool(self.pool.max_size)
+        return self.pool
+
+    def handler(self):
+        """A query handler borrowing from this backend's pool."""
+        return self.handler_class(
+            pool=self.connect(), cursors=self.cursors, cache=self.cache
+        )
+
+    def execute(self, query=None, continuation=None, max_rows=None, timeout=None):
+        """
+        Run a query and return one bounded page of its result.
+
+        :param query: SQL to run; ignored when continuation is given.
+        :param continuation: Token from a previous page.
+        :param max_rows: Optional smaller page size.
+        :param timeout: Seconds before the database cancels the statement.
+        :return: {"success", "columns", "rows", "continuation", "cached"} or
+            {"success": False, "error"}.
+        """
+        return self.handler().execute_query_stream(
+            query,
+            max_rows=max_rows or None,
+            continuation=continuation or None,
+            timeout=timeout,
+        )
+
+    def stream(self, query, batch_size=10000, timeout=None):
+        """
+        Run a query and return (columns, batches); see
+        QueryHandler.execute_query_batches.
+        """
+        return self.handler().execute_query_batches(
+            query, batch_size=batch_size, timeout=timeout
+        )
+
+    def catalog(self):
+        """Return the backend's long-lived SchemaCatalog, on its own connection."""
+        with self._lock:
+            if self._catalog is None:
+                self._catalog = self._create_catalog()
+        return self._catalog
+
+    def stats(self):
+        """Return pool, cursor and cache statistics for logging."""
+        return {
+            "backend": self.name,
+            "pool": self.pool.stats() if self.pool is not None else None,
+            "open_cursors": len(self.cursors),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def close(self):
+        """Close parked cursors, the catalog's connection and the pool."""
+        self.cursors.close_all()
+        with self._lock:
+            if self._catalog is not None:
+                self._catalog.connection.close()
+                self._catalog = None
+            if self.pool is not None:
+                self.pool.close()
+                self.pool = None
@@ -0,0 +1,165 @@
+import random
+import threading
+import time
+
+from server.ArrowFetcher import ArrowFetcher
+from server.SqlSplitter import SqlSplitter
+
+
+class FakeResultBatch:
+    """
+    A pre-built result batch standing in for Snowflake's ArrowResultBatch.
+
+    The rows are held as a zstd-compressed Arrow IPC stream, so to_arrow()
+    does real decoding work, as a downloaded Snowflake chunk would.
+    """
+
+    def __init__(self, payload, rowcount):
+        self.payload = payload
+        self.rowcount = rowcount
+
+    def to_arrow(self, connection=None):
+        import pyarrow as pa
+
+        return pa.ipc.open_stream(self.payload).read_all()
+
+
+class FakeSnowflakeConnector:
+    """
+    A local stand-in for SnowflakeConnector that needs no account.
+
+    Each statement sleeps for a simulated warehouse latency and returns a
+    few generated rows, so concurrency and output code can be exercised
+    and timed offline. The Arrow methods serve the same rows as pre-built
+    result batches of chunk_rows rows each.
+    """
+
+    connections_opened = 0
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        latency=0.5,
+        jitter=0.0,
+        rows=3,
+        fail_pattern=None,
+        round_trip=0.0,
+        chunk_rows=50000,
+    ):
+        """
+        :param latency: Seconds each statement takes to execute.
+        :param jitter: Extra random latency, up to this many seconds.
+        :param rows: Rows returned per result set.
+        :param fail_pattern: Statements containing this text raise an error.
+        :param round_trip: Network seconds added to every request; a batched
+            script pays it once.
+        :param chunk_rows: Rows per Arrow result batch.
+        """
+        self.conn = None
+        self.latency = latency
+        self.jitter = jitter
+        self.rows = rows
+        self.fail_pattern = fail_pattern
+        self.round_trip = round_trip
+        self.chunk_rows = chunk_rows
+        self.arrow_fetcher = ArrowFetcher()
+        self._prebuilt = {}
+
+    def connect(self):
+        with self._lock:
+            FakeSnowflakeConnector.connections_opened += 1
+        self.conn = object()
+
+    def _wait(self, query, timeout=None):
+        """Simulate one statement, honouring the timeout like the real connector."""
+        delay = self.latency + random.uniform(0, self.jitter)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise Exception(f"Statement timed out after {timeout}s: {query[:60]}")
+        time.sleep(delay)
+        if self.fail_pattern and self.fail_pattern in query:
+            raise Exception(f"Simulated failure: {query[:60]}")
+
+    def _run(self, query, timeout=None):
+        self._wait(query, timeout)
+        return [
+            {"ID": i, "QUERY_TEXT": query[:40], "RUN_AT": time.time()}
+            for i in range(self.rows)
+        ]
+
+    def execute_query(self, query):
+        if not self.conn:
+            raise Exception("Connection is not established.")
+        return [tuple(row.values()) for row in self._run(query)]
+
+    def execute_queries(self, query_text, timeout=None, batched=False):
+        """Execute each SQL statement in a script and return all results."""
+        if self.conn is None:
+            self.connect()
+        queries = SqlSplitter.split(query_text)
+        requests = 1 if batched else len(queries)
+        time.sleep(self.round_trip * requests)
+        return [
+            {"query": query, "result": self._run(query, timeout)} for query in queries
+        ]
+
+    def stream_queries(self, query_text, batch_size=10000, timeout=None, batched=False):
+        """Yield (query, columns, batches) like SnowflakeConnector.stream_queries."""
+        for result in self.execute_queries(query_text, timeout, batched):
+            rows = result["result"]
+            columns = list(rows[0].keys()) if rows else []
+            tuples = [tuple(row.values()) for row in rows]
+            yield result["query"], columns, (
+                tuples[i : i + batch_size] for i in range(0, len(tuples), batch_size)
+            )
+
+    def get_result_batches(self, query, timeout=None):
+        """
+        Simulate a statement and return its pre-built FakeResultBatch list.
+
+        Batches are built once per query text, so repeated runs only pay the
+        simulated latency and the decoding.
+        """
+        self._wait(query, timeout)
+        if query not in self._prebuilt:
+            import pyarrow as pa
+
+            table = pa.table(
+                {
+                    "ID": pa.array(range(self.rows), pa.int64()),
+                    "QUERY_TEXT": pa.array([query[:40]] * self.rows, pa.string()),
+                    "RUN_AT": pa.array([time.time()] * self.rows, pa.float64()),
+                }
+            )
+            batches = []
+            options = pa.ipc.IpcWriteOptions(compression="zstd")
+            for chunk in table.to_batches(max_chunksize=self.chunk_rows):
+                sink = pa.BufferOutputStream()
+                with pa.ipc.new_stream(sink, chunk.schema, options=options) as writer:
+                    writer.write_batch(chunk)
+                batches.append(FakeResultBatch(sink.getvalue(), chunk.num_rows))
+            self._prebuilt[query] = batches
+        return self._prebuilt[query]
+
+    def fetch_arrow(self, query, output="table", timeout=None, workers=None):
+        """Fetch a query's result as Arrow like SnowflakeConnector.fetch_arrow."""
+        if self.conn is None:
+            self.connect()
+        time.sleep(self.round_trip)
+        fetcher = ArrowFetcher(workers) if workers else self.arrow_fetcher
+        return fetcher.fetch(self.get_result_batches(query, timeout), output)
+
+    def stream_queries_arrow(self, query_text, timeout=None, batched=False):
+        """Arrow counterpart of stream_queries, serving the pre-built batches."""
+        if self.conn is None:
+            self.connect()
+        queries = SqlSplitter.split(query_text)
+        time.sleep(self.round_trip * (1 if batched else len(queries)))
+        for query in queries:
+            batches = self.get_result_batches(query, timeout)
+            yield query, ["ID", "QUERY_TEXT", "RUN_AT"], (
+                self.arrow_fetcher.iter_tables(batches)
+            )
+
+    def close(self):
+        self.conn = None
@@ -0,0 +1,120 @@
+import hashlib
+from decimal import Decimal
+
+import psycopg2
+
+
+class LoadMetadata:
+    """
+    Per-table bookkeeping for data loaded by CSVUploader.
+
+    Every load that writes rows bumps the table's version in the same
+    transaction, so readers such as the query result cache can tell that a
+    table has changed with a single primary-key lookup.
+
+    Incremental loads also record a watermark: the largest time-column value
+    loaded so far, plus content hashes of the rows at exactly that value so
+    rows sharing the boundary timestamp are neither dropped nor duplicated.
+    """
+
+    table_name = "etl_load_metadata"
+
+    def ensure_table(self, cursor):
+        """Create the metadata table if it does not exist."""
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_name} (
+                table_name TEXT PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP NOT NULL DEFAULT now()
+            );
+            ALTER TABLE {self.table_name}
+                ADD COLUMN IF NOT EXISTS watermark TIMESTAMP,
+                ADD COLUMN IF NOT EXISTS boundary_hashes TEXT[];
+            """)
+
+    def bump_version(self, cursor, table):
+        """
+        Increment a table's version. Call inside the loading transaction.
+
+        :return: The new version.
+        """
+        cursor.execute(
+            f"""
+            INSERT INTO {self.table_name} (table_name, version, updated_at)
+            VALUES (%s, 1, now())
+            ON CONFLICT (table_name)
+            DO UPDATE SET version = {self.table_name}.version + 1, updated_at = now()
+            RETURNING version;
+            """,
+            (table.lower(),),
+        )
+        return cursor.fetchone()[0]
+
+    def get_watermark(self, cursor, table):
+        """
+        Return (watermark, boundary_hashes) for a table, or None if no
+        watermark has been recorded yet.
+        """
+        cursor.execute(
+            f"""
+            SELECT watermark, boundary_hashes FROM {self.table_name}
+            WHERE table_name = %s AND watermark IS NOT NULL;
+            """,
+            (table.lower(),),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return row[0], set(row[1] or ())
+
+    def set_watermark(self, cursor, table, watermark, boundary_hashes):
+        """Record a table's watermark. Call inside the loading transaction."""
+        cursor.execute(
+            f"""
+            INSERT INTO {self.table_name} (table_name, watermark, boundary_hashes, updated_at)
+            VALUES (%s, %s, %s, now())
+            ON CONFLICT (table_name)
+            DO UPDATE SET watermark = EXCLUDED.watermark,
+                          boundary_hashes = EXCLUDED.boundary_hashes,
+                          updated_at = now();
+            """,
+            (table.lower(), watermark, sorted(boundary_hashes)),
+        )
+
+    @staticmethod
+    def row_hash(values):
+        """
+        Content hash of a row of Python values.
+
+        Numbers are canonicalized so a value hashes the same whether it came
+        from a CSV chunk or back from the database.
+        """
+        parts = []
+        for value in values:
+            if value is None:
+                parts.append("")
+            elif isinstance(value, bool):
+                parts.append(str(value))
+            elif isinstance(value, int):
+                parts.append(str(value))
+            elif isinstance(value, (float, Decimal)):
+                parts.append(repr(float(value)))
+            else:
+                parts.append(str(value))
+        return hashlib.md5("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get_versions(self, connection):
+        """
+        Return {table_name: version} for every tracked table.
+
+        Returns an empty mapping when nothing has been loaded yet.
+        """
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT table_name, version FROM {self.table_name}")
+                versions = dict(cursor.fetchall())
+        except psycopg2.errors.UndefinedTable:
+            versions = {}
+        finally:
+            connection.rollback()
+        return versions
@@ -0,0 +1,28 @@
+import os
+
+from server.ConnectionPool import ConnectionPool
+from server.DatabaseBackend import DatabaseBackend
+from server.PostgresConnector import PostgresConnector
+from server.ResultCache import ResultCache
+from server.SchemaCatalog import SchemaCatalog
+
+
+class PostgresBackend(DatabaseBackend):
+    """
+    Postgres through a ConnectionPool, with complete results cached in a
+    ResultCache that is invalidated when CSVUploader reloads a table.
+    """
+
+    name = "Postgres"
+
+    def __init__(self, cursors=None, cache=None):
+        super().__init__(cursors, cache if cache is not None else ResultCache())
+
+    def _create_pool(self):
+        return ConnectionPool()
+
+    def _create_catalog(self):
+        connection = PostgresConnector().connect()
+        if connection is None:
+            raise Exception("Unable to connect to Postgres for the schema catalog.")
+        return SchemaCatalog(connection, os.getenv("POSTGRES_SCHEMA", "public"))
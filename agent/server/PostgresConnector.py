@@ -22,7 +22,10 @@ class PostgresConnector:
 
             table_schema = os.getenv("POSTGRES_SCHEMA", "public")
 
-            self.connection.cursor().execute(f"SET search_path TO {table_schema};")
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"SET search_path TO {table_schema};")
+            # SET is transactional; commit so a later rollback keeps the search_path.
+            self.connection.commit()
 
             return self.connection
         except psycopg2.Error as e:
@@ -1,66 +1,109 @@
 import json
+import os
 from datetime import datetime
-from server.PostgresConnector import PostgresConnector
+from server.DatabaseBackend import DatabaseBackend
+from server.SchemaCatalog import SchemaCatalog
+from server.Tracer import tracer
 
 
 class PromptGenerator:
-    def __init__(self, database, connection):
+    # Tables considered per prompt, and the approximate token budget for the schema.
+    top_k = int(os.getenv("PROMPT_TOP_K", 8))
+    token_budget = int(os.getenv("PROMPT_TOKEN_BUDGET", 4000))
+    # Budget for the whole schema in a cacheable system prompt. It defaults to
+    # the selection budget, so the prefix is only used when it is no larger
+    # than a prompt of selected tables would be.
+    prefix_token_budget = int(os.getenv("PROMPT_PREFIX_TOKEN_BUDGET", token_budget))
+
+    def __init__(self, database, connection, catalog=None):
         """
         Initialize the class by fetching table schema details.
 
         :param connection: A database connection object.
+        :param catalog: Optional long-lived SchemaCatalog to reuse across prompts.
         """
         self.database = database
         self.connection = connection
-        self.cursor = self.connection.cursor()
+        self.catalog = catalog if catalog is not None else SchemaCatalog(connection)
         self.schema_info = self._get_schema_info()
 
-    def _get_schema_info(self):
+    @classmethod
+    def from_backend(cls, backend):
         """
-        Fetch all tables in the public schema along with column names and sample rows.
+        Create a generator for a DatabaseBackend's dialect, reusing its catalog.
         """
-        schema_info = {}
+        catalog = backend.catalog()
+        return cls(backend.name, catalog.connection, catalog=catalog)
 
-        # Get table names
-        self.cursor.execute(
-            """
-            SELECT tablename FROM pg_tables WHERE schemaname = 'public';
+    def _get_schema_info(self):
         """
-        )
-        tables = [row[0] for row in self.cursor.fetchall()]
-
-        for table in tables:
-            # Get column names
-            self.cursor.execute(
-                f"""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_schema = 'public' AND table_name = %s;
-            """,
-                (table,),
-            )
-            columns = [row[0] for row in self.cursor.fetchall()]
+        Fetch all tables in the catalog's schema with column names and sample rows.
 
-            # Get sample rows
-            self.cursor.execute(f"SELECT * FROM {table} LIMIT 3;")
-            rows = self.cursor.fetchall()
+        Only tables that changed since the catalog was last refreshed are re-read.
+        """
+        with tracer.span("SchemaCatalog.refresh", schema=self.catalog.schema):
+            tracer.annotate(reloaded=len(self.catalog.refresh()))
+        return self.catalog.schema_info()
+
+    @staticmethod
+    def estimate_tokens(text):
+        """Rough token count (about four characters per token)."""
+        return len(text) // 4 + 1
+
+    @staticmethod
+    def render_table(table, info, with_samples=True):
+        """Render one table compactly as a single JSON line."""
+        body = {"columns": info["columns"]}
+        if with_samples:
+            body["sample_data"] = info["sample_data"]
+        return json.dumps(
+            {table: body},
+            separators=(",", ":"),
+            default=lambda obj: (
+                obj.isoformat() if isinstance(obj, datetime) else str(obj)
+            ),
+        )
 
-            schema_info[table] = {"columns": columns, "sample_data": rows}
+    def select_schema(self, user_query, top_k=None, token_budget=None):
+        """
+        Render the tables most relevant to a question within a token budget.
 
-        return schema_info
+        Tables are ranked by the catalog's BM25 index and added best first.
+        A table that does not fit with its samples is tried without them.
 
-    def generate_prompt(self, user_query):
+        :return: Rendered schema lines, one table per line.
+        """
+        top_k = top_k or self.top_k
+        token_budget = token_budget or self.token_budget
+
+        lines = []
+        used = 0
+        for table in self.catalog.index().rank(user_query, top_k):
+            info = self.schema_info[table]
+            for with_samples in (True, False):
+                line = self.render_table(table, info, with_samples)
+                cost = self.estimate_tokens(line)
+                if used + cost <= token_budget or not lines:
+                    lines.append(line)
+                    used += cost
+                    break
+        return lines
+
+    @tracer.traced("PromptGenerator.generate_prompt")
+    def generate_prompt(self, user_query, top_k=None, token_budget=None):
         """
         Generate a prompt using the database schema and sample data.
 
+        Only the top-k tables relevant to the request are included, packed
+        to the token budget.
+
         :param user_query: The user's natural language request.
+        :param top_k: Maximum tables to include (PROMPT_TOP_K).
+        :param token_budget: Approximate schema token budget (PROMPT_TOKEN_BUDGET).
         :return: A prompt string to be sent to an LLM.
         """
-        schema_text = json.dumps(
-            self.schema_info,
-            indent=2,
-            default=lambda obj: (
-                obj.isoformat() if isinstance(obj, datetime) else str(obj)
-            ),
+        schema_text = "\n        ".join(
+            self.select_schema(user_query, top_k, token_budget)
         )
 
         prompt = f"""
@@ -74,18 +117,71 @@ class PromptGenerator:
 
         return prompt
 
+    def schema_prefix(self, token_budget=None):
+        """
+        Render every table, in catalog order, for a cacheable system prompt.
 
-def main():
-    # Connect to the database and generate prompts from metadata
-    connector = PostgresConnector()
-    connection = PromptGenerator("Postgres", connector.connect())
+        The text depends only on the catalog, so it is byte-identical across
+        questions until a table's columns or sample rows change.
+
+        :param token_budget: Approximate budget (PROMPT_PREFIX_TOKEN_BUDGET,
+            default PROMPT_TOKEN_BUDGET).
+        :return: The schema text, or None if the schema has more than top_k
+            tables, which select_schema would narrow down, or does not fit
+            even without samples.
+        """
+        token_budget = token_budget or self.prefix_token_budget
+        if len(self.schema_info) > self.top_k:
+            return None
+        for with_samples in (True, False):
+            schema_text = "\n".join(
+                self.render_table(table, info, with_samples)
+                for table, info in self.schema_info.items()
+            )
+            if self.estimate_tokens(schema_text) <= token_budget:
+                return schema_text
+        return None
+
+    @tracer.traced("PromptGenerator.generate_request")
+    def generate_request(self, user_query, token_budget=None):
+        """
+        Split the prompt into a stable system prefix and a per-question suffix.
+
+        When the whole schema is at most top_k tables and fits the prefix
+        budget, it goes in the system prompt, where provider-side prompt
+        caching can reuse it, and the user message carries only the
+        question. Otherwise there is no system prompt and the user message
+        is generate_prompt(user_query), with the tables relevant to it.
 
-    if connection:
+        :return: (system text or None, user message text)
+        """
+        schema_text = self.schema_prefix(token_budget)
+        if schema_text is None:
+            return None, self.generate_prompt(user_query)
+
+        system = (
+            f"Given the following {self.database} database schema and sample data, "
+            f"one table per line:\n\n{schema_text}"
+        )
+        user = (
+            f"Generate an optimal SQL query for {self.database} to answer the "
+            f'following user request:\n"{user_query}"'
+        )
+        return system, user
+
+
+def main():
+    # Connect to the DB_BACKEND database and generate prompts from metadata
+    backend = DatabaseBackend.from_env()
+    try:
+        connection = PromptGenerator.from_backend(backend)
         print(
             f"✅ Prompt:\n{connection.generate_prompt('get the top 10 songs in the past week')}"
         )
-    else:
-        print(f"❌ Error cannot connect.")
+    except Exception as e:
+        print(f"❌ Error cannot connect: {e}")
+    finally:
+        backend.close()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,19 @@
-from typing import Any, Dict, Union
+import os
+import re
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Union
+
+from server.CursorRegistry import CursorRegistry, OpenCursor
+from server.LoadMetadata import LoadMetadata
+from server.Tracer import tracer
+
+# Queries that can be wrapped in a server-side (DECLARE ... CURSOR) cursor.
+STREAMABLE_QUERY = re.compile(
+    r"^\s*(?:(?:--[^\n]*\n)|(?:/\*.*?\*/)|\s)*(select|with|values|table)\b",
+    re.IGNORECASE | re.DOTALL,
+)
 
 
 class QueryHandler:
@@ -16,13 +31,41 @@ ORDER BY airdate DESC
 LIMIT 20
     """
 
-    def __init__(self, connection):
+    # Hard per-call budgets; callers may ask for less but never more.
+    max_rows = int(os.getenv("QUERY_MAX_ROWS", 500))
+    max_bytes = int(os.getenv("QUERY_MAX_BYTES", 256 * 1024))
+    batch_size = int(os.getenv("QUERY_FETCH_BATCH", 100))
+
+    def __init__(self, connection=None, pool=None, cursors=None, cache=None):
         """
-        Initializes the QueryHandler with an SQLite database connection.
+        Initializes the QueryHandler with either a dedicated database connection
+        or a ConnectionPool to borrow connections from for each query.
+
+        :param cursors: CursorRegistry holding partially read results between calls.
+        :param cache: Optional ResultCache for complete single-page results.
         """
+        if connection is None and pool is None:
+            raise ValueError("QueryHandler needs a connection or a pool.")
         self.connection = connection
-        self.cursor = self.connection.cursor()
+        self.pool = pool
+        if cursors is None:
+            cursors = CursorRegistry()
+            if pool is not None:
+                cursors.fit_pool(pool.max_size)
+        self.cursors = cursors
+        self.cache = cache
+        self.metadata = LoadMetadata()
+
+    @contextmanager
+    def _borrow(self):
+        """Yield a connection, borrowing from the pool when one is configured."""
+        if self.pool is not None:
+            with self.pool.connection() as connection:
+                yield connection
+        else:
+            yield self.connection
 
+    @tracer.traced("QueryHandler.execute_query")
     def execute_query(
         self, query: str, params: Union[tuple, Dict[str, Any]] = ()
     ) -> Dict[str, Any]:
@@ -30,16 +73,229 @@ LIMIT 20
         Executes an SQL query and returns the results.
         """
         try:
-            self.cursor.execute(query, params)
-            rows = self.cursor.fetchall()
-            columns = [desc[0] for desc in self.cursor.description]
+            with self._borrow() as connection:
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(query, params)
+                        rows = cursor.fetchall() if cursor.description else []
+                        columns = [desc[0] for desc in cursor.description or ()]
+                finally:
+                    # Tool queries are read-only; end the transaction so the
+                    # connection goes back to the pool idle.
+                    connection.rollback()
             result = [dict(zip(columns, row)) for row in rows]
             return {"success": True, "data": result}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def _acquire(self):
+        """Check out a connection that may outlive this call."""
+        return self.pool.getconn() if self.pool is not None else self.connection
+
+    def _release(self, connection):
+        """End the transaction and hand a connection from _acquire back."""
+        if self.pool is not None:
+            self.pool.putconn(connection)
+        elif not connection.closed:
+            connection.rollback()
+
+    @tracer.traced("QueryHandler.execute_query_stream")
+    def execute_query_stream(
+        self,
+        query: Optional[str] = None,
+        params: Union[tuple, Dict[str, Any]] = (),
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        continuation: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Executes an SQL query and returns one bounded page of results.
+
+        SELECT-like queries run through a named (server-side) cursor and are
+        read with fetchmany, so only the current page is held in memory. When
+        rows remain, the result carries a continuation token that resumes the
+        same cursor on the next call instead of re-running the query.
+
+        :param query: SQL to run; ignored when continuation is given.
+        :param max_rows: Row budget for this page, capped at QUERY_MAX_ROWS.
+        :param max_bytes: Approximate byte budget, capped at QUERY_MAX_BYTES.
+        :param continuation: Token from a previous page.
+        :param timeout: Seconds before the database cancels the statement.
+        :return: {"success", "columns", "rows", "continuation", "cached"} or an error.
+        """
+        max_rows = min(max_rows or self.max_rows, self.max_rows)
+        max_bytes = min(max_bytes or self.max_bytes, self.max_bytes)
+
+        cache_key = versions = None
+        if (
+            self.cache is not None
+            and not continuation
+            and STREAMABLE_QUERY.match(query)
+        ):
+            try:
+                cache_key = self.cache.make_key(query, params)
+                versions = self.cache.table_versions(self._load_versions)
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+            cached = self.cache.get(cache_key, versions)
+            if cached is not None:
+                columns, rows, size = cached
+                if len(rows) <= max_rows and size <= max_bytes:
+                    return {
+                        "success": True,
+                        "columns": columns,
+                        "rows": rows,
+                        "continuation": None,
+                        "cached": True,
+                    }
+
+        try:
+            if continuation:
+                entry = self.cursors.take(continuation)
+            else:
+                entry = self._open_cursor(query, params, timeout)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+        try:
+            rows, size = self._fetch_page(entry, max_rows, max_bytes)
+            if entry.columns is None:
+                entry.columns = [desc[0] for desc in entry.cursor.description or ()]
+        except Exception as e:
+            entry.close()
+            return {"success": False, "error": str(e)}
+
+        token = None
+        if entry.exhausted and not entry.pending:
+            entry.close()
+            if cache_key is not None:
+                self.cache.put(cache_key, entry.columns, rows, size, versions)
+        else:
+            token = self.cursors.park(entry)
+
+        return {
+            "success": True,
+            "columns": entry.columns,
+            "rows": rows,
+            "continuation": token,
+            "cached": False,
+        }
+
+    def execute_query_batches(
+        self,
+        query: str,
+        params: Union[tuple, Dict[str, Any]] = (),
+        batch_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Executes an SQL query and returns every row, one batch at a time.
+
+        :return: (columns, batches) where batches yields lists of at most
+            batch_size row tuples. The connection stays checked out until
+            batches is exhausted or closed.
+        """
+        batch_size = batch_size or self.batch_size
+        entry = self._open_cursor(query, params, timeout)
+        try:
+            first = [] if entry.exhausted else entry.cursor.fetchmany(batch_size)
+            columns = entry.columns
+            if columns is None:
+                columns = [desc[0] for desc in entry.cursor.description or ()]
+        except Exception:
+            entry.close()
+            raise
+
+        def batches():
+            try:
+                batch = first
+                while batch:
+                    yield batch
+                    if len(batch) < batch_size:
+                        break
+                    batch = entry.cursor.fetchmany(batch_size)
+            finally:
+                entry.close()
+
+        return columns, batches()
+
+    def _load_versions(self):
+        """Read current per-table load versions for cache validation."""
+        with self._borrow() as connection:
+            return self.metadata.get_versions(connection)
+
+    def _open_cursor(self, query, params, timeout=None):
+        """Execute a query on a freshly acquired connection."""
+        connection = self._acquire()
+        try:
+            if timeout:
+                # Scoped to this transaction, so it also bounds later fetches
+                # from the same server-side cursor.
+                with connection.cursor() as setup:
+                    setup.execute(
+                        "SET LOCAL statement_timeout = %s", (int(timeout * 1000),)
+                    )
+            if STREAMABLE_QUERY.match(query):
+                cursor = connection.cursor(name=f"get_query_{uuid.uuid4().hex}")
+            else:
+                cursor = connection.cursor()
+            cursor.execute(query, params)
+        except Exception:
+            self._release(connection)
+            raise
+
+        entry = OpenCursor(connection, cursor, None, deque(), self._release)
+        if cursor.name is None and cursor.description is None:
+            # Statement without a result set
+            entry.columns = []
+            entry.exhausted = True
+        return entry
+
+    def _fetch_page(self, entry, max_rows, max_bytes):
+        """
+        Read up to max_rows / max_bytes from a cursor in fetchmany batches.
+
+        When the page uses up every fetched row, one more batch is read
+        ahead into entry.pending, so a result whose size is an exact
+        multiple of the batch size is known to be exhausted instead of
+        ending in a continuation to an empty page.
+        """
+        rows = []
+        size = 0
+        pending = entry.pending
+        while len(rows) < max_rows:
+            if not pending:
+                if entry.exhausted:
+                    break
+                batch = entry.cursor.fetchmany(self.batch_size)
+                if len(batch) < self.batch_size:
+                    entry.exhausted = True
+                if not batch:
+                    break
+                pending.extend(batch)
+
+            row_size = self._row_size(pending[0])
+            if rows and size + row_size > max_bytes:
+                break
+            rows.append(pending.popleft())
+            size += row_size
+
+        if not pending and not entry.exhausted:
+            batch = entry.cursor.fetchmany(self.batch_size)
+            if len(batch) < self.batch_size:
+                entry.exhausted = True
+            pending.extend(batch)
+        return rows, size
+
+    @staticmethod
+    def _row_size(row):
+        """Cheap estimate of a row's encoded size in bytes."""
+        return sum(len(str(value)) + 4 for value in row)
+
     def close(self):
         """
-        Closes the database connection.
+        Closes the database connection. Pooled connections are owned by the pool.
         """
-        self.connection.close()
+        if self.connection is not None:
+            self.connection.close()
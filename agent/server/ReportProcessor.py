@@ -1,17 +1,46 @@
 import argparse
-import json
 import datetime
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from decimal import Decimal
-from SnowflakeConnector import SnowflakeConnector
 import re
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script: make the agent directory importable, so this module
+    # and the connectors share the server package without PYTHONPATH=agent
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server.ReportWriter import ReportWriter
+from server.RunManifest import RunManifest
+from server.Tracer import tracer
 
 
 class ReportProcessor:
-    def __init__(self, report_folder="agent/sql/first-pass"):
-        """Initialize with the report folder."""
+    def __init__(
+        self,
+        report_folder="agent/sql/first-pass",
+        writer=None,
+        batch_size=10000,
+        batched=False,
+        arrow=False,
+    ):
+        """
+        Initialize with the report folder.
+
+        :param writer: ReportWriter choosing the output format; compact JSON by default.
+        :param batch_size: Rows fetched and written per batch.
+        :param batched: Send each report as one multi-statement request.
+        :param arrow: Fetch results as Arrow batches decoded in parallel.
+        """
         self.report_folder = Path(report_folder)
         self.output_base_folder = Path("data")
+        self.writer = writer or ReportWriter()
+        self.batch_size = batch_size
+        self.batched = batched
+        self.arrow = arrow
 
     def get_iso_run_date(self):
         """Return the current ISO-formatted date."""
@@ -32,8 +61,79 @@ class ReportProcessor:
                 queries[sql_file.stem] = file.read()
         return queries
 
-    def process_reports(self, snowflake_conn, filter_pattern=None):
-        """Execute all SQL queries and save results as JSON."""
+    def run_report(self, snowflake_conn, sql_name, query, output_folder, timeout=None):
+        """
+        Execute one report and stream its results to disk batch by batch.
+
+        :param timeout: Seconds each statement may run before it is cancelled.
+        :return: {"name", "status", "seconds", "rows", "error"} for the report.
+        """
+        started = time.perf_counter()
+        try:
+            if self.arrow:
+                result_sets = snowflake_conn.stream_queries_arrow(
+                    query, timeout=timeout, batched=self.batched
+                )
+            else:
+                result_sets = snowflake_conn.stream_queries(
+                    query,
+                    batch_size=self.batch_size,
+                    timeout=timeout,
+                    batched=self.batched,
+                )  # Run each statement in order
+            # Results are streamed, so this span covers fetching as well as writing
+            with tracer.span(
+                "ReportProcessor.write", report=sql_name, format=self.writer.format
+            ):
+                paths, rows = self.writer.write(output_folder, sql_name, result_sets)
+                tracer.annotate(rows=rows, files=len(paths))
+
+            for output_path in paths:
+                print(f"✅ Saved: {output_path}")
+            return {
+                "name": sql_name,
+                "status": "ok",
+                "seconds": time.perf_counter() - started,
+                "rows": rows,
+                "outputs": [str(path) for path in paths],
+            }
+        except Exception as e:
+            print(f"❌ Error processing {sql_name}: {e}")
+            return {
+                "name": sql_name,
+                "status": "failed",
+                "seconds": time.perf_counter() - started,
+                "error": str(e),
+            }
+
+    def process_reports(
+        self,
+        snowflake_conn,
+        filter_pattern=None,
+        parallelism=1,
+        timeout=None,
+        connector_factory=None,
+        force=False,
+    ):
+        """
+        Execute all SQL queries and save results in the writer's format.
+
+        With parallelism > 1, reports run concurrently, each on a session
+        borrowed from a pool of up to `parallelism` connectors. A failing or
+        timed-out report does not affect the others.
+
+        A manifest in the output folder records every run. Reports whose SQL
+        and output parameters are unchanged since a successful run are
+        skipped unless force is set, so a rerun resumes from the first
+        report that failed or never finished.
+
+        :param snowflake_conn: A connected session, reused as the first pooled session.
+        :param parallelism: Maximum reports running at once.
+        :param timeout: Per-statement timeout in seconds.
+        :param connector_factory: Callable creating additional sessions.
+        :param force: Re-run every report even if it is up to date.
+        :return: Per-report results.
+        """
         queries = self.read_sql_files(filter_pattern)
         iso_date = self.get_iso_run_date()
         output_folder = self.output_base_folder / iso_date
@@ -41,34 +141,114 @@ class ReportProcessor:
 
         if not queries:
             print(f"⚠️ No SQL files matched the filter: '{filter_pattern}'")
-            return
+            return []
 
-        for sql_name, query in queries.items():
-            try:
-                results = snowflake_conn.execute_queries(
-                    query
-                )  # Run each statement in order
-                output_path = output_folder / f"{sql_name}.json"
-                with open(output_path, "w", encoding="utf-8") as json_file:
-                    json.dump(
-                        results,
-                        json_file,
-                        indent=4,
-                        default=self.convert_to_serializable,
+        manifest = RunManifest(output_folder)
+        params = self.output_params()
+        skipped = []
+        if not force:
+            for sql_name, query in list(queries.items()):
+                if manifest.is_up_to_date(sql_name, query, params):
+                    print(f"⏭️ Up to date: {sql_name}")
+                    skipped.append(
+                        {"name": sql_name, "status": "skipped", "seconds": 0.0}
                     )
+                    del queries[sql_name]
 
-                print(f"✅ Saved: {output_path}")
+        started = time.perf_counter()
+        parallelism = max(1, min(parallelism, len(queries)))
+
+        def run(connector, sql_name, query):
+            result = self.run_report(connector, sql_name, query, output_folder, timeout)
+            manifest.record(sql_name, query, params, result)
+            return result
+
+        if parallelism == 1:
+            results = [
+                run(snowflake_conn, sql_name, query)
+                for sql_name, query in queries.items()
+            ]
+        else:
+            results = self._process_concurrently(
+                snowflake_conn,
+                queries,
+                parallelism,
+                connector_factory or type(snowflake_conn),
+                run,
+            )
+
+        elapsed = time.perf_counter() - started
+        failed = [r for r in results if r["status"] != "ok"]
+        print(
+            f"Ran {len(results)} reports ({len(failed)} failed, {len(skipped)} skipped "
+            f"as up to date) in {elapsed:.2f}s wall time; sum of report times "
+            f"{sum(r['seconds'] for r in results):.2f}s."
+        )
+        return skipped + results
+
+    def output_params(self):
+        """Parameters that change a report's output files."""
+        return {
+            "format": self.writer.format,
+            "compression": self.writer.compression,
+        }
+
+    def _process_concurrently(self, snowflake_conn, queries, parallelism, factory, run):
+        """
+        Run reports on a thread pool, one Snowflake session per running report.
+
+        :param run: Callable (connector, sql_name, query) running one report.
+        """
+        sessions = queue.Queue()
+        sessions.put(snowflake_conn)
+        opened = []
+        lock = threading.Lock()
+
+        def borrow():
+            try:
+                return sessions.get_nowait()
+            except queue.Empty:
+                pass
+            with lock:
+                open_new = len(opened) < parallelism - 1
+                if open_new:
+                    connector = factory()
+                    opened.append(connector)
+            if open_new:
+                connector.connect()
+                return connector
+            return sessions.get()
+
+        def run_with_session(sql_name, query):
+            try:
+                connector = borrow()
             except Exception as e:
-                print(f"❌ Error processing {sql_name}: {e}")
+                return {
+                    "name": sql_name,
+                    "status": "failed",
+                    "seconds": 0.0,
+                    "error": str(e),
+                }
+            try:
+                return run(connector, sql_name, query)
+            finally:
+                sessions.put(connector)
+
+        results = []
+        try:
+            with ThreadPoolExecutor(max_workers=parallelism) as executor:
+                futures = [
+                    executor.submit(run_with_session, sql_name, query)
+                    for sql_name, query in queries.items()
+                ]
+                for future in as_completed(futures):
+                    results.append(future.result())
+        finally:
+            for connector in opened:
+                connector.close()
+        return results
 
-    @staticmethod
-    def convert_to_serializable(obj):
-        """Convert non-serializable objects (Decimal, datetime) to JSON-friendly types."""
-        if isinstance(obj, Decimal):
-            return float(obj)  # Convert Decimal to float
-        elif isinstance(obj, datetime.datetime):
-            return obj.isoformat()  # Convert datetime to ISO string
-        raise TypeError(f"Type {type(obj)} not serializable")
+    convert_to_serializable = staticmethod(ReportWriter.convert_to_serializable)
 
 
 if __name__ == "__main__":
@@ -76,16 +256,85 @@ if __name__ == "__main__":
     parser.add_argument(
         "--filter", type=str, help="Optional regex pattern to filter SQL files to run"
     )
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=1,
+        help="Number of reports to run concurrently, each on its own session",
+    )
+    parser.add_argument(
+        "--timeout", type=float, help="Per-statement timeout in seconds"
+    )
+    parser.add_argument(
+        "--format",
+        choices=ReportWriter.formats,
+        default="json",
+        help="Output format for report results",
+    )
+    parser.add_argument(
+        "--compression",
+        help="gzip for json/ndjson/csv; snappy, gzip or zstd for parquet",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=10000,
+        help="Rows fetched and written per batch",
+    )
+    parser.add_argument(
+        "--batched",
+        action="store_true",
+        help="Send each report script as a single multi-statement request",
+    )
+    parser.add_argument(
+        "--arrow",
+        action="store_true",
+        help="Fetch results as Arrow batches decoded in parallel",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-run reports even if the manifest says they are up to date",
+    )
+    parser.add_argument(
+        "--fake-latency",
+        type=float,
+        help="Run against a local fake connector with this per-statement latency",
+    )
 
     args = parser.parse_args()
     filter_pattern = args.filter  # Get filter pattern from arguments
 
+    if args.fake_latency is not None:
+        from server.FakeSnowflakeConnector import FakeSnowflakeConnector
+
+        def connector_factory():
+            return FakeSnowflakeConnector(latency=args.fake_latency)
+
+    else:
+        from server.SnowflakeConnector import SnowflakeConnector
+
+        connector_factory = SnowflakeConnector
+
     # Replace with actual Snowflake credentials
-    snowflake_conn = SnowflakeConnector()
+    snowflake_conn = connector_factory()
 
     try:
         snowflake_conn.connect()
-        processor = ReportProcessor()
-        processor.process_reports(snowflake_conn, filter_pattern)
+        processor = ReportProcessor(
+            writer=ReportWriter(args.format, args.compression),
+            batch_size=args.batch_size,
+            batched=args.batched,
+            arrow=args.arrow,
+        )
+        processor.process_reports(
+            snowflake_conn,
+            filter_pattern,
+            parallelism=args.parallelism,
+            timeout=args.timeout,
+            connector_factory=connector_factory,
+            force=args.force,
+        )
+        print(f"📊 Latency histograms: {tracer.dump_histograms()}")
     finally:
         snowflake_conn.close()
@@ -0,0 +1,287 @@
+import csv
+import datetime
+import gzip
+import json
+import os
+from decimal import Decimal
+from pathlib import Path
+
+
+class ReportWriter:
+    """
+    Streams report result sets to disk one fetch batch at a time.
+
+    Formats:
+        json     - compact [{"query": ..., "result": [...]}, ...], one file per report
+        ndjson   - one JSON object per row
+        csv      - header plus rows
+        parquet  - columnar, written one row group per batch (requires pyarrow)
+
+    The row formats write one file per result set: <name>.<ext> for the
+    first and <name>_<n>.<ext> for any further ones. Every file is written
+    to a temporary name and renamed into place once complete.
+
+    Batches may also be pyarrow Tables or RecordBatches, as produced by the
+    connectors' Arrow fetch path; parquet writes those without converting
+    them to Python rows.
+    """
+
+    formats = ("json", "ndjson", "csv", "parquet")
+    # Rows parquet holds back while a column has only been null so far
+    schema_buffer_rows = 100_000
+    extensions = {
+        "json": "json",
+        "ndjson": "ndjson",
+        "csv": "csv",
+        "parquet": "parquet",
+    }
+
+    def __init__(self, format="json", compression=None):
+        """
+        :param format: One of ReportWriter.formats.
+        :param compression: "gzip" for text formats; a Parquet codec
+            ("snappy", "gzip", "zstd") for parquet.
+        """
+        if format not in self.formats:
+            raise ValueError(
+                f"Unknown format '{format}', expected one of {', '.join(self.formats)}"
+            )
+        if compression and format != "parquet" and compression != "gzip":
+            raise ValueError(f"{format} output only supports gzip compression")
+        self.format = format
+        self.compression = compression
+
+    @staticmethod
+    def convert_to_serializable(obj):
+        """Convert non-serializable objects (Decimal, datetime) to JSON-friendly types."""
+        if isinstance(obj, Decimal):
+            return float(obj)  # Convert Decimal to float
+        elif isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+            return obj.isoformat()  # Convert datetime to ISO string
+        raise TypeError(f"Type {type(obj)} not serializable")
+
+    def output_path(self, output_folder, sql_name, index=0):
+        """Path of the file for a report's index-th result set."""
+        suffix = "" if index == 0 else f"_{index}"
+        path = (
+            Path(output_folder) / f"{sql_name}{suffix}.{self.extensions[self.format]}"
+        )
+        if self.compression == "gzip" and self.format != "parquet":
+            path = path.with_name(path.name + ".gz")
+        return path
+
+    def _open_text(self, path):
+        if self.compression == "gzip":
+            return gzip.open(path, "wt", encoding="utf-8", newline="")
+        return open(path, "w", encoding="utf-8", newline="")
+
+    def write(self, output_folder, sql_name, result_sets):
+        """
+        Write a report's result sets.
+
+        :param result_sets: Iterable of (query, columns, batches) where batches
+            yields lists of row tuples or Arrow tables.
+        :return: (list of written paths, total row count)
+        """
+        if self.format == "json":
+            path = self.output_path(output_folder, sql_name)
+            rows = self._atomic(path, self._write_json, result_sets)
+            return [path], rows
+
+        paths = []
+        total = 0
+        for index, (query, columns, batches) in enumerate(result_sets):
+            path = self.output_path(output_folder, sql_name, index)
+            writer = getattr(self, f"_write_{self.format}")
+            total += self._atomic(path, writer, columns, batches)
+            paths.append(path)
+        return paths, total
+
+    @staticmethod
+    def _atomic(path, writer, *args):
+        """Run writer(temp_path, *args), then rename the temp file over path."""
+        temp_path = path.with_name(f".{path.name}.tmp")
+        try:
+            rows = writer(temp_path, *args)
+            os.replace(temp_path, path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        return rows
+
+    @staticmethod
+    def _rows(batch):
+        """Row tuples for a batch, converting Arrow data column by column."""
+        if hasattr(batch, "schema") and hasattr(batch, "columns"):
+            return list(zip(*(column.to_pylist() for column in batch.columns)))
+        return batch
+
+    def _write_json(self, path, result_sets):
+        encoder = json.JSONEncoder(
+            separators=(",", ":"), default=self.convert_to_serializable
+        )
+        rows = 0
+        with self._open_text(path) as out:
+            out.write("[")
+            for set_index, (query, columns, batches) in enumerate(result_sets):
+                if set_index:
+                    out.write(",")
+                out.write(f'{{"query":{encoder.encode(query)},"result":[')
+                first = True
+                for batch in map(self._rows, batches):
+                    for row in batch:
+                        if not first:
+                            out.write(",")
+                        out.write(encoder.encode(dict(zip(columns, row))))
+                        first = False
+                    rows += len(batch)
+                out.write("]}")
+            out.write("]")
+        return rows
+
+    def _write_ndjson(self, path, columns, batches):
+        encoder = json.JSONEncoder(
+            separators=(",", ":"), default=self.convert_to_serializable
+        )
+        rows = 0
+        with self._open_text(path) as out:
+            for batch in map(self._rows, batches):
+                out.write(
+                    "".join(
+                        encoder.encode(dict(zip(columns, row))) + "\n" for row in batch
+                    )
+                )
+                rows += len(batch)
+        return rows
+
+    def _write_csv(self, path, columns, batches):
+        rows = 0
+        with self._open_text(path) as out:
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow(columns)
+            for batch in map(self._rows, batches):
+                writer.writerows(batch)
+                rows += len(batch)
+        return rows
+
+    def _write_parquet(self, path, columns, batches):
+        """
+        Write batches as row groups under one schema. Leading batches are
+        held back while some column is still all null, so the schema gets
+        that column's real type, and decimals are widened to the largest
+        scale seen; see _promote. A column still all null after
+        schema_buffer_rows rows is written as strings.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("The parquet format requires the pyarrow package.")
+
+        rows = 0
+        writer = None
+        pending = []
+        try:
+            for batch in batches:
+                if not len(batch):
+                    continue
+                table = self._arrow_table(batch, columns)
+                rows += len(batch)
+                if writer is not None:
+                    writer.write_table(self._conform(table, writer.schema))
+                    continue
+
+                pending.append(table)
+                schema = self._promote([table.schema for table in pending])
+                unresolved = any(pa.types.is_null(field.type) for field in schema)
+                if unresolved and rows < self.schema_buffer_rows:
+                    continue
+                writer = self._open_parquet(path, schema)
+                for table in pending:
+                    writer.write_table(self._conform(table, writer.schema))
+                pending = []
+            if writer is None and pending:
+                # Every batch fit in the buffer; keep all-null columns as null
+                schema = self._promote([table.schema for table in pending])
+                writer = pq.ParquetWriter(
+                    path, schema, compression=self.compression or "snappy"
+                )
+                for table in pending:
+                    writer.write_table(self._conform(table, writer.schema))
+            if writer is None:
+                # Empty result: still produce a file with the column names
+                empty = pa.table({name: pa.array([], pa.null()) for name in columns})
+                writer = pq.ParquetWriter(path, empty.schema)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    def _open_parquet(self, path, schema):
+        """A ParquetWriter for schema, with all-null columns typed as strings."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema(
+            field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+            for field in schema
+        )
+        return pq.ParquetWriter(path, schema, compression=self.compression or "snappy")
+
+    @staticmethod
+    def _arrow_table(batch, columns):
+        """A pyarrow Table for a batch of row tuples, a Table or a RecordBatch."""
+        import pyarrow as pa
+
+        if isinstance(batch, pa.RecordBatch):
+            return pa.Table.from_batches([batch])
+        if isinstance(batch, pa.Table):
+            return batch
+        arrays = [pa.array(list(values)) for values in zip(*batch)]
+        return pa.Table.from_arrays(arrays, names=list(columns))
+
+    @staticmethod
+    def _promote(schemas):
+        """
+        One schema covering several batches' inferred schemas: a null column
+        takes the first concrete type any batch has for it, and a decimal
+        column becomes decimal128(38, largest scale).
+        """
+        import pyarrow as pa
+
+        fields = []
+        for column in zip(*schemas):
+            field = column[0]
+            types = [f.type for f in column if not pa.types.is_null(f.type)]
+            if types:
+                field = field.with_type(types[0])
+            scales = [t.scale for t in types if pa.types.is_decimal(t)]
+            if scales:
+                field = field.with_type(pa.decimal128(38, max(scales)))
+            fields.append(field)
+        return pa.schema(fields)
+
+    @staticmethod
+    def _conform(table, schema):
+        """
+        Cast a table to the writer's schema. Decimals with a larger scale
+        than the writer's are rounded half away from zero, since a Parquet
+        file's schema cannot change once the first row group is written.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if table.schema == schema:
+            return table
+        arrays = []
+        for column, field in zip(table.columns, schema):
+            if (
+                pa.types.is_decimal(column.type)
+                and pa.types.is_decimal(field.type)
+                and column.type.scale > field.type.scale
+            ):
+                column = pc.round(
+                    column, ndigits=field.type.scale, round_mode="half_towards_infinity"
+                )
+            arrays.append(column.cast(field.type))
+        return pa.Table.from_arrays(arrays, schema=schema)
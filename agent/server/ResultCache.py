@@ -0,0 +1,216 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+IDENTIFIER = re.compile(r"[a-z_][a-z0-9_$]*")
+
+
+class CacheEntry:
+    def __init__(self, columns, rows, size, versions, created):
+        self.columns = columns
+        self.rows = rows
+        self.size = size
+        self.versions = versions
+        self.created = created
+
+
+class ResultCache:
+    """
+    In-process LRU + TTL cache of complete query results.
+
+    Keys are normalized SQL text plus parameters. Each entry remembers the
+    load version of every table name its query mentions; an entry whose
+    tables have been reloaded since (see LoadMetadata) is dropped on lookup.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, version_poll=None):
+        """
+        :param max_entries: Entry limit (RESULT_CACHE_ENTRIES, default 256).
+        :param max_bytes: Approximate memory ceiling (RESULT_CACHE_BYTES, default 64 MB).
+        :param ttl: Seconds an entry stays valid (RESULT_CACHE_TTL, default 300).
+        :param version_poll: Seconds table versions are reused before being
+            re-read from the database (RESULT_CACHE_VERSION_POLL, default 2).
+        """
+        self.max_entries = int(
+            max_entries
+            if max_entries is not None
+            else os.getenv("RESULT_CACHE_ENTRIES", 256)
+        )
+        self.max_bytes = int(
+            max_bytes
+            if max_bytes is not None
+            else os.getenv("RESULT_CACHE_BYTES", 64 * 1024 * 1024)
+        )
+        self.ttl = float(ttl if ttl is not None else os.getenv("RESULT_CACHE_TTL", 300))
+        self.version_poll = float(
+            version_poll
+            if version_poll is not None
+            else os.getenv("RESULT_CACHE_VERSION_POLL", 2)
+        )
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._versions = {}
+        self._versions_loaded = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize_sql(query):
+        """
+        Canonicalize SQL text: drop comments, collapse whitespace, lowercase
+        everything outside string literals and quoted identifiers, and strip
+        trailing semicolons.
+        """
+        out = []
+        i = 0
+        n = len(query)
+        pending_space = False
+        while i < n:
+            ch = query[i]
+            if ch == "-" and query.startswith("--", i):
+                end = query.find("\n", i)
+                i = n if end == -1 else end
+                pending_space = True
+                continue
+            if ch == "/" and query.startswith("/*", i):
+                end = query.find("*/", i + 2)
+                i = n if end == -1 else end + 2
+                pending_space = True
+                continue
+            if ch.isspace():
+                pending_space = True
+                i += 1
+                continue
+
+            if pending_space and out:
+                out.append(" ")
+            pending_space = False
+
+            if ch in ("'", '"'):
+                # Copy the literal verbatim, honouring doubled quotes.
+                j = i + 1
+                while j < n:
+                    if query[j] == ch:
+                        if j + 1 < n and query[j + 1] == ch:
+                            j += 2
+                            continue
+                        break
+                    j += 1
+                out.append(query[i : j + 1])
+                i = j + 1
+                continue
+
+            out.append(ch.lower())
+            i += 1
+
+        return "".join(out).rstrip("; ")
+
+    def make_key(self, query, params=()):
+        """Build a cache key from a query and its parameters."""
+        normalized = self.normalize_sql(query)
+        if params:
+            normalized += "\x00" + repr(params)
+        return normalized
+
+    @staticmethod
+    def _words(key):
+        """Identifier-like words in a normalized query; a superset of its tables."""
+        return set(IDENTIFIER.findall(key))
+
+    def table_versions(self, loader):
+        """
+        Return the current {table: version} map, re-reading it through
+        loader() at most once per version_poll seconds.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._versions_loaded is not None
+                and now - self._versions_loaded < self.version_poll
+            ):
+                return self._versions
+        versions = loader()
+        with self._lock:
+            self._versions = versions
+            self._versions_loaded = now
+        return versions
+
+    def get(self, key, versions):
+        """
+        Look up a cached result.
+
+        :param versions: Current table versions from table_versions().
+        :return: (columns, rows, size) or None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if now - entry.created > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if any(versions.get(t, 0) != v for t, v in entry.versions.items()):
+                self._remove(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.columns, entry.rows, entry.size
+
+    def put(self, key, columns, rows, size, versions):
+        """
+        Store a complete result.
+
+        :param size: Approximate size of the rows in bytes.
+        :param versions: Table versions the result was read at.
+        """
+        if size > self.max_bytes:
+            return
+        dependencies = {t: versions.get(t, 0) for t in self._words(key)}
+        entry = CacheEntry(columns, rows, size, dependencies, time.monotonic())
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        """Drop an entry. Caller holds the lock."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,183 @@
+import base64
+import csv
+import datetime
+import io
+import json
+from decimal import Decimal
+
+
+class ResultEncoder:
+    """
+    Encodes query results (column names plus row tuples) for the get_query tool.
+
+    Formats:
+        json      - list of row objects, the original get_query output
+        columnar  - column names and types once, then one array per column
+        csv       - header line followed by rows
+        arrow     - base64 Arrow IPC stream (requires pyarrow)
+
+    Value conversion is chosen once per column from its first non-null value
+    instead of being decided for every cell. Array and json/jsonb columns
+    stay lists and objects in the JSON formats, as in the original output,
+    and are rendered as JSON text in csv and arrow.
+    """
+
+    formats = ("json", "columnar", "csv", "arrow")
+
+    @staticmethod
+    def _column_type(values):
+        """Return a portable type name for a column's values."""
+        for value in values:
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                return "boolean"
+            if isinstance(value, int):
+                return "integer"
+            if isinstance(value, (float, Decimal)):
+                return "number"
+            if isinstance(value, datetime.datetime):
+                return "timestamp"
+            if isinstance(value, datetime.date):
+                return "date"
+            if isinstance(value, datetime.time):
+                return "time"
+            if isinstance(value, str):
+                return "string"
+            if isinstance(value, (list, tuple)):
+                return "array"
+            if isinstance(value, dict):
+                return "object"
+            return "other"
+        return "null"
+
+    @staticmethod
+    def _converter(column_type, values, text=False):
+        """
+        Return a function turning a column's values into JSON-friendly ones.
+
+        :param text: Render arrays and objects as JSON text, for formats
+            without nested values.
+        """
+        if column_type in ("timestamp", "date", "time"):
+            return lambda v: None if v is None else v.isoformat()
+        if column_type == "number":
+            if any(isinstance(v, Decimal) for v in values):
+                return lambda v: None if v is None else float(v)
+            return None
+        if column_type in ("array", "object", "other"):
+            convert = ResultEncoder._to_text if text else ResultEncoder._to_json
+            return lambda v: None if v is None else convert(v)
+        return None
+
+    @staticmethod
+    def _to_json(value):
+        """Value with lists and objects kept and only what JSON cannot hold converted."""
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        if isinstance(value, (list, tuple)):
+            return [ResultEncoder._to_json(v) for v in value]
+        if isinstance(value, dict):
+            return {str(k): ResultEncoder._to_json(v) for k, v in value.items()}
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return base64.b64encode(bytes(value)).decode("ascii")
+        return str(value)
+
+    @staticmethod
+    def _to_text(value):
+        """Value as a string, with lists and objects as JSON text."""
+        if isinstance(value, (list, tuple, dict)):
+            return json.dumps(ResultEncoder._to_json(value))
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return base64.b64encode(bytes(value)).decode("ascii")
+        return str(value)
+
+    def _typed_columns(self, columns, rows, text=False):
+        """Transpose rows into converted column arrays and their type names."""
+        arrays = [list(col) for col in zip(*rows)] if rows else [[] for _ in columns]
+        types = []
+        for i, values in enumerate(arrays):
+            column_type = self._column_type(values)
+            convert = self._converter(column_type, values, text)
+            if convert is not None:
+                arrays[i] = [convert(v) for v in values]
+            types.append(column_type)
+        return arrays, types
+
+    def encode(self, columns, rows, format="json", continuation=None):
+        """
+        Encode one page of results.
+
+        :param columns: Column names.
+        :param rows: Sequence of row tuples.
+        :param format: One of ResultEncoder.formats.
+        :param continuation: Token for the next page, if any.
+        :return: The encoded result as a string.
+        """
+        if format not in self.formats:
+            raise ValueError(
+                f"Unknown format '{format}', expected one of {', '.join(self.formats)}"
+            )
+        return getattr(self, f"_encode_{format}")(columns, rows, continuation)
+
+    def _encode_json(self, columns, rows, continuation):
+        arrays, _ = self._typed_columns(columns, rows)
+        data = [dict(zip(columns, row)) for row in zip(*arrays)] if rows else []
+        if continuation is None:
+            return json.dumps(data)
+        return json.dumps(
+            {"data": data, "row_count": len(data), "continuation": continuation}
+        )
+
+    def _encode_columnar(self, columns, rows, continuation):
+        arrays, types = self._typed_columns(columns, rows)
+        payload = {
+            "columns": list(columns),
+            "types": types,
+            "data": arrays,
+            "row_count": len(rows),
+        }
+        if continuation is not None:
+            payload["continuation"] = continuation
+        return json.dumps(payload, separators=(",", ":"))
+
+    def _encode_csv(self, columns, rows, continuation):
+        arrays, _ = self._typed_columns(columns, rows, text=True)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(zip(*arrays))
+        if continuation is not None:
+            buffer.write(f"# continuation: {continuation}\n")
+        return buffer.getvalue()
+
+    def _encode_arrow(self, columns, rows, continuation):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ValueError("The arrow format requires the pyarrow package.")
+
+        arrays = [list(col) for col in zip(*rows)] if rows else [[] for _ in columns]
+        for i, values in enumerate(arrays):
+            # Arrow keeps native types; only values it has no type for,
+            # including arrays and json/jsonb objects, become text
+            if self._column_type(values) in ("array", "object"):
+                arrays[i] = [None if v is None else self._to_text(v) for v in values]
+        table = pa.Table.from_arrays(
+            [pa.array(values) for values in arrays], names=list(columns)
+        )
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        payload = {
+            "format": "arrow",
+            "row_count": len(rows),
+            "data": base64.b64encode(sink.getvalue().to_pybytes()).decode("ascii"),
+        }
+        if continuation is not None:
+            payload["continuation"] = continuation
+        return json.dumps(payload)
@@ -0,0 +1,81 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+class RunManifest:
+    """
+    Per-output-folder record of report runs.
+
+    For each report the manifest keeps the hash of its SQL text, the output
+    parameters, row count, duration, status and output files of the latest
+    run, plus a history of earlier runs. A report whose SQL and parameters
+    are unchanged and whose last run succeeded with its files still present
+    is up to date and can be skipped.
+    """
+
+    file_name = "manifest.json"
+
+    # Earlier runs kept per report for timing history.
+    history_limit = 50
+
+    def __init__(self, output_folder):
+        self.path = Path(output_folder) / self.file_name
+        self._lock = threading.Lock()
+        self.reports = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as manifest_file:
+                self.reports = json.load(manifest_file).get("reports", {})
+
+    @staticmethod
+    def sql_hash(query):
+        """Content hash of a report's SQL text."""
+        return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+    def is_up_to_date(self, sql_name, query, params):
+        """Return True if the report's last run can be reused."""
+        entry = self.reports.get(sql_name)
+        return bool(
+            entry
+            and entry.get("status") == "ok"
+            and entry.get("sql_hash") == self.sql_hash(query)
+            and entry.get("params") == params
+            and entry.get("outputs")
+            and all(os.path.exists(path) for path in entry["outputs"])
+        )
+
+    def record(self, sql_name, query, params, result):
+        """
+        Record a report run and save the manifest immediately, so a crash
+        later in the run keeps everything finished so far.
+
+        :param result: The dict returned by ReportProcessor.run_report.
+        """
+        finished_at = datetime.datetime.now().isoformat(timespec="seconds")
+        run = {
+            "finished_at": finished_at,
+            "status": result["status"],
+            "seconds": round(result["seconds"], 3),
+            "rows": result.get("rows"),
+        }
+        with self._lock:
+            history = self.reports.get(sql_name, {}).get("history", [])
+            self.reports[sql_name] = {
+                "sql_hash": self.sql_hash(query),
+                "params": params,
+                **run,
+                "outputs": result.get("outputs", []),
+                "error": result.get("error"),
+                "history": (history + [run])[-self.history_limit :],
+            }
+            self._save()
+
+    def _save(self):
+        """Write the manifest atomically. Caller holds the lock."""
+        temp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump({"reports": self.reports}, manifest_file, indent=2)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+from datetime import date, datetime
+
+from psycopg2 import sql
+
+from server.SchemaIndex import SchemaIndex
+
+
+class SchemaCatalog:
+    """
+    In-memory catalog of the tables, columns and sample rows in a schema.
+
+    A single fingerprint query (column definitions plus write counters per
+    table) decides what needs refreshing: tables whose DDL changed get their
+    columns reloaded, tables with new writes get fresh samples, and unchanged
+    tables are served from memory. The catalog is snapshotted to disk so a
+    restarted process starts warm.
+    """
+
+    fingerprint_query = """
+        SELECT c.relname,
+               md5(string_agg(a.attname || ':' || format_type(a.atttypid, a.atttypmod),
+                              ',' ORDER BY a.attnum)),
+               coalesce(s.n_tup_ins, 0) + coalesce(s.n_tup_upd, 0) + coalesce(s.n_tup_del, 0)
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE n.nspname = %s AND c.relkind IN ('r', 'p')
+        GROUP BY c.relname, s.n_tup_ins, s.n_tup_upd, s.n_tup_del;
+    """
+
+    columns_query = """
+        SELECT table_name, column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = ANY(%s)
+        ORDER BY table_name, ordinal_position;
+    """
+
+    def __init__(self, connection, schema="public", sample_rows=3, snapshot_path=None):
+        """
+        :param connection: A database connection object.
+        :param schema: Schema to catalog.
+        :param sample_rows: Sample rows kept per table.
+        :param snapshot_path: JSON snapshot file (SCHEMA_CATALOG_PATH, default
+            $LOG_PATH/logs/schema_catalog_<schema>.json). Pass False to disable.
+        """
+        self.connection = connection
+        self.schema = schema
+        self.sample_rows = sample_rows
+        if snapshot_path is None:
+            snapshot_path = os.getenv(
+                "SCHEMA_CATALOG_PATH",
+                os.path.join(
+                    os.environ.get("LOG_PATH", "/tmp"),
+                    "logs",
+                    f"schema_catalog_{schema}.json",
+                ),
+            )
+        self.snapshot_path = snapshot_path
+
+        # table -> {"columns": [...], "types": [...], "sample_data": [...]}
+        self.tables = {}
+        # table -> [ddl_hash, write_count]
+        self.fingerprints = {}
+        self._index = None
+        self._load_snapshot()
+
+    def refresh(self):
+        """
+        Bring the catalog up to date with the database.
+
+        :return: The list of tables that were (re)loaded.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(self.fingerprint_query, (self.schema,))
+                current = {
+                    table: [ddl_hash, int(writes)]
+                    for table, ddl_hash, writes in cursor.fetchall()
+                }
+
+                dropped = sorted(set(self.tables) - set(current))
+                for table in dropped:
+                    del self.tables[table]
+
+                ddl_changed = [
+                    t
+                    for t in current
+                    if t not in self.tables
+                    or self.fingerprints.get(t, [None])[0] != current[t][0]
+                ]
+                data_changed = [
+                    t
+                    for t in current
+                    if t in ddl_changed or self.fingerprints.get(t) != current[t]
+                ]
+
+                if ddl_changed:
+                    self._load_columns(cursor, ddl_changed)
+                if data_changed:
+                    self._load_samples(cursor, data_changed)
+        finally:
+            # Statistics views are snapshotted per transaction; end it so the
+            # next refresh sees fresh counters.
+            self.connection.rollback()
+
+        changed = sorted(set(ddl_changed) | set(data_changed))
+        self.fingerprints = current
+        if changed or dropped:
+            self._index = None
+            self._save_snapshot()
+        return changed
+
+    def _load_columns(self, cursor, tables):
+        """Load column names and types for the given tables in one query."""
+        cursor.execute(self.columns_query, (self.schema, list(tables)))
+        for table in tables:
+            self.tables[table] = {"columns": [], "types": [], "sample_data": []}
+        for table, column, data_type in cursor.fetchall():
+            self.tables[table]["columns"].append(column)
+            self.tables[table]["types"].append(data_type)
+
+    def _load_samples(self, cursor, tables):
+        """Fetch sample rows for all given tables in a single round trip."""
+        parts = [
+            sql.SQL(
+                "SELECT {name}, (SELECT json_agg(s) FROM (SELECT * FROM {table} LIMIT {n}) s)"
+            ).format(
+                name=sql.Literal(table),
+                table=sql.Identifier(self.schema, table),
+                n=sql.Literal(self.sample_rows),
+            )
+            for table in tables
+        ]
+        cursor.execute(sql.SQL(" UNION ALL ").join(parts))
+        for table, samples in cursor.fetchall():
+            self.tables[table]["sample_data"] = [
+                list(row.values()) for row in samples or []
+            ]
+
+    def schema_info(self):
+        """Return {table: {"columns", "sample_data"}} in the shape PromptGenerator uses."""
+        return {
+            table: {"columns": info["columns"], "sample_data": info["sample_data"]}
+            for table, info in sorted(self.tables.items())
+        }
+
+    def index(self):
+        """Return a relevance index over the catalog, rebuilt only after changes."""
+        if self._index is None:
+            self._index = SchemaIndex(self.schema_info())
+        return self._index
+
+    def fingerprint(self):
+        """Hash of every table's column definitions; changes only on DDL."""
+        digest = hashlib.sha256()
+        for table, (ddl_hash, _) in sorted(self.fingerprints.items()):
+            digest.update(f"{table}:{ddl_hash};".encode())
+        return digest.hexdigest()
+
+    def _load_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as snapshot:
+                data = json.load(snapshot)
+            if data.get("schema") == self.schema:
+                self.tables = data["tables"]
+                self.fingerprints = data["fingerprints"]
+        except (OSError, ValueError, KeyError):
+            self.tables, self.fingerprints = {}, {}
+
+    def _save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as snapshot:
+            json.dump(
+                {
+                    "schema": self.schema,
+                    "fingerprints": self.fingerprints,
+                    "tables": self.tables,
+                },
+                snapshot,
+                default=lambda obj: (
+                    obj.isoformat() if isinstance(obj, (date, datetime)) else str(obj)
+                ),
+            )
+        os.replace(temp_path, self.snapshot_path)
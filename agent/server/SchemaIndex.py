@@ -0,0 +1,76 @@
+import math
+import re
+from collections import Counter
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase word tokens; identifiers are split on underscores as well."""
+    return TOKEN.findall(str(text).lower())
+
+
+class SchemaIndex:
+    """
+    Offline BM25 index over tables, used to pick the tables relevant to a question.
+
+    Each table is one document made of its name, its column names and the
+    values in its sample rows. Names are weighted above sample values.
+    """
+
+    def __init__(self, schema_info, k1=1.5, b=0.75, name_weight=3):
+        """
+        :param schema_info: {table: {"columns": [...], "sample_data": [...]}}
+        """
+        self.k1 = k1
+        self.b = b
+        self.documents = {}
+        for table, info in schema_info.items():
+            terms = tokenize(table) * name_weight
+            for column in info["columns"]:
+                terms += tokenize(column) * name_weight
+            for row in info["sample_data"]:
+                for value in row:
+                    if value is not None:
+                        terms += tokenize(value)
+            self.documents[table] = Counter(terms)
+
+        self.lengths = {t: sum(c.values()) for t, c in self.documents.items()}
+        self.average_length = (
+            sum(self.lengths.values()) / len(self.lengths) if self.lengths else 0.0
+        )
+        document_frequency = Counter()
+        for counts in self.documents.values():
+            document_frequency.update(counts.keys())
+        n = len(self.documents)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def score(self, query):
+        """Return {table: BM25 score} for a natural-language query."""
+        terms = [t for t in tokenize(query) if t in self.idf]
+        scores = {}
+        for table, counts in self.documents.items():
+            norm = self.k1 * (
+                1 - self.b + self.b * self.lengths[table] / (self.average_length or 1)
+            )
+            score = 0.0
+            for term in terms:
+                tf = counts.get(term, 0)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores[table] = score
+        return scores
+
+    def rank(self, query, top_k=None):
+        """
+        Return table names ordered by relevance, best first.
+
+        Ties (including no matches at all) keep alphabetical order, so the
+        result is deterministic.
+        """
+        scores = self.score(query)
+        ranked = sorted(scores, key=lambda t: (-scores[t], t))
+        return ranked[:top_k] if top_k else ranked
@@ -0,0 +1,27 @@
+from server.DatabaseBackend import DatabaseBackend
+from server.SnowflakeConnector import SnowflakeConnector
+from server.SnowflakeQueryHandler import SnowflakeQueryHandler
+from server.SnowflakeSchemaCatalog import SnowflakeSchemaCatalog
+from server.SnowflakeSessionPool import SnowflakeSessionPool
+
+
+class SnowflakeBackend(DatabaseBackend):
+    """
+    Snowflake through a SnowflakeSessionPool of kept-alive sessions, so
+    tool calls reuse logged-in sessions instead of paying the login each time.
+
+    Results are not cached here; Snowflake's own result cache serves
+    repeated queries.
+    """
+
+    name = "Snowflake"
+    handler_class = SnowflakeQueryHandler
+
+    def _create_pool(self):
+        return SnowflakeSessionPool()
+
+    def _create_catalog(self):
+        connector = SnowflakeConnector()
+        return SnowflakeSchemaCatalog(
+            connector.new_session(), (connector.schema or "PUBLIC").upper()
+        )
@@ -1,19 +1,32 @@
 import os
+import threading
 import snowflake.connector as sc
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 
+from server.ArrowFetcher import ArrowFetcher
+from server.SqlSplitter import SqlSplitter
+from server.Tracer import tracer
+
 
 class SnowflakeConnector:
     """
     A class to handle Snowflake connections using RSA authentication.
+
+    The decoded private key is cached per process, keyed by file path and
+    modification time, so creating further connectors does not re-read and
+    re-parse the PEM file.
     """
 
+    _key_cache = {}
+    _key_lock = threading.Lock()
+
     def __init__(self):
         """
         Initializes the SnowflakeConnector using environment variables.
         """
         self.conn = None
+        self.arrow_fetcher = ArrowFetcher()
         self.private_key_file = os.getenv("SNOWFLAKE_PRIVATE_KEY_FILE")
         self.private_key_file_pwd = os.getenv(
             "SNOWFLAKE_PRIVATE_KEY_PASSWORD", ""
@@ -23,6 +36,7 @@ class SnowflakeConnector:
         self.warehouse = os.getenv("SNOWFLAKE_WAREHOUSE")
         self.database = os.getenv("SNOWFLAKE_DATABASE")
         self.schema = os.getenv("SNOWFLAKE_SCHEMA")
+        self.keep_alive = os.getenv("SNOWFLAKE_KEEP_ALIVE", "true").lower() == "true"
 
         self.conn_params = {
             "account": self.account,
@@ -31,39 +45,59 @@ class SnowflakeConnector:
             "warehouse": self.warehouse,
             "database": self.database,
             "schema": self.schema,
+            # Heartbeats keep pooled sessions logged in between tool calls
+            "client_session_keep_alive": self.keep_alive,
         }
 
     def _load_private_key(self):
         """
-        Loads the private key from the specified file.
+        Loads the private key from the specified file, or from the cache.
         """
         try:
-            with open(self.private_key_file, "rb") as key_file:
-                private_key = key_file.read()
-                p_key = serialization.load_pem_private_key(
-                    private_key, password=None, backend=default_backend()
-                )
-
-                pkb = p_key.private_bytes(
-                    encoding=serialization.Encoding.DER,
-                    format=serialization.PrivateFormat.PKCS8,
-                    encryption_algorithm=serialization.NoEncryption(),
-                )
-
-            return pkb
+            cache_key = (
+                self.private_key_file,
+                os.path.getmtime(self.private_key_file),
+            )
+            with self._key_lock:
+                if cache_key not in self._key_cache:
+                    self._key_cache[cache_key] = self._read_private_key()
+                return self._key_cache[cache_key]
         except Exception as e:
             raise Exception(f"Error loading private key: {e}")
 
-    def connect(self):
+    def _read_private_key(self):
+        """Read and decode the PEM private key file into DER bytes."""
+        with open(self.private_key_file, "rb") as key_file:
+            private_key = key_file.read()
+            p_key = serialization.load_pem_private_key(
+                private_key, password=None, backend=default_backend()
+            )
+
+            pkb = p_key.private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption(),
+            )
+
+        return pkb
+
+    def new_session(self):
         """
-        Establishes a connection to Snowflake.
+        Open and return a new Snowflake connection without attaching it to
+        this connector, e.g. for a session pool.
         """
         try:
-            self.conn = sc.connect(**self.conn_params)
-            print("Connected to Snowflake successfully.")
+            return sc.connect(**self.conn_params)
         except Exception as e:
             raise Exception(f"Failed to connect to Snowflake: {e}")
 
+    def connect(self):
+        """
+        Establishes a connection to Snowflake.
+        """
+        self.conn = self.new_session()
+        print("Connected to Snowflake successfully.")
+
     def execute_query(self, query):
         """
         Executes a SQL query and returns the results.
@@ -78,20 +112,65 @@ class SnowflakeConnector:
         except Exception as e:
             raise Exception(f"Error executing query: {e}")
 
-    def execute_queries(self, query_text):
-        """Execute each semi-colon-separated SQL command and return all results."""
+    @staticmethod
+    def _run_statements(cursor, query_text, timeout=None, batched=False):
+        """
+        Run a script's statements on a cursor, yielding each statement once
+        the cursor is positioned on its result.
+
+        In batched mode the whole script is sent as one multi-statement
+        request and the result sets are walked with nextset(), so the
+        script costs a single round trip instead of one per statement.
+
+        Each execute (and each nextset, which waits for the next statement
+        of a batch) runs in a "SnowflakeConnector.execute" span. The spans
+        end before the statement is yielded, so they time Snowflake's work
+        rather than the caller's fetching.
+        """
+        statements = SqlSplitter.split(query_text)
+
+        if batched and len(statements) > 1:
+            with tracer.span(
+                "SnowflakeConnector.execute", statements=len(statements), batched=True
+            ):
+                # Newlines keep a trailing line comment from swallowing the separator
+                cursor.execute(
+                    "\n;\n".join(statements),
+                    num_statements=len(statements),
+                    timeout=timeout,
+                )
+            for index, statement in enumerate(statements):
+                if index:
+                    with tracer.span(
+                        "SnowflakeConnector.execute", statement=index, batched=True
+                    ):
+                        more = cursor.nextset()
+                    if not more:
+                        break
+                yield statement
+            return
+
+        for index, statement in enumerate(statements):
+            with tracer.span("SnowflakeConnector.execute", statement=index):
+                cursor.execute(statement, timeout=timeout)
+            yield statement
+
+    @tracer.traced("SnowflakeConnector.execute_queries")
+    def execute_queries(self, query_text, timeout=None, batched=False):
+        """
+        Execute each SQL statement in a script and return all results.
+
+        :param timeout: Seconds each statement may run before Snowflake cancels it.
+        :param batched: Send the script as a single multi-statement request.
+        """
         if self.conn is None:
             self.connect()
 
         cursor = self.conn.cursor()
         try:
             results = []
-            queries = [
-                q.strip() for q in query_text.split(";") if q.strip()
-            ]  # Split by `;` and remove empty queries
 
-            for query in queries:
-                cursor.execute(query)
+            for query in self._run_statements(cursor, query_text, timeout, batched):
                 if cursor.description:  # Only capture results if there is a result set
                     columns = [desc[0] for desc in cursor.description]
                     query_results = [
@@ -103,6 +182,86 @@ class SnowflakeConnector:
         finally:
             cursor.close()
 
+    def stream_queries(self, query_text, batch_size=10000, timeout=None, batched=False):
+        """
+        Execute each SQL statement in a script, yielding result sets lazily.
+
+        Yields (query, columns, batches) for every statement with a result
+        set, where batches yields lists of at most batch_size row tuples
+        fetched with fetchmany. Each result set must be consumed before the
+        next statement runs.
+
+        :param timeout: Seconds each statement may run before Snowflake cancels it.
+        :param batched: Send the script as a single multi-statement request.
+        """
+        if self.conn is None:
+            self.connect()
+
+        cursor = self.conn.cursor()
+        try:
+            for query in self._run_statements(cursor, query_text, timeout, batched):
+                if cursor.description:  # Only capture results if there is a result set
+                    columns = [desc[0] for desc in cursor.description]
+                    yield query, columns, iter(lambda: cursor.fetchmany(batch_size), [])
+        finally:
+            cursor.close()
+
+    def fetch_arrow(self, query, output="table", timeout=None, workers=None):
+        """
+        Execute a query and fetch its result as Arrow, skipping per-row
+        Python objects.
+
+        The result batches Snowflake returns are downloaded and decoded in
+        parallel by an ArrowFetcher. Requires the Arrow result format, the
+        connector's default.
+
+        :param output: "table" (pyarrow.Table), "pandas" (DataFrame) or
+            "batches" (iterator of pyarrow.RecordBatch, decoded on demand).
+        :param timeout: Seconds the query may run before Snowflake cancels it.
+        :param workers: Batches decoded at once; see ArrowFetcher.
+        """
+        if self.conn is None:
+            self.connect()
+
+        fetcher = ArrowFetcher(workers) if workers else self.arrow_fetcher
+        with self.conn.cursor() as cursor:
+            cursor.execute(query, timeout=timeout)
+            batches = cursor.get_result_batches() or []
+            columns = [desc[0] for desc in cursor.description or ()]
+
+        if output == "batches":
+            return fetcher.fetch(batches, output)
+        table = fetcher.to_table(batches, schema=self._empty_schema(columns))
+        return table.to_pandas() if output == "pandas" else table
+
+    def stream_queries_arrow(self, query_text, timeout=None, batched=False):
+        """
+        Arrow counterpart of stream_queries.
+
+        Yields (query, columns, tables) for every statement with a result
+        set, where tables yields one pyarrow.Table per result batch, decoded
+        in parallel. The batches are captured when the statement finishes,
+        so result sets may be consumed after later statements have run.
+        """
+        if self.conn is None:
+            self.connect()
+
+        cursor = self.conn.cursor()
+        try:
+            for query in self._run_statements(cursor, query_text, timeout, batched):
+                if cursor.description:  # Only capture results if there is a result set
+                    columns = [desc[0] for desc in cursor.description]
+                    batches = cursor.get_result_batches() or []
+                    yield query, columns, self.arrow_fetcher.iter_tables(batches)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _empty_schema(columns):
+        """Schema for a result with no batches: the column names, untyped."""
+        pa = ArrowFetcher._pyarrow()
+        return pa.schema([(column, pa.null()) for column in columns])
+
     def close(self):
         """
         Closes the Snowflake connection.
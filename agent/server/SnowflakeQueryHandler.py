@@ -0,0 +1,35 @@
+from collections import deque
+
+from server.CursorRegistry import OpenCursor
+from server.QueryHandler import QueryHandler
+
+
+class SnowflakeQueryHandler(QueryHandler):
+    """
+    QueryHandler for pooled Snowflake sessions.
+
+    Snowflake keeps a statement's result on the server and the cursor
+    downloads it in chunks, so an ordinary cursor pages through it as a
+    Postgres named cursor would. The timeout is passed to execute and
+    enforced by Snowflake.
+    """
+
+    def _open_cursor(self, query, params, timeout=None):
+        """Execute a query on a freshly acquired session."""
+        connection = self._acquire()
+        try:
+            cursor = connection.cursor()
+            # Without params the connector leaves % in the SQL untouched
+            cursor.execute(query, params or None, timeout=timeout)
+        except Exception:
+            self._release(connection)
+            raise
+
+        entry = OpenCursor(connection, cursor, None, deque(), self._release)
+        if cursor.description is None:
+            # Statement without a result set
+            entry.columns = []
+            entry.exhausted = True
+        else:
+            entry.columns = [desc[0] for desc in cursor.description]
+        return entry
@@ -0,0 +1,97 @@
+import json
+import os
+
+from server.SchemaCatalog import SchemaCatalog
+
+
+def quote_identifier(name):
+    """Quote a Snowflake identifier, preserving its case."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SnowflakeSchemaCatalog(SchemaCatalog):
+    """
+    SchemaCatalog over a Snowflake schema.
+
+    The fingerprint hashes each table's column definitions and uses the
+    table's LAST_ALTERED time, which moves on both DDL and DML, in place
+    of the Postgres write counters.
+    """
+
+    fingerprint_query = """
+        SELECT c.table_name,
+               MD5(LISTAGG(c.column_name || ':' || c.data_type, ',')
+                   WITHIN GROUP (ORDER BY c.ordinal_position)),
+               DATE_PART(epoch_second, t.last_altered)
+        FROM information_schema.columns c
+        JOIN information_schema.tables t
+          ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+        WHERE c.table_schema = %s AND t.table_type = 'BASE TABLE'
+        GROUP BY c.table_name, t.last_altered;
+    """
+
+    def __init__(self, connection, schema="PUBLIC", sample_rows=3, snapshot_path=None):
+        """
+        :param connection: A snowflake.connector connection.
+        :param schema: Schema to catalog; unquoted names are upper case in Snowflake.
+        :param snapshot_path: JSON snapshot file (SCHEMA_CATALOG_PATH, default
+            $LOG_PATH/logs/schema_catalog_snowflake_<schema>.json). Pass False
+            to disable.
+        """
+        if snapshot_path is None:
+            snapshot_path = os.getenv(
+                "SCHEMA_CATALOG_PATH",
+                os.path.join(
+                    os.environ.get("LOG_PATH", "/tmp"),
+                    "logs",
+                    f"schema_catalog_snowflake_{schema}.json",
+                ),
+            )
+        super().__init__(connection, schema, sample_rows, snapshot_path)
+
+    def _load_columns(self, cursor, tables):
+        """Load column names and types for the given tables in one query."""
+        placeholders = ", ".join(["%s"] * len(tables))
+        cursor.execute(
+            f"""
+            SELECT table_name, column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = %s AND table_name IN ({placeholders})
+            ORDER BY table_name, ordinal_position;
+            """,
+            (self.schema, *tables),
+        )
+        for table in tables:
+            self.tables[table] = {"columns": [], "types": [], "sample_data": []}
+        for table, column, data_type in cursor.fetchall():
+            self.tables[table]["columns"].append(column)
+            self.tables[table]["types"].append(data_type)
+
+    def _load_samples(self, cursor, tables):
+        """
+        Fetch sample rows for all given tables in a single round trip.
+
+        Rows are built as objects keyed by column name with
+        OBJECT_CONSTRUCT_KEEP_NULL, since ARRAY_CONSTRUCT renders SQL NULL
+        as undefined, which is not valid JSON, and are turned back into
+        lists in column order here.
+        """
+        parts = []
+        params = []
+        for table in tables:
+            columns = self.tables[table]["columns"]
+            pairs = ", ".join(f"%s, {quote_identifier(column)}" for column in columns)
+            parts.append(
+                f"SELECT %s, (SELECT ARRAY_AGG(OBJECT_CONSTRUCT_KEEP_NULL({pairs})) "
+                f"FROM (SELECT * FROM {quote_identifier(self.schema)}."
+                f"{quote_identifier(table)} LIMIT {int(self.sample_rows)}))"
+            )
+            params.extend([table, *columns])
+        cursor.execute(" UNION ALL ".join(parts), params)
+        for table, samples in cursor.fetchall():
+            # VARIANT values come back as JSON text
+            rows = json.loads(samples) if samples else []
+            columns = self.tables[table]["columns"]
+            self.tables[table]["sample_data"] = [
+                [row.get(column) for column in columns] for row in rows
+            ]
@@ -0,0 +1,83 @@
+import os
+
+from server.ConnectionPool import ConnectionPool
+from server.SnowflakeConnector import SnowflakeConnector
+
+
+class SnowflakeSessionPool(ConnectionPool):
+    """
+    A thread-safe pool of logged-in Snowflake sessions.
+
+    Logging in to Snowflake costs far more than a Postgres connect, so
+    sessions are kept open and reused across tool calls. They are opened
+    with client_session_keep_alive, so idle sessions do not expire, and
+    the private key is decoded once per process by SnowflakeConnector.
+    """
+
+    def __init__(
+        self,
+        min_size=None,
+        max_size=None,
+        checkout_timeout=None,
+        health_check_interval=None,
+    ):
+        """
+        :param min_size: Sessions opened eagerly (SNOWFLAKE_POOL_MIN, default 1).
+        :param max_size: Upper bound on open sessions (SNOWFLAKE_POOL_MAX, default 4).
+        :param checkout_timeout: Seconds to wait for a free session (SNOWFLAKE_POOL_TIMEOUT, default 60).
+        :param health_check_interval: Idle seconds after which a session is pinged
+            on checkout (SNOWFLAKE_POOL_HEALTH_CHECK, default 300).
+        """
+        self.connector = SnowflakeConnector()
+        super().__init__(
+            min_size=(
+                min_size if min_size is not None else os.getenv("SNOWFLAKE_POOL_MIN", 1)
+            ),
+            max_size=(
+                max_size if max_size is not None else os.getenv("SNOWFLAKE_POOL_MAX", 4)
+            ),
+            checkout_timeout=(
+                checkout_timeout
+                if checkout_timeout is not None
+                else os.getenv("SNOWFLAKE_POOL_TIMEOUT", 60)
+            ),
+            health_check_interval=(
+                health_check_interval
+                if health_check_interval is not None
+                else os.getenv("SNOWFLAKE_POOL_HEALTH_CHECK", 300)
+            ),
+        )
+
+    def _open(self):
+        """Log in a new session using the connector's cached credentials."""
+        return self.connector.new_session()
+
+    @staticmethod
+    def _is_closed(connection):
+        return connection.is_closed()
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(connection):
+        """Sessions autocommit; roll back only if a transaction was opened."""
+        try:
+            if not connection.autocommit:
+                connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_connection(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,94 @@
+import re
+
+# Postgres-style dollar-quote opener: $$ or $tag$
+DOLLAR_TAG = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)?\$")
+
+
+class SqlSplitter:
+    """
+    Splits a SQL script into statements on top-level semicolons.
+
+    Semicolons inside single-quoted strings (with '' or backslash escapes),
+    double-quoted identifiers, --, // and /* */ comments, and $$ / $tag$
+    dollar-quoted bodies do not end a statement. Statements that contain
+    nothing but comments and whitespace are dropped.
+    """
+
+    @staticmethod
+    def split(script):
+        """
+        :param script: SQL text with one or more statements.
+        :return: List of statement strings without their terminating semicolons.
+        """
+        statements = []
+        start = 0
+        has_code = False
+        i = 0
+        n = len(script)
+
+        while i < n:
+            ch = script[i]
+
+            if ch == ";":
+                if has_code:
+                    statements.append(script[start:i].strip())
+                start = i + 1
+                has_code = False
+                i += 1
+                continue
+
+            if script.startswith("--", i) or script.startswith("//", i):
+                end = script.find("\n", i)
+                i = n if end == -1 else end + 1
+                continue
+
+            if ch == "/" and script.startswith("/*", i):
+                end = script.find("*/", i + 2)
+                i = n if end == -1 else end + 2
+                continue
+
+            if ch.isspace():
+                i += 1
+                continue
+
+            has_code = True
+
+            if ch == "'":
+                i += 1
+                while i < n:
+                    if script[i] == "\\":
+                        i += 2
+                    elif script[i] == "'":
+                        if script.startswith("''", i):
+                            i += 2
+                        else:
+                            break
+                    else:
+                        i += 1
+                i += 1
+                continue
+
+            if ch == '"':
+                end = i + 1
+                while True:
+                    end = script.find('"', end)
+                    if end == -1 or not script.startswith('""', end):
+                        break
+                    end += 2
+                i = n if end == -1 else end + 1
+                continue
+
+            # $ inside an identifier (e.g. col$1) does not open a dollar quote
+            preceding = script[i - 1] if i else ""
+            if ch == "$" and not (preceding.isalnum() or preceding == "_"):
+                match = DOLLAR_TAG.match(script, i)
+                if match:
+                    end = script.find(match.group(0), match.end())
+                    i = n if end == -1 else end + len(match.group(0))
+                    continue
+
+            i += 1
+
+        if has_code:
+            statements.append(script[start:].strip())
+        return statements
@@ -0,0 +1,388 @@
+import atexit
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Span active in the current thread or asyncio task.
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# W3C trace context header: version-trace_id-parent_id-flags
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Span:
+    """One timed operation; spans of a request share a trace_id."""
+
+    def __init__(self, name, trace_id, parent_id, service, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.service = service
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.error = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+
+    @property
+    def traceparent(self):
+        """This span as a W3C traceparent value, for child spans in other processes."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, **attributes):
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    def fail(self, error):
+        """Mark the span failed, e.g. with an error handled rather than raised."""
+        self.status = "error"
+        self.error = repr(error) if isinstance(error, BaseException) else str(error)
+
+    def end(self):
+        self.duration_ms = 1000 * (time.perf_counter() - self._started)
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "service": self.service,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class InMemoryExporter:
+    """Keeps the most recent finished spans in memory."""
+
+    def __init__(self, max_spans=10000):
+        self.spans = deque(maxlen=max_spans)
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+
+class FileExporter:
+    """Appends finished spans to a file as JSON lines."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, span):
+        line = json.dumps(span.to_json(), default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as trace_file:
+                trace_file.write(line)
+
+
+class LatencyHistogram:
+    """Span durations in fixed, roughly logarithmic millisecond buckets."""
+
+    bounds = (
+        0.5,
+        1,
+        2,
+        5,
+        10,
+        20,
+        50,
+        100,
+        200,
+        500,
+        1000,
+        2000,
+        5000,
+        10000,
+        20000,
+        60000,
+    )
+
+    def __init__(self):
+        # One count per bound, plus one for durations above the last bound
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+        self.errors = 0
+
+    def record(self, duration_ms, error=False):
+        self.counts[bisect.bisect_left(self.bounds, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        if self.min_ms is None or duration_ms < self.min_ms:
+            self.min_ms = duration_ms
+        if self.max_ms is None or duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        self.errors += bool(error)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile, capped at the max."""
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = self.bounds[index] if index < len(self.bounds) else self.max_ms
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_json(self):
+        buckets = {
+            f"<={bound}ms": count
+            for bound, count in zip(self.bounds, self.counts)
+            if count
+        }
+        if self.counts[-1]:
+            buckets[f">{self.bounds[-1]}ms"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": self.total_ms / self.count if self.count else None,
+            "min_ms": self.min_ms,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+class Tracer:
+    """
+    Lightweight tracing: nested spans around each stage of answering a
+    question, exported to memory or a JSONL file, with a latency
+    histogram per span name.
+
+    Spans nest through contextvars, so they follow asyncio tasks and
+    threads started with a copied context. Trace context crosses process
+    boundaries as a W3C traceparent string: the client sends its current
+    span's traceparent in the MCP tool call metadata, and the server
+    starts its get_query span from it.
+
+    Histograms are kept even when no exporter is configured and can be
+    read with histograms() or written with dump_histograms() at any time.
+    """
+
+    def __init__(self, service=None, exporters=None, enabled=True, histogram_path=None):
+        """
+        :param service: Name recorded on every span (TRACE_SERVICE, default
+            the script name).
+        :param exporters: Objects with export(span); see from_env.
+        :param enabled: When False, spans are no-ops and nothing is recorded.
+        :param histogram_path: File dump_histograms() writes by default.
+        """
+        self.service = (
+            service or os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+        )
+        self.exporters = list(exporters or [])
+        self.enabled = enabled
+        self.histogram_path = histogram_path or os.path.join(
+            os.environ.get("LOG_PATH", "/tmp"),
+            "logs",
+            f"latency_histograms_{self.service}.json",
+        )
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Configure from the environment:
+
+        TRACING - "false" disables tracing (default "true").
+        TRACE_EXPORTER - comma-separated "memory", "file" or "none" (default "memory").
+        TRACE_PATH - JSONL file for the file exporter (default
+            $LOG_PATH/logs/traces_<service>.jsonl).
+        TRACE_SERVICE - Service name on spans (default the script name).
+        """
+        service = os.getenv("TRACE_SERVICE")
+        tracer = cls(service, enabled=os.getenv("TRACING", "true").lower() == "true")
+        for name in os.getenv("TRACE_EXPORTER", "memory").split(","):
+            name = name.strip().lower()
+            if name == "memory":
+                tracer.exporters.append(InMemoryExporter())
+            elif name == "file":
+                path = os.getenv(
+                    "TRACE_PATH",
+                    os.path.join(
+                        os.environ.get("LOG_PATH", "/tmp"),
+                        "logs",
+                        f"traces_{tracer.service}.jsonl",
+                    ),
+                )
+                tracer.exporters.append(FileExporter(path))
+            elif name not in ("", "none"):
+                raise ValueError(f"Unknown trace exporter '{name}'")
+        return tracer
+
+    @staticmethod
+    def current_span():
+        """The active span, or None."""
+        return _current_span.get()
+
+    def traceparent(self):
+        """traceparent of the active span, to pass to another process, or None."""
+        span = _current_span.get()
+        return span.traceparent if span is not None else None
+
+    def annotate(self, **attributes):
+        """Add attributes to the active span, if any."""
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def fail(self, error):
+        """Mark the active span, if any, failed with a handled error."""
+        span = _current_span.get()
+        if span is not None:
+            span.fail(error)
+
+    @contextmanager
+    def span(self, name, traceparent=None, **attributes):
+        """
+        Time a block as a span, a child of the active span or, if given,
+        of the remote span in traceparent. An exception marks it failed.
+
+        :return: The Span, or None when tracing is disabled.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        remote = TRACEPARENT.match(traceparent or "")
+        if remote:
+            trace_id, parent_id = remote.groups()
+        elif parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+
+        span = Span(name, trace_id, parent_id, self.service, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            self._finish(span)
+
+    def traced(self, name):
+        """Decorator running every call of a function or coroutine in a span."""
+
+        def decorator(fn):
+            if inspect.iscoroutinefunction(fn):
+
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await fn(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def _finish(self, span):
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = LatencyHistogram()
+            histogram.record(span.duration_ms, span.status == "error")
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:
+                # Tracing must never break the traced code
+                pass
+
+    def spans(self):
+        """Spans held by the in-memory exporters, oldest first."""
+        return [
+            span
+            for exporter in self.exporters
+            if isinstance(exporter, InMemoryExporter)
+            for span in exporter.spans
+        ]
+
+    def histograms(self):
+        """{span name: histogram summary} for every span recorded so far."""
+        with self._lock:
+            return {
+                name: histogram.to_json()
+                for name, histogram in sorted(self._histograms.items())
+            }
+
+    def dump_histograms(self, path=None):
+        """
+        Write histograms() as JSON, atomically.
+
+        :param path: Target file (default self.histogram_path).
+        :return: The path written.
+        """
+        path = path or self.histogram_path
+        data = {
+            "service": self.service,
+            "dumped_at": time.time(),
+            "histograms": self.histograms(),
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as histogram_file:
+            json.dump(data, histogram_file, indent=2)
+        os.replace(temp_path, path)
+        return path
+
+    def dump_on_signal(self, signum=getattr(signal, "SIGUSR1", None)):
+        """
+        Dump histograms whenever the process receives signum (SIGUSR1 by
+        default) and once at exit. Call from the main thread.
+        """
+        atexit.register(self.dump_histograms)
+        if signum is not None:
+            signal.signal(signum, lambda *_: self.dump_histograms())
+
+    def reset(self):
+        """Forget recorded histograms and in-memory spans."""
+        with self._lock:
+            self._histograms.clear()
+        for exporter in self.exporters:
+            if isinstance(exporter, InMemoryExporter):
+                exporter.clear()
+
+
+# Shared by every module of a process, so all its spans land in one place.
+tracer = Tracer.from_env()
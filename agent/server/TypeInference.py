@@ -0,0 +1,166 @@
+import json
+from decimal import Decimal
+
+import pandas as pd
+
+# Columns whose type is fixed regardless of what the sample looks like.
+DEFAULT_OVERRIDES = {"AIRDATE": "TIMESTAMP"}
+
+BOOLEAN_VALUES = {
+    "true": True,
+    "t": True,
+    "yes": True,
+    "y": True,
+    "false": False,
+    "f": False,
+    "no": False,
+    "n": False,
+}
+
+# Leading zeros (codes, zip codes) must survive, so they do not make an integer.
+INTEGER = r"[+-]?(0|[1-9]\d*)"
+DECIMAL = r"[+-]?((0|[1-9]\d*)(\.\d*)?|\.\d+)([eE][+-]?\d+)?"
+
+BIGINT_RANGE = (-(2**63), 2**63 - 1)
+
+# Map Postgres information_schema data types onto the types inferred here.
+POSTGRES_TYPES = {
+    "smallint": "BIGINT",
+    "integer": "BIGINT",
+    "bigint": "BIGINT",
+    "numeric": "NUMERIC",
+    "real": "NUMERIC",
+    "double precision": "NUMERIC",
+    "boolean": "BOOLEAN",
+    "date": "DATE",
+    "timestamp without time zone": "TIMESTAMP",
+    "timestamp with time zone": "TIMESTAMP",
+}
+
+
+class TypeInference:
+    """
+    Picks SQL column types for a CSV file from a sample of its rows and
+    converts each chunk to those types once, at load time.
+
+    Every check is a vectorized pandas operation over the whole sample
+    column. A column only gets a narrower type than TEXT if every non-empty
+    sampled value fits it.
+    """
+
+    types = ("BIGINT", "NUMERIC", "BOOLEAN", "DATE", "TIMESTAMP", "TEXT")
+
+    def __init__(self, overrides=None):
+        """
+        :param overrides: {table: {column: type}}; the "*" table applies to all tables.
+        """
+        self.overrides = overrides or {}
+
+    @classmethod
+    def from_config(cls, config_path):
+        """Load per-table overrides from a JSON file such as
+        {"IMPORT_KEXP_PLAYLIST": {"RELEASE_DATE": "DATE"}}."""
+        if not config_path:
+            return cls()
+        with open(config_path, "r", encoding="utf-8") as config_file:
+            overrides = json.load(config_file)
+        for table, columns in overrides.items():
+            for column, sql_type in columns.items():
+                if sql_type.upper() not in cls.types:
+                    raise ValueError(
+                        f"Unknown type '{sql_type}' for {table}.{column} in {config_path}"
+                    )
+        return cls(overrides)
+
+    @staticmethod
+    def infer_column(values):
+        """Return the narrowest type that fits every non-empty value."""
+        values = values.dropna().str.strip()
+        values = values[values != ""]
+        if values.empty:
+            return "TEXT"
+
+        if values.str.lower().isin(BOOLEAN_VALUES.keys()).all():
+            return "BOOLEAN"
+
+        if values.str.fullmatch(INTEGER).all():
+            return "BIGINT"
+        if values.str.fullmatch(DECIMAL).all():
+            return "NUMERIC"
+
+        if values.str.fullmatch(r"\d{4}-\d{2}-\d{2}").all():
+            if pd.to_datetime(values, format="%Y-%m-%d", errors="coerce").notna().all():
+                return "DATE"
+        if values.str.match(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}").all():
+            if pd.to_datetime(values, format="ISO8601", errors="coerce").notna().all():
+                return "TIMESTAMP"
+
+        return "TEXT"
+
+    def column_overrides(self, table_name):
+        """Merge default, wildcard and per-table overrides for a table."""
+        merged = dict(DEFAULT_OVERRIDES)
+        merged.update(self.overrides.get("*", {}))
+        merged.update(self.overrides.get(table_name, {}))
+        return {column: sql_type.upper() for column, sql_type in merged.items()}
+
+    def infer(self, table_name, sample):
+        """
+        Infer {column: type} for a sample DataFrame read with dtype=str.
+        """
+        overrides = self.column_overrides(table_name)
+        return {
+            column: overrides.get(column) or self.infer_column(sample[column])
+            for column in sample.columns
+        }
+
+    @staticmethod
+    def from_postgres(data_type):
+        """Map an information_schema data_type to one of TypeInference.types."""
+        return POSTGRES_TYPES.get(data_type, "TEXT")
+
+    @staticmethod
+    def convert(chunk, column_types):
+        """
+        Convert a dtype=str chunk to the column types in place.
+
+        Values that do not parse become NULL. BIGINT and NUMERIC values
+        become Python ints and Decimals, never floats, so they load exactly.
+
+        :return: {column: count of values that failed to convert}
+        """
+        failures = {}
+        for column, sql_type in column_types.items():
+            if column not in chunk.columns or sql_type == "TEXT":
+                continue
+            raw = chunk[column]
+            present = raw.notna() & (raw.str.strip() != "")
+
+            if sql_type in ("BIGINT", "NUMERIC"):
+                stripped = raw.str.strip()
+                pattern = INTEGER if sql_type == "BIGINT" else DECIMAL
+                valid = stripped.str.fullmatch(pattern).fillna(False).astype(bool)
+                numbers = stripped[valid].map(int if sql_type == "BIGINT" else Decimal)
+                if sql_type == "BIGINT":
+                    numbers = numbers[numbers.between(*BIGINT_RANGE)]
+                converted = pd.Series(None, index=raw.index, dtype=object)
+                converted[numbers.index] = numbers
+            elif sql_type == "BOOLEAN":
+                converted = raw.str.strip().str.lower().map(BOOLEAN_VALUES)
+            elif sql_type == "DATE":
+                parsed = pd.to_datetime(raw, format="%Y-%m-%d", errors="coerce")
+                converted = parsed.dt.strftime("%Y-%m-%d")
+            else:
+                try:
+                    converted = pd.to_datetime(raw, format="ISO8601", errors="coerce")
+                except ValueError:
+                    # Mixed UTC offsets; bring them to one zone
+                    converted = pd.to_datetime(
+                        raw, format="ISO8601", errors="coerce", utc=True
+                    )
+
+            failed = int((present & converted.isna()).sum())
+            if failed:
+                failures[column] = failed
+            chunk[column] = converted
+        return failures
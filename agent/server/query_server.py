@@ -1,54 +1,183 @@
+import asyncio
+import atexit
+import contextvars
+import os
+import threading
 import traceback
-import json
-from mcp.server.fastmcp import FastMCP
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from mcp.server.fastmcp import Context, FastMCP
 from server.SingletonLogger import SingletonLogger
+from server.Tracer import tracer
 
-from PostgresConnector import PostgresConnector
-from QueryHandler import QueryHandler
-
+from server.DatabaseBackend import DatabaseBackend
+from ResultEncoder import ResultEncoder
 
 # Initialize FastMCP server
 mcp = FastMCP("query_server")
 
 logger = SingletonLogger("query_server").get_logger()
 
+# Seconds a single get_query call may run before it is cancelled.
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", 60))
 
-@mcp.tool()
-async def get_query(query: str) -> str:
-    """
-    Runs the query
-    :param query:
-    :return:
-    """
+# Database selected by DB_BACKEND. Its pool of connections (or Snowflake
+# sessions) and parked cursors are shared by every tool call and opened
+# lazily on first use.
+backend = None
+_backend_lock = threading.Lock()
 
-    try:
-        logger.info(f"Running query: {query}")
+# Blocking database work runs here so the event loop keeps serving other
+# tool calls and protocol pings. Sized to the pool so N calls run in parallel.
+executor = None
+
+encoder = ResultEncoder()
+
+
+def get_backend():
+    """Return the server's database backend, connecting it on first use."""
+    global backend
+    with _backend_lock:
+        if backend is None:
+            backend = DatabaseBackend.from_env()
+            backend.connect()
+            atexit.register(close_backend)
+            logger.info(f"Opened {backend.name} backend: {backend.stats()}")
+    return backend
+
+
+def get_executor():
+    """Return the executor for blocking SQL work, one worker per pooled connection."""
+    global executor
+    if executor is None:
+        max_workers = int(
+            os.getenv("QUERY_CONCURRENCY", get_backend().connect().max_size)
+        )
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="get_query"
+        )
+    return executor
 
-        SingletonLogger("query_server").force_log(f"Running query: {query}")
 
-        # Connect to the database
-        connector = PostgresConnector()
-        connection = connector.connect()
+def close_backend():
+    """Close the executor and the backend's pool when the server shuts down."""
+    global backend, executor
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = None
+    if backend is not None:
+        logger.info(f"Closing {backend.name} backend: {backend.stats()}")
+        backend.close()
+        backend = None
 
-        handler = QueryHandler(connection)
 
-        # Example SQL Execution
-        result = handler.execute_query(query)
+def run_query(query, continuation, max_rows, format, timeout):
+    """Execute and encode one page of a query. Blocking; runs on the executor."""
+    result = get_backend().execute(query, continuation, max_rows, timeout)
 
-        logger.info(result["data"])
+    logger.info(f"Backend stats: {backend.stats()}")
 
-        return json.dumps(result["data"])
+    if not result["success"]:
+        raise Exception(result["error"])
 
-    except Exception as e:
-        logger.error(f"\nException: {e}\n{traceback.format_exc()}")
-        SingletonLogger("query_server").force_log(
-            f"\nException: {e}\n{traceback.format_exc()}"
+    logger.info(
+        f"Returned {len(result['rows'])} rows, "
+        f"continuation={result['continuation']}, cached={result['cached']}"
+    )
+    tracer.annotate(rows=len(result["rows"]), cached=result["cached"])
+
+    with tracer.span("ResultEncoder.encode", format=format):
+        return encoder.encode(
+            result["columns"], result["rows"], format, result["continuation"]
         )
-        return f"⚠️ Error in call.  Check logs for details"
+
+
+def request_traceparent(ctx):
+    """traceparent the client sent in the tool call's _meta, if any."""
+    try:
+        meta = ctx.request_context.meta
+    except (AttributeError, ValueError):
+        return None
+    return getattr(meta, "traceparent", None)
+
+
+@mcp.tool()
+async def get_query(
+    query: str = "",
+    continuation: str = "",
+    max_rows: int = 0,
+    format: str = "json",
+    ctx: Context = None,
+) -> str:
+    """
+    Runs the query and returns the rows as a JSON list.
+
+    Large results are returned one page at a time: the response is then an
+    object with "data" and a "continuation" token. Call get_query again with
+    that token (and no query) to fetch the next page.
+    :param query: The SQL query to run.
+    :param continuation: Token from a previous page of results.
+    :param max_rows: Optional smaller page size.
+    :param format: "json" (list of rows), "columnar" (column names once plus one
+        array per column), "csv", or "arrow" (base64 Arrow IPC stream).
+    :return:
+    """
+
+    # Continue the client's trace when it sent one in the call metadata
+    with tracer.span("get_query", traceparent=request_traceparent(ctx), format=format):
+        if format not in encoder.formats:
+            # Reject before the query runs rather than after
+            return (
+                f"⚠️ Unknown format '{format}', expected one of "
+                f"{', '.join(encoder.formats)}."
+            )
+
+        try:
+            logger.info(f"Running query: {query or continuation}")
+
+            SingletonLogger("query_server").force_log(
+                f"Running query: {query or continuation}"
+            )
+
+            loop = asyncio.get_running_loop()
+
+            # The database enforces QUERY_TIMEOUT (statement_timeout on Postgres,
+            # the statement timeout on Snowflake); the extra grace here only
+            # covers time spent queued or encoding. The executor thread runs in
+            # a copy of this context so its spans nest under get_query.
+            return await asyncio.wait_for(
+                loop.run_in_executor(
+                    get_executor(),
+                    partial(
+                        contextvars.copy_context().run,
+                        run_query,
+                        query,
+                        continuation,
+                        max_rows,
+                        format,
+                        QUERY_TIMEOUT,
+                    ),
+                ),
+                timeout=QUERY_TIMEOUT + 5,
+            )
+
+        except Exception as e:
+            tracer.fail(e)
+            logger.error(f"\nException: {e!r}\n{traceback.format_exc()}")
+            SingletonLogger("query_server").force_log(
+                f"\nException: {e!r}\n{traceback.format_exc()}"
+            )
+            return f"⚠️ Error in call.  Check logs for details"
 
 
 if __name__ == "__main__":
     logger.info(f"Running server...")
 
+    # kill -USR1 <pid> writes the latency histograms; they are also written at exit
+    tracer.dump_on_signal()
+
     # Initialize and run the server
-    mcp.run(transport="stdio")
+    try:
+        mcp.run(transport="stdio")
+    finally:
+        close_backend()
@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+
+AGENT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"
+)
+
+# Import modules the way the scripts run: the server package from the agent
+# directory (PYTHONPATH=agent), and server and client modules by bare name
+# from their own directories.
+for path in (AGENT, os.path.join(AGENT, "server"), os.path.join(AGENT, "client")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Logs, caches and catalog snapshots go to a scratch directory.
+os.environ["LOG_PATH"] = tempfile.mkdtemp(prefix="agent_tests_")
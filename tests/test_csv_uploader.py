@@ -0,0 +1,37 @@
+import pandas as pd
+
+from CSVUploader import CSVUploader
+from TypeInference import TypeInference
+
+
+def airdates(*values):
+    chunk = pd.DataFrame({"AIRDATE": list(values)})
+    TypeInference.convert(chunk, {"AIRDATE": "TIMESTAMP"})
+    return chunk["AIRDATE"]
+
+
+def test_offset_airdates_compare_with_a_naive_watermark():
+    times = CSVUploader.naive_times(
+        airdates("2024-01-01T11:00:00+00:00", "2024-01-01T12:30:00+01:00"), "UTC"
+    )
+    watermark = CSVUploader.naive_times(pd.Timestamp("2024-01-01 11:00:00"), "UTC")
+    assert (times > watermark).tolist() == [False, True]
+    assert (times == watermark).tolist() == [True, False]
+
+
+def test_offset_airdates_convert_to_the_session_zone():
+    times = CSVUploader.naive_times(
+        airdates("2024-07-01T12:00:00Z"), "America/Los_Angeles"
+    )
+    assert times.tolist() == [pd.Timestamp("2024-07-01 05:00:00")]
+
+    # A zone pandas does not know falls back to UTC
+    times = CSVUploader.naive_times(airdates("2024-07-01T12:00:00Z"), "Nowhere/Zone")
+    assert times.tolist() == [pd.Timestamp("2024-07-01 12:00:00")]
+
+
+def test_aware_watermark_becomes_naive():
+    watermark = pd.Timestamp("2024-01-01 12:00:00+01:00").to_pydatetime()
+    assert CSVUploader.naive_times(watermark, "UTC") == pd.Timestamp(
+        "2024-01-01 11:00:00"
+    )
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+from MCPClient import MCPClient
+from StubStreamingClient import StubStreamingClient
+from server.PromptGenerator import PromptGenerator
+
+SQL = "SELECT artist FROM import_kexp_playlist ORDER BY airdate DESC LIMIT 1"
+ROWS = '[{"artist": "Bob Mould"}]'
+
+
+class FakeSession:
+    """MCP session serving a get_query tool that returns ROWS."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def list_tools(self):
+        tool = SimpleNamespace(
+            name="get_query", description="Run SQL", inputSchema={"type": "object"}
+        )
+        return SimpleNamespace(tools=[tool])
+
+    async def call_tool(self, name, arguments, meta=None):
+        self.calls.append((name, arguments))
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=ROWS)], isError=False
+        )
+
+
+class FakeGenerator:
+    catalog = SimpleNamespace(fingerprint=lambda: "schema")
+
+    def generate_request(self, query):
+        return "Table import_kexp_playlist(artist, airdate)", f"Question: {query}"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("QUESTION_CACHE", "false")
+    monkeypatch.setattr(
+        PromptGenerator, "from_backend", staticmethod(lambda backend: FakeGenerator())
+    )
+    client = MCPClient(
+        StubStreamingClient(sql=SQL, first_token_delay=0.05, token_delay=0.001)
+    )
+    client.session = FakeSession()
+    client.backend = object()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_process_query_streams_turns_and_runs_tool_calls(client, capsys):
+    stats = {}
+    answer = await client.process_query("Who was played last?", stats)
+    output = capsys.readouterr().out
+
+    # Text was printed as it streamed, and the tool_use block was detected
+    assert "Let me look that up in the playlist data." in output
+    assert f'🔧 get_query {{"query": "{SQL}"}}' in output
+    assert client.session.calls == [("get_query", {"query": SQL})]
+    assert f"Here is what the database returned: {ROWS}" in answer
+    assert stats["sql"] == [SQL]
+    assert stats["rows"] == [1]
+
+    # One timing per model turn: the tool call, then the answer
+    assert len(client.turn_timings) == 2
+    assert stats["turns"] == client.turn_timings
+    for timing in client.turn_timings:
+        assert 50 <= timing["ttft_ms"] <= timing["total_ms"]
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("mcp.server.fastmcp")
+
+import query_server
+
+LATENCY = 0.3
+QUERIES = 4
+
+
+class SlowBackend:
+    """Backend whose every query blocks its thread for LATENCY seconds."""
+
+    name = "slow"
+
+    def execute(self, query=None, continuation=None, max_rows=None, timeout=None):
+        time.sleep(LATENCY)
+        return {
+            "success": True,
+            "columns": ["query"],
+            "rows": [(query,)],
+            "continuation": None,
+            "cached": False,
+        }
+
+    def stats(self):
+        return {}
+
+
+@pytest.fixture
+def slow_backend(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=QUERIES)
+    monkeypatch.setattr(query_server, "backend", SlowBackend())
+    monkeypatch.setattr(query_server, "executor", executor)
+    yield
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_slow_queries_take_max_not_sum_of_latency(slow_backend):
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    beating = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(query_server.get_query(f"SELECT {i}") for i in range(QUERIES))
+    )
+    elapsed = time.perf_counter() - started
+    beating.cancel()
+
+    assert results == [f'[{{"query": "SELECT {i}"}}]' for i in range(QUERIES)]
+    # Serially the queries would take QUERIES * LATENCY
+    assert elapsed < 2 * LATENCY
+    # The event loop kept running while the queries blocked their threads
+    assert ticks >= LATENCY / 0.01 / 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_format_is_rejected_before_the_query_runs(monkeypatch):
+    def fail(*args):
+        raise AssertionError("the query ran")
+
+    monkeypatch.setattr(query_server, "run_query", fail)
+    result = await query_server.get_query("SELECT 1", format="xml")
+    assert result.startswith("⚠️ Unknown format 'xml'")
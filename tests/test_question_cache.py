@@ -0,0 +1,50 @@
+from QuestionCache import QuestionCache
+
+SQL = (
+    "SELECT song, COUNT(*) AS plays FROM import_kexp_playlist "
+    "WHERE artist = 'Bob Mould' AND airdate >= NOW() - INTERVAL '1 year' "
+    "GROUP BY song ORDER BY plays DESC LIMIT 10"
+)
+
+
+def cache(**kwargs):
+    question_cache = QuestionCache(path=False, **kwargs)
+    question_cache.store("Bob Mould's top hits this year", SQL)
+    return question_cache
+
+
+def test_near_duplicate_question_hits():
+    sql, similarity, cached_question = cache().lookup("top Bob Mould songs past year")
+    assert sql == SQL
+    assert similarity >= 0.9
+    assert cached_question == "Bob Mould's top hits this year"
+
+
+def test_leading_article_stays_in_entity():
+    sql, _, _ = cache().lookup("The Beths top hits this year")
+    assert "artist = 'The Beths'" in sql
+    assert "'1 year'" in sql
+
+
+def test_threshold_applies_to_similarity():
+    question = "top Bob Mould songs heard at night this year"
+    assert cache().lookup(question) is None
+    assert cache(threshold=0.5).lookup(question) is not None
+
+
+def test_different_subject_or_constraint_misses():
+    question_cache = cache(threshold=0.1)
+    assert question_cache.lookup("top Bob Mould albums this year") is None
+    assert question_cache.lookup("top Bob Mould songs this month") is None
+    assert question_cache.lookup("top new Bob Mould songs this year") is None
+
+
+def test_saves_are_batched(tmp_path):
+    path = tmp_path / "question_cache.json"
+    question_cache = QuestionCache(path=str(path), save_delay=60)
+    question_cache.store("Bob Mould's top hits this year", SQL)
+    question_cache.lookup("top Bob Mould songs past year")
+    assert not path.exists()
+
+    question_cache.flush()
+    assert len(QuestionCache(path=str(path))) == 1
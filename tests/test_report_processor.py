@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from server.FakeSnowflakeConnector import FakeSnowflakeConnector
+from server.ReportProcessor import ReportProcessor
+
+LATENCY = 0.3
+
+
+def connector():
+    return FakeSnowflakeConnector(latency=LATENCY, fail_pattern="FAIL_ME")
+
+
+@pytest.fixture
+def processor(tmp_path):
+    folder = tmp_path / "sql"
+    folder.mkdir()
+    for name in ("plays", "artists", "albums"):
+        (folder / f"{name}.sql").write_text(f"SELECT '{name}';")
+    (folder / "broken.sql").write_text("SELECT 1;\nSELECT 'FAIL_ME';")
+    processor = ReportProcessor(report_folder=folder)
+    processor.output_base_folder = tmp_path / "data"
+    return processor
+
+
+def test_reports_run_in_parallel_and_a_failed_statement_is_recorded(processor):
+    session = connector()
+    session.connect()
+
+    started = time.perf_counter()
+    results = processor.process_reports(
+        session, parallelism=4, connector_factory=connector
+    )
+    elapsed = time.perf_counter() - started
+
+    statuses = {result["name"]: result["status"] for result in results}
+    assert statuses == {
+        "plays": "ok",
+        "artists": "ok",
+        "albums": "ok",
+        "broken": "failed",
+    }
+    broken = next(result for result in results if result["name"] == "broken")
+    assert "Simulated failure" in broken["error"]
+    # Serially the five statements would take 5 * LATENCY; in parallel the
+    # two-statement report is the longest
+    assert elapsed < 3.5 * LATENCY
+
+    # The manifest recorded the failure, so a rerun retries only that report
+    rerun = processor.process_reports(
+        session, parallelism=4, connector_factory=connector
+    )
+    statuses = {result["name"]: result["status"] for result in rerun}
+    assert statuses == {
+        "plays": "skipped",
+        "artists": "skipped",
+        "albums": "skipped",
+        "broken": "failed",
+    }
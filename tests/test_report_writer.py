@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import pytest
+
+from server.ReportWriter import ReportWriter
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def write_parquet(tmp_path, batches):
+    writer = ReportWriter("parquet")
+    paths, rows = writer.write(tmp_path, "report", [("SELECT", ["a", "b"], batches)])
+    return pq.read_table(paths[0]), rows
+
+
+def test_parquet_types_null_first_batch_from_later_batches(tmp_path):
+    batches = [[(None, 1)], [("x", None)], [("y", 3)]]
+    table, rows = write_parquet(tmp_path, batches)
+    assert rows == 3
+    assert str(table.schema.field("a").type) == "string"
+    assert table.column("a").to_pylist() == [None, "x", "y"]
+    assert table.column("b").to_pylist() == [1, None, 3]
+
+
+def test_parquet_widens_decimal_scale(tmp_path):
+    batches = [
+        [(Decimal("1.5"), 1), (Decimal("2.25"), 2)],
+        [(None, 3)],
+        [(Decimal("3.125"), 4)],
+    ]
+    table, _ = write_parquet(tmp_path, batches)
+    assert table.schema.field("a").type.scale == 2
+    assert table.column("a").to_pylist() == [
+        Decimal("1.50"),
+        Decimal("2.25"),
+        None,
+        Decimal("3.13"),
+    ]
+
+
+def test_parquet_writes_still_null_columns_as_strings(tmp_path, monkeypatch):
+    monkeypatch.setattr(ReportWriter, "schema_buffer_rows", 1)
+    table, _ = write_parquet(tmp_path, [[(None, 1)], [(7, 2)]])
+    assert table.column("a").to_pylist() == [None, "7"]